@@ -10,15 +10,40 @@ const totalTasksEl = document.getElementById('total-tasks');
 const completedTasksEl = document.getElementById('completed-tasks');
 const pendingTasksEl = document.getElementById('pending-tasks');
 
+// Sync with the desktop app's local API (python todo_app.py --api)
+const SYNC_URL = 'http://127.0.0.1:8765/sync';
+const SYNC_INTERVAL = 5000;
+const SYNC_DEBOUNCE = 500;
+const SYNC_BATCH = 200;   // ops per request; a rejected batch is retried in halves
+
+// Wire field names (desktop schema) -> our task keys
+const SYNC_FIELDS = {
+    text: 'text',
+    completed: 'completed',
+    completed_at: 'completedAt',
+    priority: 'priority',
+    due_date: 'dueDate',
+    created_at: 'createdAt'
+};
+
 // State
 let tasks = JSON.parse(localStorage.getItem('tasks')) || [];
 let currentFilter = 'all';
 
+// Sync state: our replica id, the last desktop version we saw, the ops made
+// locally since then (merged per task, so repeat edits stay small), and the
+// ids the desktop is known to have (only those can be dropped by a full listing)
+let syncState = JSON.parse(localStorage.getItem('syncState'));
+let syncBatch = SYNC_BATCH;
+let syncInFlight = false;
+let syncTimer = null;
+
 // Initialize
 function init() {
     displayDate();
     renderTasks();
     updateStats();
+    initSync();
 }
 
 // Display current date
@@ -47,10 +72,14 @@ function addTask() {
         id: generateId(),
         text: text,
         completed: false,
+        completedAt: null,
+        priority: 'NONE',
+        dueDate: null,
         createdAt: new Date().toISOString()
     };
 
     tasks.unshift(task);
+    recordChange(task, Object.keys(SYNC_FIELDS));
     saveTasks();
     renderTasks();
     updateStats();
@@ -60,9 +89,12 @@ function addTask() {
 
 // Toggle task completion
 function toggleTask(id) {
-    tasks = tasks.map(task => 
-        task.id === id ? { ...task, completed: !task.completed } : task
-    );
+    const task = tasks.find(task => task.id === id);
+    if (!task) return;
+
+    task.completed = !task.completed;
+    task.completedAt = task.completed ? new Date().toISOString() : null;
+    recordChange(task, ['completed', 'completed_at']);
     saveTasks();
     renderTasks();
     updateStats();
@@ -75,6 +107,7 @@ function deleteTask(id) {
     
     setTimeout(() => {
         tasks = tasks.filter(task => task.id !== id);
+        recordDelete(id);
         saveTasks();
         renderTasks();
         updateStats();
@@ -87,6 +120,7 @@ function clearCompleted() {
     completedItems.forEach(item => item.classList.add('removing'));
     
     setTimeout(() => {
+        tasks.filter(task => task.completed).forEach(task => recordDelete(task.id));
         tasks = tasks.filter(task => !task.completed);
         saveTasks();
         renderTasks();
@@ -167,6 +201,182 @@ function saveTasks() {
     localStorage.setItem('tasks', JSON.stringify(tasks));
 }
 
+// Set up sync state; the first run queues every existing task for upload once
+function initSync() {
+    if (!syncState) {
+        syncState = { replica: 'web-' + generateId(), version: 0, outbox: {}, known: {} };
+        tasks.forEach(task => {
+            const created = Date.parse(task.createdAt) || Date.now();
+            recordChange(task, Object.keys(SYNC_FIELDS), [created, syncState.replica]);
+        });
+        saveSyncState();
+    }
+    syncState.known = syncState.known || {};
+    syncNow();
+    setInterval(syncNow, SYNC_INTERVAL);
+}
+
+function saveSyncState() {
+    localStorage.setItem('syncState', JSON.stringify(syncState));
+}
+
+// Compare [ms, replica] clocks: newer time wins, replica id breaks ties
+function compareClocks(a, b) {
+    if (a[0] !== b[0]) return a[0] - b[0];
+    return a[1] < b[1] ? -1 : a[1] > b[1] ? 1 : 0;
+}
+
+// Queue a local edit of the given wire fields for the next sync
+function recordChange(task, fields, clock = [Date.now(), syncState.replica]) {
+    const op = syncState.outbox[task.id] || { id: task.id, fields: {}, clock: {} };
+    task.clock = task.clock || {};
+    fields.forEach(field => {
+        const value = task[SYNC_FIELDS[field]];
+        op.fields[field] = value === undefined ? null : value;
+        op.clock[field] = clock;
+        task.clock[field] = clock;
+    });
+    syncState.outbox[task.id] = op;
+    saveSyncState();
+    scheduleSync();
+}
+
+function recordDelete(id) {
+    syncState.outbox[id] = { id: id, deleted: [Date.now(), syncState.replica] };
+    saveSyncState();
+    scheduleSync();
+}
+
+// Fold an older queued op into a newer one for the same task
+function mergeOps(older, newer) {
+    if (newer.deleted || older.deleted) return newer;
+    return {
+        id: newer.id,
+        fields: { ...older.fields, ...newer.fields },
+        clock: { ...older.clock, ...newer.clock }
+    };
+}
+
+function scheduleSync() {
+    clearTimeout(syncTimer);
+    syncTimer = setTimeout(syncNow, SYNC_DEBOUNCE);
+}
+
+// Send our queued ops and apply whatever the desktop changed since our last sync
+async function syncNow() {
+    if (syncInFlight) return;
+    syncInFlight = true;
+
+    // Send up to syncBatch ops; the rest, and edits made while the request
+    // is in flight, stay queued
+    const queued = Object.entries(syncState.outbox);
+    const sent = Object.fromEntries(queued.slice(0, syncBatch));
+    Object.keys(sent).forEach(id => delete syncState.outbox[id]);
+    let more = queued.length > syncBatch;
+
+    try {
+        const response = await fetch(SYNC_URL, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                replica: syncState.replica,
+                since: syncState.version,
+                ops: Object.values(sent)
+            })
+        });
+        if (response.status >= 400 && response.status < 500) {
+            const reason = await response.text();
+            if (Object.keys(sent).length > 1) {
+                // Too large, or one bad op in it: keep the ops and send smaller batches
+                syncBatch = Math.max(1, Math.floor(Object.keys(sent).length / 2));
+                requeueOps(sent);
+                more = true;
+            } else {
+                // The desktop can't take this op; the task stays here, unsynced
+                console.warn('Sync rejected:', reason);
+            }
+        } else if (!response.ok) {
+            throw new Error(`sync failed: ${response.status}`);
+        } else {
+            Object.values(sent).forEach(op => {
+                if (op.deleted) delete syncState.known[op.id];
+                else syncState.known[op.id] = true;
+            });
+            syncBatch = Math.min(SYNC_BATCH, syncBatch * 2);
+            applyRemote(await response.json());
+        }
+    } catch (err) {
+        // Desktop app not running; keep the ops for next time
+        requeueOps(sent);
+        more = false;
+    } finally {
+        syncInFlight = false;
+        saveSyncState();
+        if (more) scheduleSync();
+    }
+}
+
+// Put ops that didn't get through back in the outbox, under any newer edits
+function requeueOps(sent) {
+    Object.entries(sent).forEach(([id, op]) => {
+        syncState.outbox[id] = id in syncState.outbox ? mergeOps(op, syncState.outbox[id]) : op;
+    });
+}
+
+// Merge remote ops into our tasks with the same last-writer-wins rules as the desktop
+function applyRemote(result) {
+    const byId = new Map(tasks.map(task => [task.id, task]));
+    const seen = new Set();
+    const added = [];
+
+    result.ops.forEach(op => {
+        seen.add(op.id);
+        if (op.deleted) {
+            // Deletes win over edits, including our own queued ones
+            byId.delete(op.id);
+            delete syncState.outbox[op.id];
+            delete syncState.known[op.id];
+            return;
+        }
+        syncState.known[op.id] = true;
+
+        let task = byId.get(op.id);
+        if (!task) {
+            task = { id: op.id, text: '', completed: false, createdAt: new Date().toISOString() };
+            byId.set(op.id, task);
+            added.push(task);
+        }
+        task.clock = task.clock || {};
+        Object.entries(op.fields).forEach(([field, value]) => {
+            const key = SYNC_FIELDS[field];
+            const remote = op.clock[field] || [0, ''];
+            const local = task.clock[field];
+            if (!key || (local && compareClocks(remote, local) <= 0)) return;
+            task[key] = value;
+            task.clock[field] = remote;
+        });
+    });
+
+    if (result.full) {
+        // A full listing: a task the desktop had is gone when it's no longer
+        // listed, unless we edited it since. Tasks it never took stay.
+        for (const id of byId.keys()) {
+            if (!seen.has(id) && !(id in syncState.outbox) && syncState.known[id]) {
+                byId.delete(id);
+                delete syncState.known[id];
+            }
+        }
+    }
+
+    syncState.version = result.version;
+    if (result.ops.length === 0 && !result.full) return;
+
+    tasks = [...added, ...tasks.filter(task => byId.has(task.id))];
+    saveTasks();
+    renderTasks();
+    updateStats();
+}
+
 // Escape HTML to prevent XSS
 function escapeHtml(text) {
     const div = document.createElement('div');
@@ -0,0 +1,30 @@
+"""Fixtures shared by the tests: a scratch TaskStore and a stand-in ToDoApp"""
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import todo_app
+
+
+class StoreTestCase(unittest.TestCase):
+    """Each test gets an empty, loaded TaskStore in a temporary folder"""
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = todo_app.TaskStore(os.path.join(self.tmp.name, "tasks.json"))
+        self.store.load()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def add(self, text, **fields):
+        return self.store.add(todo_app.new_task(text, **fields))
+
+
+def stub_app(store, **workspace):
+    """Just enough of a ToDoApp for handlers that edit the store without a window"""
+    app = todo_app.ToDoApp.__new__(todo_app.ToDoApp)
+    app.workspace = SimpleNamespace(store=store, history=todo_app.UndoHistory(store), **workspace)
+    app.save_tasks = lambda *args: None
+    app.render_tasks = lambda: None
+    return app
@@ -0,0 +1,45 @@
+"""Archiving a task and restoring it leaves the throughput stats as they were"""
+import os
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import todo_app
+from tests.helpers import StoreTestCase, stub_app
+
+
+class ArchiveRoundTripTest(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.archive = todo_app.TaskArchive(os.path.join(self.tmp.name, "tasks_archive"))
+
+    def created_total(self):
+        return sum(day["created"] for day in self.store.rollups.days.values())
+
+    def test_archive_then_restore_counts_the_task_once(self):
+        task = todo_app.new_task("old")
+        task["created_at"] = (datetime.now() - timedelta(days=90)).isoformat()
+        self.store.add(task)
+        self.store.update(task["id"], completed=True, completed_at=(datetime.now() - timedelta(days=60)).isoformat())
+        created = self.created_total()
+        app = stub_app(self.store, archive=self.archive)
+        app.archive_rows = {}
+
+        for _ in range(3):
+            self.assertEqual(self.archive.archive_from(self.store), 1)
+            self.assertEqual(self.store.tasks, [])
+            self.assertNotIn(task["id"], self.store.tombstones)
+            self.assertEqual(self.created_total(), created)
+
+            archived = next(self.archive.iter_tasks())
+            app.archive_rows[archived["id"]] = SimpleNamespace(task_data=archived, destroy=lambda: None)
+            app.restore_archived(archived["id"])
+            self.assertEqual([t["id"] for t in self.store.tasks], [task["id"]])
+            self.assertEqual(self.created_total(), created)
+            self.store.update(task["id"], completed=True, completed_at=archived["completed_at"])
+
+        self.assertEqual(self.archive.count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
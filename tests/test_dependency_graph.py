@@ -0,0 +1,77 @@
+"""DependencyGraph open-blocker counts against a recount from blocked_by"""
+import unittest
+from datetime import date
+
+import todo_app
+from tests.helpers import StoreTestCase
+
+
+def recount(store):
+    """Open blockers per task, counted the slow way"""
+    return {
+        task["id"]: sum(
+            1 for blocker in set(task.get("blocked_by") or ()) - {task["id"]}
+            if blocker in store.by_id and not store.by_id[blocker]["completed"]
+        )
+        for task in store.tasks
+    }
+
+
+class DependencyGraphTest(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.blocked = todo_app.compile_query("is:blocked", date.today())
+
+    def check(self):
+        counts = recount(self.store)
+        self.assertEqual(self.store.deps.open_blockers, counts)
+        # The is:blocked bitmap follows the counts through on_blocked
+        expected = {task_id for task_id, count in counts.items() if count}
+        self.assertEqual(self.store.tag_index.blocked_ids, expected)
+        self.assertEqual({t["id"] for t in self.blocked.run(self.store)}, expected)
+
+    def test_loops_are_refused(self):
+        store = self.store
+        a = self.add("a")
+        b = self.add("b", blocked_by=[a["id"]])
+        c = self.add("c", blocked_by=[b["id"]])
+        for blocked_by in ([c["id"]], [b["id"]], [a["id"]], ["missing"]):
+            with self.subTest(blocked_by=blocked_by), self.assertRaises(ValueError):
+                store.update(a["id"], blocked_by=blocked_by)
+        self.assertEqual(a["blocked_by"], [])
+        self.assertEqual(store.deps.dependents[a["id"]], {b["id"]})
+        self.check()
+
+    def test_completing_a_blocker_frees_its_dependents(self):
+        store = self.store
+        a = self.add("a")
+        b = self.add("b")
+        c = self.add("c", blocked_by=[a["id"], b["id"]])
+        self.assertEqual(store.deps.open_blockers[c["id"]], 2)
+        store.toggle(a["id"])
+        self.assertIn(c["id"], store.tag_index.blocked_ids)
+        store.toggle(b["id"])
+        self.assertNotIn(c["id"], store.tag_index.blocked_ids)
+        self.check()
+        # Reopening a blocker blocks its dependents again
+        store.toggle(a["id"])
+        self.assertEqual(store.deps.open_blockers[c["id"]], 1)
+        self.assertIn(c["id"], store.tag_index.blocked_ids)
+        self.check()
+
+    def test_deleted_blocker_stops_blocking_until_undone(self):
+        store = self.store
+        a = self.add("a")
+        c = self.add("c", blocked_by=[a["id"]])
+        task, index = store.pop(a["id"])
+        self.assertEqual(store.deps.open_blockers[c["id"]], 0)
+        self.assertNotIn(c["id"], store.tag_index.blocked_ids)
+        self.check()
+        store.add(task, index)
+        self.assertEqual(c["blocked_by"], [a["id"]])
+        self.assertIn(c["id"], store.tag_index.blocked_ids)
+        self.check()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+"""Bulk import: records are normalized, and dropped values are reported"""
+import os
+import tempfile
+import unittest
+
+import todo_app
+
+
+class NormalizeTaskTest(unittest.TestCase):
+    def test_unreadable_values_are_reported(self):
+        warnings = []
+        task = todo_app.normalize_task(
+            {"text": "a", "due_date": "2026-13-45", "recurrence": "sometimes"}, warnings
+        )
+        self.assertIsNone(task["due_date"])
+        self.assertIsNone(task["recurrence"])
+        self.assertEqual(len(warnings), 2)
+        self.assertIn("due_date '2026-13-45'", warnings[1])
+
+    def test_clean_record_has_no_warnings(self):
+        warnings = []
+        task = todo_app.normalize_task({"text": "a", "due_date": "20/10/2026", "priority": "p1"}, warnings)
+        self.assertEqual(task["due_date"], "2026-10-20")
+        self.assertEqual(warnings, [])
+
+
+class ImportTasksTest(unittest.TestCase):
+    def test_warned_rows_are_counted(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "in.csv")
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                f.write("text,due_date\na,2026-13-45\nb,2026-10-20\n,2026-10-21\n")
+            store = todo_app.TaskStore(os.path.join(tmp, "tasks.json"))
+            store.load()
+            app = todo_app.ToDoApp.__new__(todo_app.ToDoApp)
+            result = app.import_tasks(todo_app.CancelToken(), store, path)
+            self.assertEqual(result, (2, 1, 1))
+            self.assertEqual([t["due_date"] for t in store.tasks], [None, "2026-10-20"])
+
+
+if __name__ == "__main__":
+    unittest.main()
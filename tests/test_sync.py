@@ -0,0 +1,40 @@
+"""SyncEngine: incoming ops are validated before they reach the store"""
+import unittest
+
+import todo_app
+from tests.helpers import StoreTestCase
+
+
+class SyncEngineTest(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.engine = todo_app.SyncEngine(self.store)
+
+    def sync(self, *ops):
+        return self.engine.sync({"replica": "web-1", "since": 0, "ops": list(ops)})
+
+    def test_unreadable_dates_refuse_the_op(self):
+        for fields in (
+            {"text": "a", "created_at": 5},
+            {"text": "a", "created_at": None},
+            {"text": "a", "completed_at": "later"},
+            {"text": "a", "due_date": "soon"},
+        ):
+            with self.subTest(fields=fields), self.assertRaises(ValueError):
+                self.sync({"id": "t1", "fields": fields, "clock": {}})
+        self.assertEqual(self.store.tasks, [])
+
+    def test_new_task_gets_every_field(self):
+        self.sync({
+            "id": "t1",
+            "fields": {"text": "a", "due_date": None, "created_at": "2026-10-01T08:00:00.000Z"},
+            "clock": {"text": [1, "web-1"]}
+        })
+        task = self.store.get("t1")
+        self.assertTrue(set(todo_app.TASK_FIELDS) <= set(task))
+        self.assertEqual(task["created_at"][:10], "2026-10-01")
+        self.assertEqual((task["tags"], task["parent"], task["blocked_by"]), ([], None, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+"""TaskTree progress against a recount from the tasks' parent links"""
+import unittest
+
+import todo_app
+from tests.helpers import StoreTestCase, stub_app
+
+
+def recount(store):
+    """[done, total] over each task's descendants, walked the slow way"""
+    progress = {task_id: [0, 0] for task_id in store.by_id}
+    for task in store.tasks:
+        seen = {task["id"]}
+        parent = task.get("parent")
+        while parent in store.by_id:
+            if parent in seen:
+                raise AssertionError(f"parent links loop through {parent}")
+            seen.add(parent)
+            progress[parent][0] += task["completed"]
+            progress[parent][1] += 1
+            parent = store.by_id[parent].get("parent")
+    return progress
+
+
+class TaskTreeTest(StoreTestCase):
+    def check(self):
+        tree = self.store.tree
+        self.assertEqual(tree.progress, recount(self.store))
+        for task in self.store.tasks:
+            self.assertEqual(tree.parent_of.get(task["id"]), task.get("parent"))
+
+    def test_reparenting_moves_counts_between_ancestors(self):
+        store = self.store
+        a = self.add("a")
+        b = self.add("b", parent=a["id"])
+        c = self.add("c", parent=b["id"])
+        d = self.add("d")
+        store.toggle(c["id"])
+        self.assertEqual(store.tree.progress[a["id"]], [1, 2])
+
+        store.update(b["id"], parent=d["id"])
+        self.assertEqual(store.tree.progress[a["id"]], [0, 0])
+        self.assertEqual(store.tree.progress[d["id"]], [1, 2])
+        self.check()
+
+        store.update(b["id"], parent=None)
+        self.assertEqual(store.tree.progress[d["id"]], [0, 0])
+        self.assertEqual(store.tree.progress[b["id"]], [1, 1])
+        self.check()
+
+    def test_nesting_under_a_subtask_or_a_missing_task_is_refused(self):
+        store = self.store
+        a = self.add("a")
+        b = self.add("b", parent=a["id"])
+        c = self.add("c", parent=b["id"])
+        for parent in (a["id"], c["id"], "missing"):
+            with self.subTest(parent=parent), self.assertRaises(ValueError):
+                store.update(a["id"], parent=parent)
+        self.assertIsNone(a["parent"])
+        self.assertEqual(store.tree.progress[a["id"]], [0, 2])
+        self.check()
+
+    def test_cascade_delete_and_undo(self):
+        store = self.store
+        root = self.add("root")
+        mid = self.add("mid", parent=root["id"])
+        done = self.add("done", parent=mid["id"])
+        self.add("open", parent=mid["id"])
+        self.add("sibling", parent=root["id"])
+        store.toggle(done["id"])
+        order = [t["id"] for t in store.tasks]
+        app = stub_app(store)
+
+        removed = app._remove_subtrees([mid["id"]])
+        self.assertEqual(len(removed), 3)
+        self.assertEqual(store.tree.progress[root["id"]], [0, 1])
+        self.assertNotIn(mid["id"], store.tree.children.get(root["id"], {}))
+        self.check()
+
+        app.history.record(removed)
+        app.history.undo()
+        self.assertEqual([t["id"] for t in store.tasks], order)
+        self.assertEqual(store.tree.progress[root["id"]], [1, 4])
+        self.assertEqual(store.tree.progress[mid["id"]], [1, 2])
+        self.check()
+
+    def test_parent_moved_under_deleted_task_comes_back_on_top(self):
+        store = self.store
+        p = self.add("p")
+        x = self.add("x", parent=p["id"])
+        c = self.add("c", parent=x["id"])
+        store.pop(x["id"])
+        store.update(p["id"], parent=c["id"])
+        store.add(x)
+        self.assertIsNone(x["parent"])
+        self.check()
+
+    def test_load_rebuilds_the_same_counts(self):
+        store = self.store
+        root = self.add("root")
+        child = self.add("child", parent=root["id"])
+        self.add("grandchild", parent=child["id"])
+        store.toggle(child["id"])
+        self.assertTrue(store.save())
+        reloaded = todo_app.TaskStore(store.data_file)
+        reloaded.load()
+        self.assertEqual(reloaded.tree.progress, store.tree.progress)
+        self.assertEqual(reloaded.tree.progress[root["id"]], [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
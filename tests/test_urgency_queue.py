@@ -0,0 +1,94 @@
+"""UrgencyQueue top-K against sorting every open task by urgency_score"""
+import random
+import unittest
+from datetime import date, datetime, timedelta
+
+import todo_app
+from tests.helpers import StoreTestCase
+
+
+def ranked_scores(store, k, today, accept=None):
+    """Scores of the `k` most urgent open tasks, found the slow way"""
+    scores = sorted(
+        (todo_app.urgency_score(t, today) for t in store.tasks
+         if not t["completed"] and (accept is None or accept(t))),
+        reverse=True
+    )
+    return scores[:k]
+
+
+class UrgencyQueueTest(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.today = date.today()
+        self.rng = random.Random(47)
+
+    def random_task(self, text):
+        rng = self.rng
+        due = None
+        if rng.random() < 0.6:
+            due = (self.today + timedelta(days=rng.randint(-40, 40))).strftime("%Y-%m-%d")
+        task = todo_app.new_task(
+            text, rng.choice(list(todo_app.URGENCY_PRIORITY)), due,
+            tags=["rare"] if rng.random() < 0.05 else []
+        )
+        created = datetime.now() - timedelta(days=rng.randint(0, 60))
+        task["created_at"] = created.isoformat()
+        return task
+
+    def check(self, k=todo_app.FOCUS_SIZE, today=None):
+        store = self.store
+        today = today or self.today
+        top = store.focus.top(k, store.by_id, today=today)
+        self.assertEqual([todo_app.urgency_score(t, today) for t in top], ranked_scores(store, k, today))
+        self.assertTrue(all(not t["completed"] for t in top))
+        return top
+
+    def test_new_day_rescores(self):
+        later = (self.today + timedelta(days=20)).strftime("%Y-%m-%d")
+        deadline = self.add("deadline", priority="LOW", due_date=later)
+        steady = self.add("steady", priority="MED")
+        self.assertEqual(self.check(), [steady, deadline])
+        # Sixteen days on, the deadline is inside URGENCY_DUE_WINDOW without any edit
+        rolled = self.today + timedelta(days=16)
+        self.assertEqual(self.check(today=rolled), [deadline, steady])
+        self.assertEqual(self.store.focus.today, rolled)
+        self.assertEqual(self.check(), [steady, deadline])
+
+    def test_ties_keep_a_stable_order(self):
+        created = datetime.now().isoformat()
+        tied = []
+        for step in range(6):
+            task = todo_app.new_task(f"task {step}", "HIGH")
+            task["created_at"] = created
+            tied.append(self.store.add(task))
+        first = self.check(k=4)
+        self.assertEqual(len({t["id"] for t in first}), 4)
+        # Reading puts the popped entries back, so the next read agrees
+        self.assertEqual(self.check(k=4), first)
+        self.assertEqual(self.check(), self.check())
+        self.store.toggle(first[0]["id"])
+        self.assertEqual(self.check(k=3), first[1:])
+        self.assertEqual(len(self.store.focus.live), 5)
+
+    def test_narrow_filter_falls_back_to_candidates(self):
+        store = self.store
+        for step in range(3 * todo_app.FOCUS_SCAN_LIMIT):
+            task = self.random_task(f"task {step}")
+            task["tags"] = ["rare"] if step % 100 == 0 else []
+            store.add(task)
+        plan = todo_app.compile_query("is:open tag:rare", self.today)
+        accept = lambda t: plan.matches(t, store.tag_index)
+        expected = ranked_scores(store, todo_app.FOCUS_SIZE, self.today, accept)
+        queue = store.focus
+        for candidates in (None, lambda: plan.run(store)):
+            top = store.most_urgent(todo_app.FOCUS_SIZE, accept, candidates)
+            self.assertEqual([todo_app.urgency_score(t, self.today) for t in top], expected)
+            self.assertTrue(all("rare" in t["tags"] for t in top))
+            # Live entries popped during the scan all went back
+            live = {entry[2] for entry in queue.heap if queue.live.get(entry[2]) == entry[1]}
+            self.assertEqual(live, set(queue.live))
+
+
+if __name__ == "__main__":
+    unittest.main()
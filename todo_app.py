@@ -1,9 +1,33 @@
 import customtkinter as ctk
-from datetime import datetime, date
+from tkinter import filedialog
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from datetime import datetime, date, timedelta
+from http import HTTPStatus
+from itertools import chain, count, islice
+from urllib.parse import parse_qs, unquote, urlsplit
+import argparse
+import asyncio
+import bisect
+import calendar
+import csv
+import gzip
+import hashlib
+import heapq
 import json
 import os
+import queue
 import random
+import re
+import socket
+import stat
+import tempfile
 import threading
+import time
+import tkinter
+import tkinter.font
+import zlib
 
 # Try to import winsound for sound effects (Windows only)
 try:
@@ -28,6 +52,7 @@ COLOR_CARD = "#050505"
 COLOR_ACCENT = "#00FF41"
 COLOR_DIM = "#008F11"
 COLOR_BORDER = "#003B00"
+COLOR_SELECTED = "#002200"
 
 # Aesthetic Neon Colors
 COLOR_HIGH = "#FF0F55"  # Neon Red/Pink
@@ -37,6 +62,120 @@ COLOR_NONE = "#008F11"  # Standard Matrix Green
 
 FONT_MONO = "Consolas"
 
+# Bulk import/export
+TASK_FIELDS = [
+    "id", "text", "completed", "priority", "due_date", "created_at", "completed_at", "recurrence", "tags",
+    "parent", "blocked_by"
+]
+IMPORT_BATCH_SIZE = 500
+IMPORT_WARN_LIMIT = 20     # rows whose dropped values are printed; the rest are only counted
+
+# Task store change tracking
+CHANGE_LOG_SIZE = 10000
+UNDO_LIMIT = 100
+NOTICE_MS = 4000
+
+# Productivity rollups: daily buckets, time-to-complete histogram bounds in hours
+STATS_DAYS = 14
+TTC_BUCKETS = [1, 4, 12, 24, 72, 168, 720]
+TTC_LABELS = ["<1H", "<4H", "<12H", "<1D", "<3D", "<1W", "<30D", "30D+"]
+SPARK_LEVELS = "_.-:=+*#%@"
+
+# Mini mode: a one-line quick-add window; reminders keep running without the list
+MINI_GEOMETRY = "440x84"
+REMINDER_INTERVAL_MS = 60 * 1000
+
+# Rolling backups: chunk size in tasks, how often to check, and how many to keep
+BACKUP_CHUNK_TASKS = 64
+BACKUP_INTERVAL_MS = 10 * 60 * 1000
+BACKUP_RETENTION = [("%Y%m%d%H", 24), ("%Y%m%d", 7), ("%G%V", 8)]  # hourly, daily, weekly
+BACKUP_KEEP_RECENT = 5   # the newest few are always kept (e.g. the one taken before a restore)
+
+# Read-only snapshots of the task list: tasks per copy-on-write chunk
+SNAPSHOT_CHUNK = 128
+
+# Sharded storage (python todo_app.py --shards N); small lists load shards serially
+SHARD_PARALLEL_MIN_BYTES = 4 * 1024 * 1024
+
+# Named task lists (workspaces); only the most recently used stay loaded
+DEFAULT_WORKSPACE = "main"
+WORKSPACE_CACHE_SIZE = 3
+WORKSPACE_NAME = re.compile(r"[a-z0-9][a-z0-9_-]{0,31}")
+NEW_WORKSPACE_LABEL = "+ NEW LIST"
+
+# Cold archive of old completed tasks
+ARCHIVE_AFTER_DAYS = 30
+ARCHIVE_PAGE_SIZE = 50
+ARCHIVE_SEGMENT_EXT = ".jsonl.gz"
+
+# Repeat rules accepted by parse_recurrence
+RECURRENCE_HINT = "daily | weekly | every N days | monthly 15"
+
+# Search queries: compiled plans kept for reuse, and the query each filter tab adds
+QUERY_CACHE_SIZE = 256
+FILTER_QUERIES = {
+    "all": "",
+    "pending": "is:open",
+    "completed": "is:done",
+    "high": "is:open priority:HIGH",
+    "overdue": "is:overdue",
+    "next": "is:open -is:blocked",
+    "focus": "is:open -is:blocked",    # then ranked by urgency, see UrgencyQueue
+}
+
+# FOCUS tab: the FOCUS_SIZE most urgent open tasks. Urgency adds the priority
+# weight, half a point per day once a due date is within URGENCY_DUE_WINDOW
+# days (still growing while overdue, up to twice that), and a tenth of a
+# point per day of age up to URGENCY_AGE_CAP days.
+FOCUS_SIZE = 10
+URGENCY_PRIORITY = {"HIGH": 8.0, "MED": 4.0, "LOW": 2.0, "NONE": 0.0}
+URGENCY_DUE_WINDOW = 14
+URGENCY_AGE_CAP = 30
+# A FOCUS read pops at most this many heap entries before it gives up on the
+# heap and ranks the query's own candidates instead (a narrow tag or search)
+FOCUS_SCAN_LIMIT = 256
+
+# Fuzzy search: trigram prefilter keeps FUZZY_CANDIDATES, the best FUZZY_RESULTS are shown
+FUZZY_CANDIDATES = 300
+FUZZY_RESULTS = 50
+FUZZY_MIN_OVERLAP = 4    # candidates share at least 1/4 of the query's trigrams
+FUZZY_MIN_SCORE = 0.5
+
+# Subtasks: indent per nesting level, in pixels
+ROW_INDENT = 20
+
+# Tag chips shown under the filter tabs (most used first)
+TAG_CHIP_LIMIT = 8
+
+# Quick due dates offered for selected tasks (label, days from today; -1 clears)
+BATCH_DUE_OPTIONS = [("TODAY", 0), ("+1 DAY", 1), ("+7 DAYS", 7), ("CLEAR", -1)]
+
+# Sync with other replicas (the web front-end)
+DESKTOP_REPLICA = "desktop"
+SYNC_FIELDS = ("text", "completed", "completed_at", "priority", "due_date", "created_at")
+TOMBSTONE_TTL_DAYS = 30
+
+# Local JSON API (opt-in with --api)
+API_HOST = "127.0.0.1"
+API_PORT = 8765
+API_MAX_BODY = 1024 * 1024
+API_SAVE_DELAY = 0.5  # seconds; bursts of API writes share one save
+API_POLL_MS = 250     # how often the UI checks for changes made over the API
+
+# Single instance: later launches hand their command to the running one over a
+# Unix domain socket (not on platforms without AF_UNIX)
+INSTANCE_TIMEOUT = 10.0        # seconds a launch waits for the running instance to answer
+INSTANCE_MAX_MESSAGE = 64 * 1024
+
+# Background jobs: worker threads, priorities (lower runs first) and result delivery
+JOB_WORKERS = 4
+JOB_INTERACTIVE = 0   # the user is waiting on it (saves, loading a list, import)
+JOB_BACKGROUND = 10   # nobody is waiting (backups, notifications)
+JOB_PUMP_MS = 30      # how often finished jobs are handed back to the Tk thread
+JOB_PUMP_IDLE_MS = 500  # the same in mini mode, where nobody is watching closely
+JOB_LATENCY_SAMPLES = 200
+JOB_SLOW_MS = 500     # interactive jobs that wait longer than this in the queue are logged
+
 # Priority config with "Pulse" target colors (brighter versions)
 PRIORITIES = {
     "HIGH": {"color": COLOR_HIGH, "pulse": "#FF80A0", "label": "HIGH"},
@@ -44,6 +183,7 @@ PRIORITIES = {
     "LOW": {"color": COLOR_LOW, "pulse": "#AAFFFF", "label": "LOW"},
     "NONE": {"color": COLOR_NONE, "pulse": COLOR_ACCENT, "label": "NONE"}
 }
+PRIORITY_RANK = {"HIGH": 0, "MED": 1, "LOW": 2, "NONE": 3}
 
 def hex_to_rgb(hex_color):
     hex_color = hex_color.lstrip('#')
@@ -63,6 +203,54 @@ def interpolate_color(c1, c2, t):
         return c1
 
 
+def row_render_key(task):
+    """What a rendered row depends on: the task's version, and the date for overdue styling"""
+    return (task.get("version"), date.today().toordinal())
+
+
+def row_meta_parts(task, is_overdue, waiting=0):
+    """The pieces of a row's metadata line (created, due, tags, repeat, blockers, completed)"""
+    meta_parts = []
+    
+    # Created timestamp
+    created = task.get("created_at", "")
+    if created:
+        try:
+            dt = datetime.fromisoformat(created)
+            meta_parts.append(f"CREATED: {dt.strftime('%Y-%m-%d %H:%M')}")
+        except:
+            pass
+    
+    # Due date
+    due_date = task.get("due_date")
+    if due_date:
+        due_text = f"DUE: {due_date}"
+        if is_overdue:
+            due_text += " [OVERDUE]"
+        meta_parts.append(due_text)
+    
+    # Tags
+    if task.get("tags"):
+        meta_parts.append(" ".join(f"#{tag}" for tag in task["tags"]))
+    
+    # Repeat rule
+    if task.get("recurrence"):
+        meta_parts.append(f"REPEAT: {task['recurrence'].upper()}")
+    
+    # Unfinished tasks this one waits on
+    if waiting:
+        meta_parts.append(f"WAITING ON {waiting}")
+    
+    # Completed timestamp
+    if task["completed"] and task.get("completed_at"):
+        try:
+            dt = datetime.fromisoformat(task["completed_at"])
+            meta_parts.append(f"COMPLETED: {dt.strftime('%Y-%m-%d %H:%M')}")
+        except:
+            pass
+    return meta_parts
+
+
 def play_sound(sound_type="click"):
     """Play Matrix-style beep sounds"""
     if not SOUND_AVAILABLE:
@@ -105,13 +293,14 @@ class MatrixButton(ctk.CTkButton):
 
 
 class EditDialog(ctk.CTkToplevel):
-    def __init__(self, parent, task_data, on_save):
+    def __init__(self, parent, task_data, on_save, parent_text=None):
         super().__init__(parent)
         self.task_data = task_data.copy()
         self.on_save = on_save
+        self.parent_id = task_data.get("parent")
         
         self.title("EDIT_PROTOCOL")
-        self.geometry("500x420")
+        self.geometry("500x640" if self.parent_id else "500x580")
         self.configure(fg_color=COLOR_BG)
         self.resizable(False, False)
         
@@ -246,6 +435,79 @@ class EditDialog(ctk.CTkToplevel):
             )
             btn.pack(side="left", padx=(0, 5))
         
+        # Repeat rule
+        ctk.CTkLabel(
+            content,
+            text="> REPEAT:",
+            font=ctk.CTkFont(family=FONT_MONO, size=12),
+            text_color=COLOR_DIM
+        ).pack(anchor="w", pady=(10, 0))
+        
+        self.repeat_entry = ctk.CTkEntry(
+            content,
+            font=ctk.CTkFont(family=FONT_MONO, size=14),
+            height=38,
+            corner_radius=0,
+            border_width=1,
+            fg_color=COLOR_CARD,
+            border_color=COLOR_DIM,
+            text_color=COLOR_ACCENT,
+            placeholder_text=RECURRENCE_HINT
+        )
+        self.repeat_entry.pack(fill="x", pady=(8, 8))
+        if task_data.get("recurrence"):
+            self.repeat_entry.insert(0, task_data["recurrence"])
+        
+        # Tags
+        ctk.CTkLabel(
+            content,
+            text="> TAGS:",
+            font=ctk.CTkFont(family=FONT_MONO, size=12),
+            text_color=COLOR_DIM
+        ).pack(anchor="w", pady=(10, 0))
+        
+        self.tags_entry = ctk.CTkEntry(
+            content,
+            font=ctk.CTkFont(family=FONT_MONO, size=14),
+            height=38,
+            corner_radius=0,
+            border_width=1,
+            fg_color=COLOR_CARD,
+            border_color=COLOR_DIM,
+            text_color=COLOR_ACCENT,
+            placeholder_text="#work #home"
+        )
+        self.tags_entry.pack(fill="x", pady=(8, 8))
+        if task_data.get("tags"):
+            self.tags_entry.insert(0, " ".join(f"#{tag}" for tag in task_data["tags"]))
+        
+        # Parent task, with a way out to the top level
+        if self.parent_id:
+            parent_frame = ctk.CTkFrame(content, fg_color="transparent")
+            parent_frame.pack(fill="x", pady=(10, 0))
+            self.parent_label = ctk.CTkLabel(
+                parent_frame,
+                text=f"> SUBTASK OF: {(parent_text or self.parent_id)[:28]}",
+                font=ctk.CTkFont(family=FONT_MONO, size=12),
+                text_color=COLOR_DIM
+            )
+            self.parent_label.pack(side="left")
+            self.unnest_btn = ctk.CTkButton(
+                parent_frame,
+                text="UNNEST",
+                width=70,
+                height=30,
+                corner_radius=0,
+                font=ctk.CTkFont(family=FONT_MONO, size=10),
+                fg_color=COLOR_CARD,
+                text_color=COLOR_DIM,
+                border_width=1,
+                border_color=COLOR_BORDER,
+                hover_color=COLOR_DIM,
+                command=self._unnest
+            )
+            self.unnest_btn.pack(side="right")
+        
         # Spacer
         ctk.CTkFrame(content, fg_color="transparent", height=20).pack(fill="x")
         
@@ -284,6 +546,11 @@ class EditDialog(ctk.CTkToplevel):
                 text_color=COLOR_BG if is_selected else p_config["color"]
             )
     
+    def _unnest(self):
+        self.parent_id = None
+        self.parent_label.configure(text="> TOP LEVEL TASK", text_color=COLOR_ACCENT)
+        self.unnest_btn.configure(state="disabled")
+    
     def _set_quick_date(self, days):
         self.due_entry.delete(0, "end")
         if days >= 0:
@@ -304,11 +571,20 @@ class EditDialog(ctk.CTkToplevel):
             except ValueError:
                 due_date = ""
         
+        try:
+            recurrence = parse_recurrence(self.repeat_entry.get())
+        except ValueError:
+            self.repeat_entry.configure(border_color=COLOR_HIGH)
+            return
+        
         self.on_save(
             self.task_data["id"],
             new_text,
             self.priority_var.get(),
-            due_date if due_date else None
+            due_date if due_date else None,
+            recurrence,
+            normalize_tags(self.tags_entry.get()),
+            self.parent_id
         )
         self.destroy()
 
@@ -395,13 +671,20 @@ class ConfirmDialog(ctk.CTkToplevel):
 
 
 class TaskItem(ctk.CTkFrame):
-    def __init__(self, parent, task_data, on_toggle, on_delete, on_edit, **kwargs):
+    def __init__(self, parent, task_data, on_toggle, on_delete, on_edit, on_select=None,
+                 context=None, on_expand=None, **kwargs):
         super().__init__(parent, **kwargs)
         
         self.task_data = task_data
         self.on_toggle = on_toggle
         self.on_delete = on_delete
         self.on_edit = on_edit
+        self.on_select = on_select
+        self.selected = False
+        # Rows are rebuilt only when this changes (see ToDoApp.render_tasks);
+        # `context` is (depth, (done, total) or None, expanded or None, waiting)
+        self.render_key = (row_render_key(task_data), context)
+        depth, progress, expanded, waiting = context or (0, None, None, 0)
         
         is_done = task_data["completed"]
         priority = task_data.get("priority", "NONE")
@@ -440,9 +723,21 @@ class TaskItem(ctk.CTkFrame):
             border_color=self.base_color if not is_done else "#001100"
         )
         
-        # Main row
+        # Main row (subtasks are indented under their parent)
         main_row = ctk.CTkFrame(self, fg_color="transparent")
-        main_row.pack(fill="x", padx=10, pady=(10, 5))
+        main_row.pack(fill="x", padx=(10 + depth * ROW_INDENT, 10), pady=(10, 5))
+        
+        # Expand/collapse for tasks with subtasks
+        if expanded is not None:
+            expand_label = ctk.CTkLabel(
+                main_row,
+                text="▾" if expanded else "▸",
+                font=ctk.CTkFont(family=FONT_MONO, size=14, weight="bold"),
+                text_color=COLOR_ACCENT,
+                width=16
+            )
+            expand_label.pack(side="left", padx=(0, 4))
+            expand_label.bind("<Button-1>", lambda e: on_expand(task_data["id"]))
         
         # Checkbox
         self.status_label = ctk.CTkLabel(
@@ -466,6 +761,15 @@ class TaskItem(ctk.CTkFrame):
                 width=50
             ).pack(side="left", padx=(0, 8))
         
+        # Subtask progress
+        if progress is not None:
+            ctk.CTkLabel(
+                main_row,
+                text=f"{progress[0]}/{progress[1]}",
+                font=ctk.CTkFont(family=FONT_MONO, size=10, weight="bold"),
+                text_color=COLOR_ACCENT if progress[0] == progress[1] else COLOR_MED,
+            ).pack(side="left", padx=(0, 8))
+        
         # Task text
         text_color = COLOR_DIM if is_done else COLOR_ACCENT
         self.task_label = ctk.CTkLabel(
@@ -477,22 +781,23 @@ class TaskItem(ctk.CTkFrame):
         )
         self.task_label.pack(side="left", fill="x", expand=True)
         
-        # Edit button
-        self.edit_btn = ctk.CTkButton(
-            main_row,
-            text="EDIT",
-            width=40,
-            height=24,
-            corner_radius=0,
-            fg_color="transparent",
-            text_color=COLOR_DIM,
-            border_width=1,
-            border_color=COLOR_BORDER,
-            hover_color="#001122",
-            font=ctk.CTkFont(family=FONT_MONO, size=10),
-            command=self._on_edit
-        )
-        self.edit_btn.pack(side="right", padx=(5, 0))
+        # Edit button (archived rows are read-only)
+        if on_edit is not None:
+            self.edit_btn = ctk.CTkButton(
+                main_row,
+                text="EDIT",
+                width=40,
+                height=24,
+                corner_radius=0,
+                fg_color="transparent",
+                text_color=COLOR_DIM,
+                border_width=1,
+                border_color=COLOR_BORDER,
+                hover_color="#001122",
+                font=ctk.CTkFont(family=FONT_MONO, size=10),
+                command=self._on_edit
+            )
+            self.edit_btn.pack(side="right", padx=(5, 0))
         
         # Delete button
         self.delete_btn = ctk.CTkButton(
@@ -515,31 +820,7 @@ class TaskItem(ctk.CTkFrame):
         meta_row = ctk.CTkFrame(self, fg_color="transparent")
         meta_row.pack(fill="x", padx=10, pady=(0, 8))
         
-        meta_parts = []
-        
-        # Created timestamp
-        created = task_data.get("created_at", "")
-        if created:
-            try:
-                dt = datetime.fromisoformat(created)
-                meta_parts.append(f"CREATED: {dt.strftime('%Y-%m-%d %H:%M')}")
-            except:
-                pass
-        
-        # Due date
-        if due_date:
-            due_text = f"DUE: {due_date}"
-            if self.is_overdue:
-                due_text += " [OVERDUE]"
-            meta_parts.append(due_text)
-        
-        # Completed timestamp
-        if is_done and task_data.get("completed_at"):
-            try:
-                dt = datetime.fromisoformat(task_data["completed_at"])
-                meta_parts.append(f"COMPLETED: {dt.strftime('%Y-%m-%d %H:%M')}")
-            except:
-                pass
+        meta_parts = row_meta_parts(task_data, self.is_overdue, waiting)
         
         if meta_parts:
             meta_color = COLOR_HIGH if self.is_overdue else "#004400"
@@ -549,7 +830,7 @@ class TaskItem(ctk.CTkFrame):
                 font=ctk.CTkFont(family=FONT_MONO, size=9),
                 text_color=meta_color,
                 anchor="w"
-            ).pack(side="left", padx=(50, 0))
+            ).pack(side="left", padx=(50 + depth * ROW_INDENT, 0))
         
         # Hover effects
         self.bind("<Enter>", self._on_enter)
@@ -557,6 +838,10 @@ class TaskItem(ctk.CTkFrame):
         self.task_label.bind("<Enter>", self._on_enter)
         self.task_label.bind("<Leave>", self._on_leave)
         
+        # Click (with Shift/Ctrl) to select
+        for widget in (self, main_row, self.task_label, meta_row):
+            widget.bind("<Button-1>", self._on_click)
+        
         # Start animation if needed
         if self.pulse_target and not is_done:
             self.anim_running = True
@@ -602,6 +887,16 @@ class TaskItem(ctk.CTkFrame):
             else:
                 self.configure(border_color=self.base_color)
 
+    def set_selected(self, selected):
+        if selected == self.selected:
+            return
+        self.selected = selected
+        self.configure(fg_color=COLOR_SELECTED if selected else COLOR_CARD)
+
+    def _on_click(self, e):
+        if self.on_select:
+            self.on_select(self.task_data["id"], shift=bool(e.state & 0x0001), ctrl=bool(e.state & 0x0004))
+
     def _on_toggle(self):
         self.on_toggle(self.task_data["id"])
     
@@ -612,6 +907,276 @@ class TaskItem(ctk.CTkFrame):
         self.on_edit(self.task_data)
 
 
+class CanvasTaskItem(tkinter.Canvas):
+    """TaskItem drawn on a single Canvas instead of a dozen widgets.
+
+    Same interface as TaskItem (task_data, render_key, set_selected, pack,
+    destroy), so ToDoApp.render_tasks can cache and pack either. The
+    checkbox, EDIT and DEL are drawn items; clicks are hit-tested against
+    their boxes, and anything else on the row selects it.
+    """
+    PAD = 10
+    MAIN_HEIGHT = 28
+    META_HEIGHT = 16
+    BUTTON_WIDTH = 40
+    BUTTON_HEIGHT = 24
+    char_width = None   # of the task text font, measured by the first row
+    
+    def __init__(self, parent, task_data, on_toggle, on_delete, on_edit, on_select=None,
+                 context=None, on_expand=None, **kwargs):
+        is_done = task_data["completed"]
+        priority = task_data.get("priority", "NONE")
+        depth, progress, expanded, waiting = context or (0, None, None, 0)
+        self.is_overdue = is_overdue(task_data)
+        meta_parts = row_meta_parts(task_data, self.is_overdue, waiting)
+        height = self.PAD + self.MAIN_HEIGHT + 5 + (self.META_HEIGHT + 8 if meta_parts else 5)
+        super().__init__(
+            parent, height=height, width=200, bg=COLOR_CARD, highlightthickness=0, bd=0, **kwargs
+        )
+        
+        self.task_data = task_data
+        self.on_toggle = on_toggle
+        self.on_delete = on_delete
+        self.on_edit = on_edit
+        self.on_select = on_select
+        self.selected = False
+        self.render_key = (row_render_key(task_data), context)
+        self.indent = depth * ROW_INDENT
+        self.left = self.indent + self.PAD + (20 if expanded is not None else 0)
+        self.row_height = height
+        self.hot = None          # button under the pointer ("edit" / "del")
+        self.hit_boxes = {}      # name -> (x0, y0, x1, y1), refreshed on resize
+        
+        # Determine colors
+        self.base_color = COLOR_BORDER
+        self.pulse_target = None
+        if self.is_overdue:
+            self.base_color = PRIORITIES["HIGH"]["color"]
+            self.pulse_target = PRIORITIES["HIGH"]["pulse"]
+        elif priority != "NONE" and not is_done:
+            self.base_color = PRIORITIES[priority]["color"]
+            self.pulse_target = PRIORITIES[priority]["pulse"]
+        
+        # Animation state
+        self.pulse_phase = 0.0
+        self.pulse_direction = 1
+        self.anim_running = False
+        self.anim_job = None
+        
+        mid = self.PAD + self.MAIN_HEIGHT // 2
+        self.border = self.create_rectangle(
+            0, 0, 1, 1, outline=self.base_color if not is_done else "#001100"
+        )
+        self.on_expand = on_expand
+        if expanded is not None:
+            self.create_text(
+                self.indent + self.PAD, mid,
+                text="▾" if expanded else "▸",
+                font=(FONT_MONO, 14, "bold"),
+                fill=COLOR_ACCENT,
+                anchor="w"
+            )
+        self.status = self.create_text(
+            self.left, mid,
+            text="[X]" if is_done else "[ ]",
+            font=(FONT_MONO, 16, "bold"),
+            fill=COLOR_ACCENT if is_done else COLOR_DIM,
+            anchor="w"
+        )
+        x = self.left + 50
+        if priority != "NONE":
+            p_config = PRIORITIES[priority]
+            self.create_text(
+                x, mid,
+                text=f"[{p_config['label']}]",
+                font=(FONT_MONO, 10, "bold"),
+                fill=p_config["color"] if not is_done else COLOR_DIM,
+                anchor="w"
+            )
+            x += 58
+        if progress is not None:
+            self.create_text(
+                x, mid,
+                text=f"{progress[0]}/{progress[1]}",
+                font=(FONT_MONO, 10, "bold"),
+                fill=COLOR_ACCENT if progress[0] == progress[1] else COLOR_MED,
+                anchor="w"
+            )
+            x += 12 + 8 * len(f"{progress[0]}/{progress[1]}")
+        self.text_x = x
+        self.shown_text = task_data["text"]
+        self.text_item = self.create_text(
+            x, mid,
+            text=self.shown_text,
+            font=(FONT_MONO, 14),
+            fill=COLOR_DIM if is_done else COLOR_ACCENT,
+            anchor="w"
+        )
+        if CanvasTaskItem.char_width is None:
+            CanvasTaskItem.char_width = tkinter.font.Font(self, font=(FONT_MONO, 14)).measure("0")
+        if meta_parts:
+            self.create_text(
+                self.left + 50, self.PAD + self.MAIN_HEIGHT + 5 + self.META_HEIGHT // 2,
+                text="  |  ".join(meta_parts),
+                font=(FONT_MONO, 9),
+                fill=COLOR_HIGH if self.is_overdue else "#004400",
+                anchor="w"
+            )
+        
+        # Buttons go on top of the text; _layout cuts long texts short of them
+        self.buttons = {}
+        names = ["edit", "del"] if on_edit is not None else ["del"]
+        for name in names:
+            box = self.create_rectangle(0, 0, 1, 1, fill=COLOR_CARD, outline=COLOR_BORDER)
+            label = self.create_text(
+                0, mid, text=name.upper(), font=(FONT_MONO, 10), fill=COLOR_DIM
+            )
+            self.buttons[name] = (box, label)
+        
+        self.bind("<Configure>", self._layout)
+        self.bind("<Enter>", self._on_enter)
+        self.bind("<Leave>", self._on_leave)
+        self.bind("<Motion>", self._on_motion)
+        self.bind("<Button-1>", self._on_click)
+        
+        if self.pulse_target and not is_done:
+            self.anim_running = True
+            self.animate_border()
+    
+    def _layout(self, e):
+        """Pin the border and the buttons to the row's current width"""
+        width = e.width
+        self.coords(self.border, 0, 0, width - 1, self.row_height - 1)
+        y0 = self.PAD + (self.MAIN_HEIGHT - self.BUTTON_HEIGHT) // 2
+        right = width - self.PAD
+        for name in ("del", "edit"):
+            if name not in self.buttons:
+                continue
+            box, label = self.buttons[name]
+            x0 = right - self.BUTTON_WIDTH
+            self.coords(box, x0, y0, right, y0 + self.BUTTON_HEIGHT)
+            self.coords(label, (x0 + right) // 2, y0 + self.BUTTON_HEIGHT // 2)
+            self.hit_boxes[name] = (x0, y0, right, y0 + self.BUTTON_HEIGHT)
+            right = x0 - 5
+        self._fit_text(right - 5 - self.text_x)
+        self.hit_boxes["check"] = (self.left, self.PAD, self.left + 40, self.PAD + self.MAIN_HEIGHT)
+        if self.left > self.indent + self.PAD:
+            self.hit_boxes["expand"] = (
+                self.indent + self.PAD, self.PAD, self.left - 1, self.PAD + self.MAIN_HEIGHT
+            )
+    
+    def _fit_text(self, room):
+        """Cut the task text down to `room` pixels, ending it with "…" if it had to shrink"""
+        text = self.task_data["text"]
+        fits = max(room, 0) // max(self.char_width or 1, 1)
+        if len(text) > fits:
+            text = text[:max(fits - 1, 0)] + "…" if fits else ""
+        if text != self.shown_text:
+            self.shown_text = text
+            self.itemconfigure(self.text_item, text=text)
+    
+    def hit_test(self, x, y):
+        """Which control is at (x, y): "check", "expand", "edit", "del" or None"""
+        for name, (x0, y0, x1, y1) in self.hit_boxes.items():
+            if x0 <= x <= x1 and y0 <= y <= y1:
+                return name
+        return None
+    
+    def animate_border(self):
+        if not self.anim_running or not self.winfo_exists():
+            return
+        step = 0.05
+        if self.pulse_direction == 1:
+            self.pulse_phase += step
+            if self.pulse_phase >= 1.0:
+                self.pulse_phase = 1.0
+                self.pulse_direction = -1
+        else:
+            self.pulse_phase -= step
+            if self.pulse_phase <= 0.0:
+                self.pulse_phase = 0.0
+                self.pulse_direction = 1
+        # One item recolor per frame, no widget reconfigure
+        self.itemconfigure(
+            self.border, outline=interpolate_color(self.base_color, self.pulse_target, self.pulse_phase)
+        )
+        self.anim_job = self.after(50, self.animate_border)
+    
+    def _stop_animation(self):
+        self.anim_running = False
+        if self.anim_job is not None:
+            self.after_cancel(self.anim_job)
+            self.anim_job = None
+    
+    def destroy(self):
+        self._stop_animation()
+        super().destroy()
+    
+    def _on_enter(self, e=None):
+        if not self.task_data["completed"]:
+            self._stop_animation()  # Pause animation on hover
+            self.itemconfigure(self.border, outline=COLOR_ACCENT)
+            self.itemconfigure(self.status, fill=COLOR_ACCENT)
+    
+    def _on_leave(self, e=None):
+        self._set_hot(None)
+        if not self.task_data["completed"]:
+            self.itemconfigure(self.status, fill=COLOR_DIM)
+            if self.pulse_target:
+                # Restart from a clean slate: a Leave without a matching Enter
+                # would otherwise leave two frame loops running
+                self._stop_animation()
+                self.anim_running = True
+                self.animate_border()
+            else:
+                self.itemconfigure(self.border, outline=self.base_color)
+    
+    def _on_motion(self, e):
+        hit = self.hit_test(e.x, e.y)
+        self._set_hot(hit if hit in self.buttons else None)
+    
+    def _set_hot(self, name):
+        if name == self.hot:
+            return
+        for button, hover in ((self.hot, False), (name, True)):
+            if button is None:
+                continue
+            box, label = self.buttons[button]
+            fill = {"edit": "#001122", "del": "#220000"}[button] if hover else self._bg()
+            self.itemconfigure(box, fill=fill, outline=COLOR_DIM if hover else COLOR_BORDER)
+            self.itemconfigure(label, fill=COLOR_ACCENT if hover else COLOR_DIM)
+        self.hot = name
+    
+    def _bg(self):
+        return COLOR_SELECTED if self.selected else COLOR_CARD
+    
+    def set_selected(self, selected):
+        if selected == self.selected:
+            return
+        self.selected = selected
+        self.configure(bg=self._bg())
+        for name, (box, _) in self.buttons.items():
+            if name != self.hot:
+                self.itemconfigure(box, fill=self._bg())
+    
+    def _on_click(self, e):
+        hit = self.hit_test(e.x, e.y)
+        if hit == "check":
+            self.on_toggle(self.task_data["id"])
+        elif hit == "edit":
+            self.on_edit(self.task_data)
+        elif hit == "del":
+            self.on_delete(self.task_data["id"])
+        elif hit == "expand":
+            self.on_expand(self.task_data["id"])
+        elif self.on_select:
+            self.on_select(self.task_data["id"], shift=bool(e.state & 0x0001), ctrl=bool(e.state & 0x0004))
+
+
+# Row renderers selectable with --rows
+ROW_RENDERERS = {"widgets": TaskItem, "canvas": CanvasTaskItem}
+
+
 class BootScreen(ctk.CTkToplevel):
     """Matrix-style boot animation"""
     def __init__(self, parent, on_complete):
@@ -695,12 +1260,21 @@ class BootScreen(ctk.CTkToplevel):
         self.on_complete()
 
 
-def check_overdue_notifications(tasks):
-    """Send Windows toast notification for overdue tasks"""
+def check_overdue_notifications(snapshot, jobs, skip=frozenset(), on_done=None):
+    """Send Windows toast notification for overdue tasks.
+
+    The scan and the toast run as a background job over a TaskSnapshot.
+    Tasks in `skip` (already announced) don't count; on_done gets the ids
+    of every overdue task.
+    """
     if not TOAST_AVAILABLE:
         return
-    
+    jobs.submit(_notify_overdue, snapshot, skip, priority=JOB_BACKGROUND, on_done=on_done)
+
+
+def _notify_overdue(token, tasks, skip):
     today = date.today()
+    overdue_ids = set()
     overdue_tasks = []
     
     for task in tasks:
@@ -711,7 +1285,9 @@ def check_overdue_notifications(tasks):
             try:
                 due_date = datetime.strptime(due, "%Y-%m-%d").date()
                 if due_date < today:
-                    overdue_tasks.append(task["text"][:40])
+                    overdue_ids.add(task["id"])
+                    if task["id"] not in skip:
+                        overdue_tasks.append(task["text"][:40])
             except:
                 pass
     
@@ -723,47 +1299,3427 @@ def check_overdue_notifications(tasks):
             msg = "\n".join(overdue_tasks[:3])
             if count > 3:
                 msg += f"\n...and {count - 3} more"
-            
-            # Run in thread to not block UI
-            threading.Thread(
-                target=lambda: toaster.show_toast(title, msg, duration=5, threaded=True),
-                daemon=True
-            ).start()
+            toaster.show_toast(title, msg, duration=5, threaded=True)
         except:
             pass
+    return overdue_ids
 
 
-class ToDoApp(ctk.CTk):
-    def __init__(self):
-        super().__init__()
-        
-        self.title("ZERETSU_TASKS_SYS_V2")
-        self.geometry("580x820")
-        self.minsize(500, 650)
-        self.configure(fg_color=COLOR_BG)
-        
-        # Data
-        self.data_file = os.path.join(os.path.dirname(__file__), "tasks.json")
-        self.tasks = self.load_tasks()
-        self.current_filter = "all"
-        self.search_query = ""
-        self.sound_enabled = True
-        
-        self.create_ui()
-        self.render_tasks()
-        self.setup_keybindings()
-    
-    def setup_keybindings(self):
-        """Setup keyboard shortcuts"""
-        self.bind("<Control-n>", lambda e: self.task_entry.focus())
-        self.bind("<Control-f>", lambda e: self.search_entry.focus())
-        self.bind("<Control-1>", lambda e: self.set_filter("all"))
-        self.bind("<Control-2>", lambda e: self.set_filter("pending"))
-        self.bind("<Control-3>", lambda e: self.set_filter("completed"))
-        self.bind("<Control-m>", lambda e: self.toggle_sound())
-    
-    def toggle_sound(self):
-        self.sound_enabled = not self.sound_enabled
+# Aliases used by other trackers, mapped onto our priority levels
+PRIORITY_ALIASES = {
+    "MEDIUM": "MED",
+    "NORMAL": "MED",
+    "URGENT": "HIGH",
+    "CRITICAL": "HIGH",
+    "H": "HIGH",
+    "M": "MED",
+    "L": "LOW",
+    "": "NONE",
+}
+
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%d/%m/%Y", "%d.%m.%Y")
+
+_last_task_id = 0.0
+
+
+def now_ms():
+    return int(datetime.now().timestamp() * 1000)
+
+
+def new_task_id():
+    """Timestamp id that stays unique even when tasks are created in a tight loop"""
+    global _last_task_id
+    ts = datetime.now().timestamp()
+    if ts <= _last_task_id:
+        ts = _last_task_id + 0.000001
+    _last_task_id = ts
+    return str(ts)
+
+
+def normalize_priority(value):
+    """Map a free-form priority onto HIGH/MED/LOW/NONE"""
+    key = str(value or "").strip().upper()
+    key = PRIORITY_ALIASES.get(key, key)
+    return key if key in PRIORITIES else "NONE"
+
+
+def new_task(text, priority="NONE", due_date=None, tags=None, parent=None,
+             recurrence=None, blocked_by=None):
+    """A fresh open task with every field of TASK_FIELDS filled in"""
+    return {
+        "id": new_task_id(),
+        "text": text,
+        "completed": False,
+        "priority": priority,
+        "due_date": due_date,
+        "created_at": datetime.now().isoformat(),
+        "completed_at": None,
+        "recurrence": recurrence,
+        "tags": tags or [],
+        "parent": parent,
+        "blocked_by": blocked_by or []
+    }
+
+
+def normalize_due_date(value):
+    """Return a YYYY-MM-DD string, or None if the value is not a usable date"""
+    if not value:
+        return None
+    value = str(value).strip()
+    # ISO timestamps: keep the date part only
+    if len(value) > 10 and value[4:5] == "-" and value[10:11] in ("T", " "):
+        value = value[:10]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    return None
+
+
+def normalize_timestamp(value):
+    """Return a local, naive ISO timestamp, or None if the value isn't one"""
+    if isinstance(value, str) and value.endswith("Z"):
+        # JavaScript's toISOString(); fromisoformat only takes "Z" from 3.11
+        value = value[:-1] + "+00:00"
+    try:
+        dt = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return dt.isoformat()
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or "").strip().lower() in ("1", "true", "yes", "y", "x", "done")
+
+
+def normalize_tags(value):
+    """Turn a list or a "#work, home" style string into lowercase tag names"""
+    if isinstance(value, str):
+        value = value.replace(",", " ").split()
+    tags = []
+    for tag in value or ():
+        tag = str(tag).strip().lstrip("#").lower()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def normalize_ids(value):
+    """Task ids from a list or a space/comma separated string, in order, without repeats"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.replace(",", " ").split()
+    return list(dict.fromkeys(str(v) for v in value if v))
+
+
+def split_tags(text):
+    """Pull #tags out of typed task text: returns (text without them, tags)"""
+    words = text.split()
+    tags = normalize_tags([w for w in words if w.startswith("#") and len(w) > 1])
+    rest = " ".join(w for w in words if not (w.startswith("#") and len(w) > 1))
+    return rest, tags
+
+
+def normalize_task(record, warnings=None):
+    """Validate an imported record and convert it to our task format.
+
+    Raises ValueError if the record cannot be turned into a task. A due
+    date, repeat rule or timestamp that can't be read is dropped (or
+    defaulted), and described in `warnings` if a list is given.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("record is not an object")
+
+    def unreadable(field, value, instead="left empty"):
+        if warnings is not None:
+            warnings.append(f"{field} {value!r} not understood, {instead}")
+
+    text = str(record.get("text") or record.get("title") or record.get("name") or "").strip()
+    if not text:
+        raise ValueError("record has no text")
+
+    completed = parse_bool(record.get("completed", record.get("done")))
+    raw_created = record.get("created_at") or record.get("createdAt")
+    created_at = normalize_timestamp(raw_created)
+    if created_at is None:
+        if raw_created:
+            unreadable("created_at", raw_created, "set to now")
+        created_at = datetime.now().isoformat()
+
+    completed_at = None
+    if completed:
+        completed_at = normalize_timestamp(record.get("completed_at"))
+        if completed_at is None:
+            if record.get("completed_at"):
+                unreadable("completed_at", record["completed_at"], "set to created_at")
+            completed_at = created_at
+
+    try:
+        recurrence = parse_recurrence(record.get("recurrence"))
+    except ValueError:
+        unreadable("recurrence", record.get("recurrence"))
+        recurrence = None
+
+    due_date = normalize_due_date(record.get("due_date"))
+    if due_date is None and record.get("due_date"):
+        unreadable("due_date", record["due_date"])
+
+    return {
+        "id": str(record.get("id") or new_task_id()),
+        "text": text,
+        "completed": completed,
+        "priority": normalize_priority(record.get("priority")),
+        "due_date": due_date,
+        "created_at": created_at,
+        "completed_at": completed_at,
+        "recurrence": recurrence,
+        "tags": normalize_tags(record.get("tags")),
+        "parent": str(record["parent"]) if record.get("parent") else None,
+        "blocked_by": normalize_ids(record.get("blocked_by"))
+    }
+
+
+def iter_csv_records(path):
+    """Yield raw records from a CSV file with a header row"""
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        yield from csv.DictReader(f)
+
+
+def iter_jsonl_records(path):
+    """Yield raw records from a JSON Lines file, one object per line"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                print(f"Skipping line {line_no} of {path}: {e}")
+
+
+def iter_import_records(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return iter_csv_records(path)
+    if ext in (".jsonl", ".ndjson"):
+        return iter_jsonl_records(path)
+    raise ValueError(f"Unsupported import format: {ext}")
+
+
+def iter_batches(iterable, size):
+    """Yield lists of up to `size` items without materializing the whole iterable"""
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_csv_tasks(tasks, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=TASK_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        count = 0
+        for task in tasks:
+            writer.writerow({
+                **task,
+                "tags": " ".join(task.get("tags") or ()),
+                "blocked_by": " ".join(task.get("blocked_by") or ())
+            })
+            count += 1
+    return count
+
+
+def write_jsonl_tasks(tasks, path):
+    with open(path, "w", encoding="utf-8") as f:
+        count = 0
+        for task in tasks:
+            f.write(json.dumps(task, ensure_ascii=False))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def export_tasks(tasks, path):
+    """Stream tasks to a CSV or JSON Lines file one record at a time.
+
+    Returns the number of records written.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return write_csv_tasks(tasks, path)
+    if ext in (".jsonl", ".ndjson"):
+        return write_jsonl_tasks(tasks, path)
+    raise ValueError(f"Unsupported export format: {ext}")
+
+
+def parse_recurrence(value):
+    """Normalize a repeat rule typed by the user.
+
+    Accepts "daily", "weekly", "every N days" and "monthly 15" (also
+    "monthly on 15"). Returns the canonical rule, None for no rule, or
+    raises ValueError.
+    """
+    words = [w for w in str(value or "").lower().split() if w != "on"]
+    if not words or words == ["none"]:
+        return None
+    if words in (["daily"], ["every", "day"]):
+        return "daily"
+    if words in (["weekly"], ["every", "week"]):
+        return "weekly"
+    if len(words) == 3 and words[0] == "every" and words[2] in ("day", "days") and words[1].isdigit():
+        n = int(words[1])
+        if n < 1:
+            raise ValueError("repeat interval must be at least 1 day")
+        return "daily" if n == 1 else f"every {n} days"
+    if len(words) == 2 and words[0] == "monthly" and words[1].isdigit():
+        day = int(words[1])
+        if not 1 <= day <= 31:
+            raise ValueError("monthly repeat needs a day from 1 to 31")
+        return f"monthly {day}"
+    raise ValueError(f"unknown repeat rule: {value} (try {RECURRENCE_HINT})")
+
+
+def iter_occurrences(rule, start):
+    """Yield the dates of a repeat rule from `start` on, without end.
+
+    Interval rules are anchored on `start`; "monthly X" falls on day X, or
+    the last day of shorter months.
+    """
+    kind, _, arg = rule.partition(" ")
+    if kind == "monthly":
+        day = int(arg)
+        year, month = start.year, start.month
+        while True:
+            occurrence = date(year, month, min(day, calendar.monthrange(year, month)[1]))
+            if occurrence >= start:
+                yield occurrence
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    step = timedelta(days={"daily": 1, "weekly": 7}.get(kind) or int(arg.split()[0]))
+    occurrence = start
+    while True:
+        yield occurrence
+        occurrence += step
+
+
+def next_occurrence(rule, due=None, today=None):
+    """Due date of the occurrence after one due on `due`.
+
+    Occurrences missed while the task sat overdue are skipped rather than
+    queued up, so a series never has more than one live task.
+    """
+    today = today or date.today()
+    anchor = due or today
+    return next(d for d in iter_occurrences(rule, anchor) if d > anchor and d >= today)
+
+
+FILTERS = ("all", "pending", "completed", "high", "overdue", "next", "focus")
+
+
+def is_overdue(task, today=None):
+    if task["completed"]:
+        return False
+    due = task.get("due_date")
+    if not due:
+        return False
+    try:
+        return datetime.strptime(due, "%Y-%m-%d").date() < (today or date.today())
+    except ValueError:
+        return False
+
+
+def urgency_score(task, today):
+    """How pressing an open task is on `today` (see FOCUS_SIZE for the formula)"""
+    score = URGENCY_PRIORITY.get(task.get("priority", "NONE"), 0.0)
+    try:
+        due = datetime.strptime(task.get("due_date") or "", "%Y-%m-%d").date()
+        days_left = (due - today).days
+        score += max(0, min(URGENCY_DUE_WINDOW - days_left, 2 * URGENCY_DUE_WINDOW)) * 0.5
+    except ValueError:
+        pass
+    try:
+        age = (today - datetime.fromisoformat(task.get("created_at") or "").date()).days
+        score += max(0, min(age, URGENCY_AGE_CAP)) * 0.1
+    except ValueError:
+        pass
+    return score
+
+
+def due_sort_key(task):
+    # Dated tasks first, earliest due on top
+    due = task.get("due_date")
+    return (0, due) if due else (1, "")
+
+
+def priority_sort_key(task):
+    return (PRIORITY_RANK.get(task.get("priority"), len(PRIORITY_RANK)),) + due_sort_key(task)
+
+
+def created_sort_key(task):
+    return (task.get("created_at") or "",)
+
+
+def completed_sort_key(task):
+    return (task.get("completed_at") or "",)
+
+
+# mode: (label, key function, newest first); "manual" is plain list order
+SORT_MODES = {
+    "manual": ("MANUAL", None, False),
+    "due": ("DUE DATE", due_sort_key, False),
+    "priority": ("PRIORITY", priority_sort_key, False),
+    "created": ("CREATED", created_sort_key, True),
+    "completed": ("COMPLETED", completed_sort_key, True),
+}
+
+
+class SortedIndex:
+    """Task ids kept in key order, so a sort mode is always ready to iterate.
+
+    Entries are (key, task_id) tuples in a list maintained with bisect: a
+    mutation moves one entry instead of re-sorting everything.
+    """
+    def __init__(self, key_func):
+        self.key_func = key_func
+        self.entries = []
+        self.keys = {}  # task_id -> key currently in entries
+
+    def rebuild(self, tasks):
+        self.keys = {t["id"]: self.key_func(t) for t in tasks}
+        self.entries = sorted((key, task_id) for task_id, key in self.keys.items())
+
+    def add_many(self, tasks):
+        """Merge a batch in with one pass instead of a bisect per task"""
+        new = []
+        for task in tasks:
+            self.discard(task["id"])
+            key = self.key_func(task)
+            self.keys[task["id"]] = key
+            new.append((key, task["id"]))
+        new.sort()
+        self.entries = list(heapq.merge(self.entries, new))
+
+    def update(self, task):
+        key = self.key_func(task)
+        old = self.keys.get(task["id"])
+        if old == key:
+            return
+        if old is not None:
+            self._delete(old, task["id"])
+        self.keys[task["id"]] = key
+        bisect.insort(self.entries, (key, task["id"]))
+
+    def discard(self, task_id):
+        old = self.keys.pop(task_id, None)
+        if old is not None:
+            self._delete(old, task_id)
+
+    def _delete(self, key, task_id):
+        del self.entries[bisect.bisect_left(self.entries, (key, task_id))]
+
+    def ids(self, reverse=False):
+        entries = reversed(self.entries) if reverse else self.entries
+        return (task_id for _, task_id in entries)
+
+    def span(self, lo, hi=None):
+        """Positions [start, stop) of the entries with lo <= key < hi"""
+        start = bisect.bisect_left(self.entries, (lo,))
+        stop = len(self.entries) if hi is None else bisect.bisect_left(self.entries, (hi,))
+        return start, max(start, stop)
+
+    def ids_between(self, start, stop):
+        return [task_id for _, task_id in self.entries[start:stop]]
+
+
+def slots_bitmap(slots):
+    """Integer bitmap with the given bit positions set"""
+    if not slots:
+        return 0
+    raw = bytearray(max(slots) // 8 + 1)
+    for slot in slots:
+        raw[slot >> 3] |= 1 << (slot & 7)
+    return int.from_bytes(raw, "little")
+
+
+class TagIndex:
+    """Tags and status flags as integer bitmaps over task slots.
+
+    Every live task owns a slot (reused after deletes); bit `slot` of a tag's
+    bitmap is set when the task carries that tag, and likewise for priorities,
+    completion and being blocked (set by the store's DependencyGraph). Filters then combine with &, | and ~ over whole bitmaps
+    instead of checking each task (see QueryPlan).
+    """
+    def __init__(self):
+        self.rebuild([])
+
+    def rebuild(self, tasks):
+        self.slots = {}    # task_id -> slot
+        self.slot_ids = [] # slot -> task_id (None when free)
+        self.free = []     # slots given back by deleted tasks
+        self.tags_of = {}  # task_id -> tags currently set in the bitmaps
+        # Collect slots per bitmap first: setting bits one by one on a big
+        # int copies it every time
+        tag_slots, priority_slots, completed_slots = {}, {}, []
+        for task in tasks:
+            task_id = task["id"]
+            if task_id in self.slots:
+                continue
+            slot = self.slots[task_id] = len(self.slot_ids)
+            self.slot_ids.append(task_id)
+            self.tags_of[task_id] = frozenset(task.get("tags") or ())
+            for tag in self.tags_of[task_id]:
+                tag_slots.setdefault(tag, []).append(slot)
+            priority_slots.setdefault(task.get("priority", "NONE"), []).append(slot)
+            if task["completed"]:
+                completed_slots.append(slot)
+        self.bits = {tag: slots_bitmap(slots) for tag, slots in tag_slots.items()}
+        self.priority = {p: slots_bitmap(slots) for p, slots in priority_slots.items()}
+        self.completed = slots_bitmap(completed_slots)
+        self.live = (1 << len(self.slot_ids)) - 1
+        self.blocked = 0
+        self.blocked_ids = set()
+
+    def update(self, task):
+        task_id = task["id"]
+        slot = self.slots.get(task_id)
+        if slot is None:
+            slot = self.free.pop() if self.free else len(self.slots)
+            self.slots[task_id] = slot
+            if slot == len(self.slot_ids):
+                self.slot_ids.append(task_id)
+            else:
+                self.slot_ids[slot] = task_id
+        bit = 1 << slot
+        self.live |= bit
+        self.completed = self.completed | bit if task["completed"] else self.completed & ~bit
+        for priority, bits in self.priority.items():
+            self.priority[priority] = bits & ~bit
+        priority = task.get("priority", "NONE")
+        self.priority[priority] = self.priority.get(priority, 0) | bit
+
+        new = frozenset(task.get("tags") or ())
+        old = self.tags_of.get(task_id, frozenset())
+        for tag in old - new:
+            self._clear(tag, bit)
+        for tag in new - old:
+            self.bits[tag] = self.bits.get(tag, 0) | bit
+        self.tags_of[task_id] = new
+
+    def discard(self, task_id):
+        slot = self.slots.pop(task_id, None)
+        if slot is None:
+            return
+        bit = 1 << slot
+        self.live &= ~bit
+        self.completed &= ~bit
+        self.blocked &= ~bit
+        self.blocked_ids.discard(task_id)
+        for priority, bits in self.priority.items():
+            self.priority[priority] = bits & ~bit
+        for tag in self.tags_of.pop(task_id):
+            self._clear(tag, bit)
+        self.slot_ids[slot] = None
+        self.free.append(slot)
+
+    def _clear(self, tag, bit):
+        remaining = self.bits[tag] & ~bit
+        if remaining:
+            self.bits[tag] = remaining
+        else:
+            del self.bits[tag]
+
+    def set_blocked(self, task_id, blocked):
+        slot = self.slots.get(task_id)
+        if slot is None:
+            return
+        if blocked:
+            self.blocked |= 1 << slot
+            self.blocked_ids.add(task_id)
+        else:
+            self.blocked &= ~(1 << slot)
+            self.blocked_ids.discard(task_id)
+
+    def counts(self):
+        """{tag: number of tasks}, most used first"""
+        counts = {tag: bits.bit_count() for tag, bits in self.bits.items()}
+        return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+    def bitmap(self, kind, value):
+        """Bitmap of tasks with a tag, a priority, or status open/done/blocked"""
+        if kind == "tag":
+            return self.bits.get(value, 0)
+        if kind == "priority":
+            return self.priority.get(value, 0)
+        if value == "blocked":
+            return self.blocked
+        return self.live & ~self.completed if value == "open" else self.completed
+
+    def ids_in(self, mask):
+        """Task ids whose bits are set, found a byte at a time"""
+        ids = []
+        for i, byte in enumerate(mask.to_bytes((mask.bit_length() + 7) // 8, "little")):
+            while byte:
+                low = byte & -byte
+                ids.append(self.slot_ids[i * 8 + low.bit_length() - 1])
+                byte ^= low
+        return ids
+
+    def selector(self, mask):
+        """Predicate for tasks in `mask`.
+
+        Shifting a big int per task would cost O(n) each, so the bitmap is
+        unpacked to bytes once and each test reads a single byte.
+        """
+        raw = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+        slots = self.slots
+
+        def selected(task):
+            slot = slots.get(task["id"])
+            if slot is None or slot >> 3 >= len(raw):
+                return False
+            return raw[slot >> 3] >> (slot & 7) & 1 == 1
+        return selected
+
+
+QUERY_TOKEN = re.compile(r'(-?)(?:"([^"]*)"|(\S+))')
+QUERY_CLAUSE = re.compile(r"^(\w+)(<=|>=|<|>|:|=)(.+)$")
+QUERY_STATUS = {
+    "open": "open", "pending": "open", "active": "open",
+    "done": "done", "completed": "done",
+    "overdue": "overdue", "recurring": "recurring",
+    "blocked": "blocked", "waiting": "blocked",
+}
+# Date fields a query can range over; each has a sort index of the same name
+QUERY_DATE_FIELDS = {"due": "due_date", "created": "created_at", "completed": "completed_at"}
+
+
+def parse_query_date(value, today):
+    special = {"today": 0, "tomorrow": 1, "yesterday": -1}
+    if value in special:
+        return (today + timedelta(days=special[value])).strftime("%Y-%m-%d")
+    parsed = normalize_due_date(value)
+    if parsed is None:
+        raise ValueError(f"not a date: {value}")
+    return parsed
+
+
+def next_day(value):
+    return (datetime.strptime(value, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+class QueryPlan:
+    """A search query parsed once into clauses that can run against a TaskStore.
+
+        priority:HIGH  p:high,med    is:open|done|overdue|recurring
+        is:blocked (waiting on an unfinished task)
+        tag:work  #work  tag:a,b     due<2026-11-01  due>=today  due:none
+        created:2026-10-19           "exact phrase"  words
+        -anything                    negates a clause
+
+    Clauses fall into three groups. Priority, status and tag clauses become
+    one bitmap from the store's TagIndex. Date ranges are answered by bisecting
+    the matching sort index. Negated ranges, text and other leftovers run as
+    residual per-task checks. The smallest candidate set drives the scan,
+    cheapest checks go first, and text matching goes last.
+    """
+    def __init__(self, query, today):
+        self.bitmaps = []    # (kind, values, negate)
+        self.ranges = []     # (index mode, lo key, hi key, predicate)
+        self.residuals = []  # predicates, cheapest first
+        texts = []
+        for negate, phrase, word in QUERY_TOKEN.findall(query):
+            negate = negate == "-"
+            if phrase:
+                texts.append(self._text(phrase.lower(), negate))
+            elif word.startswith("#") and len(word) > 1:
+                self._add_bitmap("tag", normalize_tags(word[1:].split(",")), negate)
+            elif QUERY_CLAUSE.match(word):
+                self._add_clause(*QUERY_CLAUSE.match(word).groups(), negate, today)
+            else:
+                texts.append(self._text(word.lower(), negate))
+        self.residuals.extend(texts)
+
+    def _add_clause(self, name, op, value, negate, today):
+        name, value = name.lower(), value.lower()
+        if name in ("priority", "p") and op in (":", "="):
+            values = [v.upper() for v in value.split(",")]
+            unknown = [v for v in values if v not in PRIORITIES]
+            if unknown:
+                raise ValueError(f"unknown priority: {unknown[0]}")
+            self._add_bitmap("priority", values, negate)
+        elif name == "tag" and op in (":", "="):
+            self._add_bitmap("tag", normalize_tags(value.split(",")), negate)
+        elif name == "is" and op == ":":
+            status = QUERY_STATUS.get(value)
+            if status is None:
+                raise ValueError(f"unknown status: is:{value}")
+            if status == "recurring":
+                self.residuals.insert(0, lambda t: bool(t.get("recurrence")) != negate)
+            elif status == "overdue" and negate:
+                self.residuals.insert(0, lambda t: not is_overdue(t, today))
+            elif status == "overdue":
+                self._add_bitmap("status", ["open"], False)
+                self._add_range("due", None, today.strftime("%Y-%m-%d"), False)
+            else:
+                self._add_bitmap("status", [status], negate)
+        elif name in QUERY_DATE_FIELDS:
+            if op in (":", "=") and value == "none":
+                field = QUERY_DATE_FIELDS[name]
+                self.residuals.insert(0, lambda t: (not t.get(field)) != negate)
+                return
+            day = parse_query_date(value, today)
+            lo, hi = {
+                "<": (None, day), "<=": (None, next_day(day)),
+                ">": (next_day(day), None), ">=": (day, None),
+                ":": (day, next_day(day)), "=": (day, next_day(day)),
+            }[op]
+            self._add_range(name, lo, hi, negate)
+        else:
+            raise ValueError(f"unknown search field: {name}")
+
+    def _add_bitmap(self, kind, values, negate):
+        if values:
+            self.bitmaps.append((kind, tuple(values), negate))
+
+    def _add_range(self, mode, lo, hi, negate):
+        field = QUERY_DATE_FIELDS[mode]
+
+        # Dates and ISO timestamps both compare correctly as strings
+        def in_range(task):
+            value = task.get(field)
+            return bool(value) and (lo is None or value >= lo) and (hi is None or value < hi)
+
+        if negate:
+            self.residuals.insert(0, lambda t: not in_range(t))
+        elif mode == "due":
+            # Dated tasks are keyed (0, due), undated ones (1, "")
+            self.ranges.append((mode, (0, lo or ""), (0, hi) if hi else (1,), in_range))
+        else:
+            # Missing timestamps sort as "", below any real value
+            self.ranges.append((mode, (lo or "\x00",), (hi,) if hi else None, in_range))
+
+    def _text(self, phrase, negate):
+        return lambda t: (phrase in t["text"].lower()) != negate
+
+    def _mask(self, index):
+        mask = index.live
+        for kind, values, negate in self.bitmaps:
+            bits = 0
+            for value in values:
+                bits |= index.bitmap(kind, value)
+            mask = mask & ~bits if negate else mask & bits
+        return mask
+
+    def matches(self, task, index=None):
+        """Check one task against every clause (for deltas and the archive).
+
+        is:blocked needs the store's TagIndex; without one nothing is blocked.
+        """
+        for kind, values, negate in self.bitmaps:
+            if kind == "tag":
+                hit = any(tag in values for tag in task.get("tags") or ())
+            elif kind == "priority":
+                hit = task.get("priority", "NONE") in values
+            elif values[0] == "blocked":
+                hit = index is not None and task["id"] in index.blocked_ids
+            else:
+                hit = task["completed"] == (values[0] == "done")
+            if hit == negate:
+                return False
+        checks = [pred for *_, pred in self.ranges] + self.residuals
+        return all(check(task) for check in checks)
+
+    def run(self, store, sort_mode="manual", visible=None):
+        """Matching tasks in the given sort order.
+
+        `visible` (e.g. "not inside a collapsed subtask tree") is checked
+        before any clause, so tasks it rejects are never matched.
+        """
+        with store.lock:
+            index = store.tag_index
+            mask = self._mask(index) if self.bitmaps else None
+
+            # Narrowest candidate source: the bitmap or an indexed date range
+            total = len(store.tasks)
+            source, size = None, total
+            if mask is not None:
+                source, size = "bitmap", mask.bit_count()
+            for clause in self.ranges:
+                start, stop = store.indexes[clause[0]].span(clause[1], clause[2])
+                if stop - start < size:
+                    source, size = (clause, start, stop), stop - start
+            if size * 2 > total:
+                # Not selective enough to beat walking the sort order
+                source = None
+
+            checks = [c[3] for c in self.ranges if source is None or c is not source[0]]
+            checks += self.residuals
+            if mask is not None and source != "bitmap":
+                checks.insert(0, index.selector(mask))
+            if visible is not None:
+                checks.insert(0, visible)
+
+            if source is None:
+                return [t for t in store.iter_sorted(sort_mode) if all(c(t) for c in checks)]
+            if source == "bitmap":
+                found = index.ids_in(mask)
+            else:
+                clause, start, stop = source
+                found = store.indexes[clause[0]].ids_between(start, stop)
+            found = [t for t in map(store.by_id.__getitem__, found) if all(c(t) for c in checks)]
+            return store.in_order(found, sort_mode)
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile_query(query, today=None):
+    """Parse a search query into a QueryPlan, reusing plans for repeated queries.
+
+    Relative dates (today, is:overdue) resolve against `today`, which is part
+    of the cache key. Raises ValueError for malformed clauses.
+    """
+    return QueryPlan(query, today or date.today())
+
+
+def literal_query_text(query):
+    """Quote a query so it searches as one plain-text phrase"""
+    query = query.replace('"', "").strip()
+    return f'"{query}"' if query else ""
+
+
+def text_grams(text):
+    """Character trigrams of each word, padded so short words still count"""
+    grams = set()
+    for word in text.lower().split():
+        word = f" {word} "
+        grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
+
+
+def edit_distance(a, b):
+    """Levenshtein distance, one row at a time"""
+    if len(a) < len(b):
+        a, b = b, a
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def fuzzy_score(query_words, text):
+    """0..1 relevance: each query word's best match among the text's words.
+
+    Word order doesn't matter; a prefix counts as a full match, otherwise
+    similarity is 1 - edit distance / length.
+    """
+    words = text.lower().split()
+    if not words:
+        return 0.0
+    total = 0.0
+    for q in query_words:
+        best = 0.0
+        for word in words:
+            if word.startswith(q):
+                best = 1.0
+                break
+            best = max(best, 1 - edit_distance(q, word) / max(len(q), len(word)))
+        total += best
+    return total / len(query_words)
+
+
+class NgramIndex:
+    """Trigram -> task ids inverted index, the cheap first stage of fuzzy search"""
+    def __init__(self, tasks=()):
+        self.postings = {}  # trigram -> set of task ids
+        self.grams_of = {}  # task_id -> (text, trigrams) as indexed
+        for task in tasks:
+            self.update(task)
+
+    def update(self, task):
+        task_id = task["id"]
+        indexed = self.grams_of.get(task_id)
+        if indexed is not None and indexed[0] == task["text"]:
+            return
+        self.discard(task_id)
+        grams = text_grams(task["text"])
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(task_id)
+        self.grams_of[task_id] = (task["text"], grams)
+
+    def discard(self, task_id):
+        indexed = self.grams_of.pop(task_id, None)
+        if indexed is None:
+            return
+        for gram in indexed[1]:
+            ids = self.postings[gram]
+            ids.discard(task_id)
+            if not ids:
+                del self.postings[gram]
+
+    def candidates(self, query, limit):
+        """Ids sharing the most trigrams with the query, best first"""
+        grams = text_grams(query)
+        overlap = {}
+        # Trigrams found in most tasks add work but hardly rank anything
+        common = len(self.grams_of) // 2
+        for gram in grams:
+            ids = self.postings.get(gram, ())
+            if len(ids) > common and len(grams) > 1:
+                continue
+            for task_id in ids:
+                overlap[task_id] = overlap.get(task_id, 0) + 1
+        # Require a share of the query's trigrams, so noise never gets scored,
+        # then rank by Dice overlap so long texts don't win on size alone
+        least = max(1, len(grams) // FUZZY_MIN_OVERLAP)
+        best = heapq.nlargest(
+            limit,
+            (item for item in overlap.items() if item[1] >= least),
+            key=lambda item: item[1] / (len(grams) + len(self.grams_of[item[0]][1]))
+        )
+        return [task_id for task_id, _ in best]
+
+
+def parse_timestamp(value):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class DailyRollups:
+    """Per-day throughput counters, kept up to date as tasks change.
+
+    Each day bucket holds how many tasks were created and completed that
+    day, how many completions were late (after the due date), and a
+    histogram of time-to-complete over TTC_BUCKETS. Stores add a task's
+    contribution when it appears and swap it out and back in around edits,
+    so the numbers never need a pass over the full history. Deleting a task
+    leaves its history in place.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.days = {}  # "YYYY-MM-DD" -> {"created", "completed", "late", "ttc": [...]}
+        self.dirty = False
+
+    def load(self, tasks):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.days = json.load(f)
+                return
+            except Exception as e:
+                print(f"Error loading stats: {e}")
+        # First run: seed from the tasks we still have
+        self.days = {}
+        for task in tasks:
+            self.count(task, 1)
+
+    def save(self):
+        if not self.dirty:
+            return
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.days, f)
+            self.dirty = False
+        except Exception as e:
+            print(f"Error saving stats: {e}")
+
+    def _bucket(self, day):
+        bucket = self.days.get(day)
+        if bucket is None:
+            bucket = self.days[day] = {
+                "created": 0, "completed": 0, "late": 0, "ttc": [0] * (len(TTC_BUCKETS) + 1)
+            }
+        return bucket
+
+    def count(self, task, sign):
+        """Add (sign=1) or take back (sign=-1) a task's contribution"""
+        created = parse_timestamp(task.get("created_at"))
+        if created is not None:
+            self._bucket(created.date().isoformat())["created"] += sign
+        completed = parse_timestamp(task.get("completed_at")) if task["completed"] else None
+        if completed is not None:
+            bucket = self._bucket(completed.date().isoformat())
+            bucket["completed"] += sign
+            due = task.get("due_date")
+            if due and completed.date().isoformat() > due:
+                bucket["late"] += sign
+            if created is not None:
+                hours = (completed - created).total_seconds() / 3600
+                bucket["ttc"][bisect.bisect_right(TTC_BUCKETS, hours)] += sign
+        self.dirty = True
+
+    def summary(self, days=STATS_DAYS, today=None):
+        """Totals over the last `days` days, oldest day first in the series"""
+        today = today or date.today()
+        created, completed, late = [], [], 0
+        ttc = [0] * (len(TTC_BUCKETS) + 1)
+        for offset in range(days - 1, -1, -1):
+            bucket = self.days.get((today - timedelta(days=offset)).isoformat())
+            if bucket is None:
+                created.append(0)
+                completed.append(0)
+                continue
+            created.append(bucket["created"])
+            completed.append(bucket["completed"])
+            late += bucket["late"]
+            ttc = [a + b for a, b in zip(ttc, bucket["ttc"])]
+
+        # Median time-to-complete, to the histogram bucket it falls in
+        median, seen = None, 0
+        for i, n in enumerate(ttc):
+            seen += n
+            if n and seen * 2 >= sum(ttc):
+                median = TTC_LABELS[i]
+                break
+        done = sum(completed)
+        return {
+            "created": created,
+            "completed": completed,
+            "median_ttc": median,
+            "late_rate": late / done if done else 0.0,
+        }
+
+
+def sparkline(values):
+    """Values as a row of ASCII levels, scaled to the largest"""
+    top = max(values, default=0)
+    if top <= 0:
+        return SPARK_LEVELS[0] * len(values)
+    last = len(SPARK_LEVELS) - 1
+    return "".join(SPARK_LEVELS[round(max(v, 0) / top * last)] for v in values)
+
+
+def read_shard(path):
+    """Parse one shard file (module level so worker processes can run it)"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json_atomic(path, data):
+    # Write beside the target and swap in, so a crash never leaves half a file
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def freeze_task(task):
+    """A copy of a task that later edits to the original can't reach"""
+    frozen = dict(task)
+    if "clock" in frozen:
+        frozen["clock"] = dict(frozen["clock"])
+    if frozen.get("tags"):
+        frozen["tags"] = list(frozen["tags"])
+    if frozen.get("blocked_by"):
+        frozen["blocked_by"] = list(frozen["blocked_by"])
+    return frozen
+
+
+class TaskSnapshot:
+    """The task list as it was at `version`, safe to read from any thread.
+
+    Iterates frozen task dicts in list order; treat them as read-only, they
+    are shared with other snapshots.
+    """
+    def __init__(self, version, chunks):
+        self.version = version
+        self.chunks = chunks
+        self.count = sum(map(len, chunks))
+
+    def __iter__(self):
+        return chain.from_iterable(self.chunks)
+
+    def __len__(self):
+        return self.count
+
+
+class SnapshotVector:
+    """Frozen copies of the tasks in list order, cut into copy-on-write chunks.
+
+    Each chunk is a tuple under a stable key; an edit replaces only the
+    tuple of the chunk it lands in, so older snapshots keep the tuples they
+    were published with. Structural edits (insert, remove) are applied as
+    they happen; in-place edits just mark the task dirty and are copied
+    when the next snapshot is published. Publishing costs the dirty tasks'
+    chunks plus one tuple of chunk references.
+    """
+    def __init__(self):
+        self.rebuild([])
+
+    def rebuild(self, tasks):
+        self.chunks = {}     # key -> tuple of frozen tasks
+        self.spine = []      # chunk keys in list order
+        self.chunk_of = {}   # task id -> chunk key
+        self.keys = count()
+        self.dirty = set()   # ids edited in place since the last publish
+        self.published = None
+        self.extend(tasks)
+
+    def _add_chunk(self, items, at=None):
+        key = next(self.keys)
+        self.chunks[key] = items
+        for task in items:
+            self.chunk_of[task["id"]] = key
+        if at is None:
+            self.spine.append(key)
+        else:
+            self.spine.insert(at, key)
+
+    def insert(self, index, task):
+        frozen = freeze_task(task)
+        if not self.spine:
+            self._add_chunk((frozen,))
+            return
+        for at, key in enumerate(self.spine):
+            size = len(self.chunks[key])
+            if index <= size:
+                break
+            index -= size
+        else:
+            index = size
+        items = self.chunks[key]
+        items = items[:index] + (frozen,) + items[index:]
+        self.chunk_of[frozen["id"]] = key
+        if len(items) > 2 * SNAPSHOT_CHUNK:
+            self.chunks[key] = items[:SNAPSHOT_CHUNK]
+            self._add_chunk(items[SNAPSHOT_CHUNK:], at + 1)
+        else:
+            self.chunks[key] = items
+
+    def extend(self, tasks):
+        frozen = [freeze_task(t) for t in tasks]
+        # Just copied, so the store's touches during the same extend don't count
+        self.dirty.difference_update(t["id"] for t in frozen)
+        if self.spine and frozen:
+            # Top up the last chunk first so appends don't leave runts
+            key = self.spine[-1]
+            room = max(SNAPSHOT_CHUNK - len(self.chunks[key]), 0)
+            self.chunks[key] += tuple(frozen[:room])
+            for task in frozen[:room]:
+                self.chunk_of[task["id"]] = key
+            frozen = frozen[room:]
+        for start in range(0, len(frozen), SNAPSHOT_CHUNK):
+            self._add_chunk(tuple(frozen[start:start + SNAPSHOT_CHUNK]))
+
+    def remove(self, task_id):
+        self.dirty.discard(task_id)
+        key = self.chunk_of.pop(task_id, None)
+        if key is None:
+            return
+        items = tuple(t for t in self.chunks[key] if t["id"] != task_id)
+        if items:
+            self.chunks[key] = items
+        else:
+            del self.chunks[key]
+            self.spine.remove(key)
+
+    def touch(self, task_id):
+        self.dirty.add(task_id)
+
+    def publish(self, by_id, version):
+        """A TaskSnapshot of the current list; reused while nothing changed"""
+        if self.published is not None and self.published.version == version:
+            return self.published
+        fresh = {}  # chunk key -> {task id: new frozen copy}
+        for task_id in self.dirty:
+            key = self.chunk_of.get(task_id)
+            if key is not None:
+                fresh.setdefault(key, {})[task_id] = freeze_task(by_id[task_id])
+        for key, copies in fresh.items():
+            self.chunks[key] = tuple(copies.get(t["id"], t) for t in self.chunks[key])
+        self.dirty.clear()
+        self.published = TaskSnapshot(version, tuple(self.chunks[key] for key in self.spine))
+        return self.published
+
+
+class TaskTree:
+    """Subtask links and rolled-up progress.
+
+    `children` maps a parent id to its child ids (in link order) and
+    `progress` maps every task to [done, total] over all its descendants.
+    A change walks only the ancestor chain of the task it touches: adding
+    or removing a task moves its whole subtree's counts up the chain, and
+    completing one adds 1 to `done` on each ancestor.
+
+    Children of a task that isn't in the list (e.g. deleted over the API)
+    keep their link and show at the top level; if the parent comes back,
+    its counts are rebuilt from them. Links are checked for cycles when
+    they are made (check_link) and again when a task comes back.
+    """
+    def __init__(self):
+        self.rebuild([])
+
+    def rebuild(self, tasks):
+        self.children = {}   # parent id -> {child id: None}
+        self.parent_of = {}  # child id -> parent id
+        self.completed = {}  # id -> completed, for every task in the list
+        self.progress = {}   # id -> [done, total] over its descendants
+        parents = {t["id"]: t.get("parent") for t in tasks}
+        for task in tasks:
+            # Drop links that loop back on themselves (hand-edited files)
+            seen = {task["id"]}
+            parent = parents.get(task["id"])
+            while parent is not None and parent not in seen:
+                seen.add(parent)
+                parent = parents.get(parent)
+            if parent is not None:
+                task["parent"] = None
+                parents[task["id"]] = None
+        for task in tasks:
+            self.add(task)
+
+    def add(self, task):
+        task_id = task["id"]
+        done = total = 0
+        for child_id in self.children.get(task_id, ()):
+            if child_id in self.completed:
+                child_done, child_total = self.progress[child_id]
+                done += child_done + self.completed[child_id]
+                total += child_total + 1
+        self.completed[task_id] = bool(task["completed"])
+        self.progress[task_id] = [done, total]
+        parent = task.get("parent")
+        if parent and (parent == task_id or task_id in self.ancestors(parent)):
+            # Its old parent was moved under it while it was gone (undo of a
+            # delete): bring it back at the top level instead of making a loop
+            task["parent"] = parent = None
+        if parent:
+            self.parent_of[task_id] = parent
+            self.children.setdefault(parent, {})[task_id] = None
+            self._carry(parent, done + self.completed[task_id], total + 1)
+
+    def remove(self, task_id):
+        completed = self.completed.pop(task_id, None)
+        if completed is None:
+            return
+        done, total = self.progress.pop(task_id)
+        parent = self.parent_of.pop(task_id, None)
+        if parent is not None:
+            siblings = self.children[parent]
+            del siblings[task_id]
+            if not siblings:
+                del self.children[parent]
+            self._carry(parent, -(done + completed), -(total + 1))
+
+    def _carry(self, task_id, done, total):
+        """Add to the counts of a task and everything above it"""
+        while task_id in self.completed:
+            progress = self.progress[task_id]
+            progress[0] += done
+            progress[1] += total
+            task_id = self.parent_of.get(task_id)
+
+    def ancestors(self, task_id):
+        """Ids above a task that are in the list, nearest first"""
+        task_id = self.parent_of.get(task_id)
+        while task_id in self.completed:
+            yield task_id
+            task_id = self.parent_of.get(task_id)
+
+    def subtree(self, task_id):
+        """A task and all its descendants in the list, parents before children"""
+        found = [task_id]
+        for current in found:
+            found.extend(c for c in self.children.get(current, ()) if c in self.completed)
+        return found
+
+    def check_link(self, task_id, parent_id):
+        """Raise ValueError unless `parent_id` can become the parent of `task_id`"""
+        if parent_id is None:
+            return
+        if parent_id not in self.completed:
+            raise ValueError(f"no task {parent_id} to nest under")
+        if parent_id == task_id or task_id in self.ancestors(parent_id):
+            raise ValueError("a task can't be nested under its own subtask")
+
+
+class DependencyGraph:
+    """Blocked-by links, and how many unfinished blockers each task has.
+
+    `blockers` holds each task's own links and `dependents` the reverse
+    edges. Adding, removing, completing or reopening a task only walks that
+    task's edges: each dependent's count moves by one, and
+    `on_blocked(task_id, blocked)` fires as a count leaves or reaches 0.
+    A blocker that isn't in the list (deleted) doesn't block. Links are
+    checked for cycles when they are made (check_links).
+    """
+    def __init__(self, on_blocked):
+        self.on_blocked = on_blocked
+        self.rebuild([])
+
+    def rebuild(self, tasks):
+        self.blockers = {}        # task id -> ids it waits on
+        self.dependents = {}      # task id -> ids waiting on it
+        self.completed = {}       # id -> completed, for every task in the list
+        self.open_blockers = {}   # id -> number of its blockers still open
+        for task in tasks:
+            self.add(task)
+
+    def add(self, task):
+        task_id = task["id"]
+        blockers = set(task.get("blocked_by") or ()) - {task_id}
+        self.blockers[task_id] = blockers
+        for blocker in blockers:
+            self.dependents.setdefault(blocker, set()).add(task_id)
+        self.completed[task_id] = bool(task["completed"])
+        count = sum(1 for blocker in blockers if self.completed.get(blocker) is False)
+        self.open_blockers[task_id] = count
+        self.on_blocked(task_id, count > 0)
+        if not task["completed"]:
+            self._shift(task_id, 1)
+
+    def remove(self, task_id):
+        completed = self.completed.pop(task_id, None)
+        if completed is None:
+            return
+        if not completed:
+            self._shift(task_id, -1)
+        for blocker in self.blockers.pop(task_id):
+            waiting = self.dependents[blocker]
+            waiting.discard(task_id)
+            if not waiting:
+                del self.dependents[blocker]
+        del self.open_blockers[task_id]
+
+    def _shift(self, task_id, delta):
+        """An open task came or went: adjust everything waiting on it"""
+        for dependent in self.dependents.get(task_id, ()):
+            if dependent in self.open_blockers:
+                count = self.open_blockers[dependent] = self.open_blockers[dependent] + delta
+                if count == (1 if delta > 0 else 0):
+                    self.on_blocked(dependent, count > 0)
+
+    def check_links(self, task_id, blocker_ids):
+        """Raise ValueError unless `task_id` can wait on all of `blocker_ids`"""
+        for blocker in blocker_ids:
+            if blocker == task_id:
+                raise ValueError("a task can't wait on itself")
+            if blocker not in self.completed:
+                raise ValueError(f"no task {blocker} to wait on")
+        # A new link closes a loop if a blocker already waits on task_id, however indirectly
+        seen = set()
+        stack = list(blocker_ids)
+        while stack:
+            current = stack.pop()
+            if current == task_id:
+                raise ValueError("tasks can't wait on each other in a loop")
+            if current not in seen:
+                seen.add(current)
+                stack.extend(self.blockers.get(current, ()))
+
+
+class UrgencyQueue:
+    """Open tasks in a max-heap on urgency_score, for the FOCUS tab.
+
+    An edit pushes a fresh entry and leaves the old one in place; `live`
+    holds each task's current entry number, and stale entries are dropped
+    when they reach the top (or all at once once they outnumber live ones).
+    Reading the top K pops K live entries and pushes them back, so the
+    pending list is never sorted. A filter that rejects most of the heap
+    would pop all of it, so past FOCUS_SCAN_LIMIT entries the read ranks the
+    caller's candidates with nsmallest instead. Scores move with the date,
+    so the heap is rebuilt on the first read after midnight.
+    """
+    def __init__(self):
+        self.seq = count()
+        self.rebuild([])
+
+    def rebuild(self, tasks, today=None):
+        self.today = today or date.today()
+        self.live = {}    # task id -> seq of its current entry
+        self.heap = []
+        for task in tasks:
+            if not task["completed"]:
+                seq = next(self.seq)
+                self.live[task["id"]] = seq
+                self.heap.append((-urgency_score(task, self.today), seq, task["id"]))
+        heapq.heapify(self.heap)
+
+    def update(self, task):
+        if task["completed"]:
+            self.discard(task["id"])
+            return
+        seq = next(self.seq)
+        self.live[task["id"]] = seq
+        heapq.heappush(self.heap, (-urgency_score(task, self.today), seq, task["id"]))
+        self._compact()
+
+    def discard(self, task_id):
+        if self.live.pop(task_id, None) is not None:
+            self._compact()
+
+    def _compact(self):
+        if len(self.heap) > 2 * len(self.live) + 64:
+            self.heap = [entry for entry in self.heap if self.live.get(entry[2]) == entry[1]]
+            heapq.heapify(self.heap)
+
+    def top(self, k, by_id, accept=None, today=None, candidates=None):
+        """Up to `k` tasks passing `accept`, most urgent first.
+
+        `candidates`, if given, returns the tasks that pass `accept`; it is
+        called when the heap scan runs past FOCUS_SCAN_LIMIT entries.
+        """
+        today = today or date.today()
+        if today != self.today:
+            self.rebuild(by_id.values(), today)
+        found, kept = [], []
+        while self.heap and len(found) < k:
+            if candidates is not None and len(kept) >= FOCUS_SCAN_LIMIT:
+                for entry in kept:
+                    heapq.heappush(self.heap, entry)
+                return self._rank(k, candidates())
+            entry = heapq.heappop(self.heap)
+            if self.live.get(entry[2]) != entry[1]:
+                continue
+            kept.append(entry)
+            task = by_id[entry[2]]
+            if accept is None or accept(task):
+                found.append(task)
+        for entry in kept:
+            heapq.heappush(self.heap, entry)
+        return found
+
+    def _rank(self, k, tasks):
+        entries = (
+            (-urgency_score(task, self.today), self.live[task["id"]], task["id"], task)
+            for task in tasks if task["id"] in self.live
+        )
+        return [entry[3] for entry in heapq.nsmallest(k, entries)]
+
+
+class TaskStore:
+    """Owns the task list and its persistence.
+
+    The UI, the API server and the sync engine all mutate tasks through these
+    methods, under `lock`. Every mutation bumps `version`, stamps it on the
+    task (or on its tombstone when deleted) and lands in a bounded change log,
+    so readers can ask for just the tasks changed since a version they have.
+    Readers on other threads take a snapshot() and iterate that instead of
+    `tasks`, which keeps changing under them.
+    Each synced field also carries a `[ms, replica]` clock for last-writer-wins
+    merging (see SyncEngine).
+    """
+    def __init__(self, data_file, replica=DESKTOP_REPLICA):
+        self.data_file = data_file
+        self.sync_file = os.path.splitext(data_file)[0] + ".sync.json"
+        self.shard_dir = os.path.splitext(data_file)[0] + "_shards"
+        self.manifest_file = os.path.join(self.shard_dir, "manifest.json")
+        self.shard_count = 0        # 0: everything in data_file
+        self.dirty_shards = set()   # shards holding tasks changed since the last save
+        self.saved_order = None     # task ids in list order as last written to the manifest
+        self.replica = replica
+        self.lock = threading.RLock()
+        self.save_lock = threading.RLock()   # taken before `lock`, never inside it
+        self.tasks = []
+        self.by_id = {}
+        self.version = 0
+        self.change_log = deque(maxlen=CHANGE_LOG_SIZE)  # (version, task_id)
+        self.tombstones = {}        # task_id -> {"clock": [ms, replica], "version": v}
+        self.tombstone_horizon = 0  # newest version whose tombstone was pruned
+        self.indexes = {
+            mode: SortedIndex(key_func)
+            for mode, (_, key_func, _) in SORT_MODES.items() if key_func
+        }
+        self.tag_index = TagIndex()
+        self.ngram_index = None     # built on the first fuzzy search
+        self.view = SnapshotVector()
+        self.tree = TaskTree()
+        self.deps = DependencyGraph(self.tag_index.set_blocked)
+        self.focus = UrgencyQueue()
+        self.rollups = DailyRollups(os.path.splitext(data_file)[0] + ".stats.json")
+
+    def load(self):
+        tasks = []
+        if os.path.exists(self.manifest_file):
+            try:
+                tasks = self._load_shards()
+            except Exception as e:
+                print(f"Error loading task shards: {e}")
+                tasks = []
+        elif os.path.exists(self.data_file):
+            try:
+                with open(self.data_file, "r", encoding="utf-8") as f:
+                    tasks = json.load(f)
+            except Exception as e:
+                print(f"Error loading tasks: {e}")
+                tasks = []
+        # Migrate old tasks to new format
+        for task in tasks:
+            if "priority" not in task:
+                task["priority"] = "NONE"
+            if "due_date" not in task:
+                task["due_date"] = None
+
+        sync_state = {}
+        if os.path.exists(self.sync_file):
+            try:
+                with open(self.sync_file, "r", encoding="utf-8") as f:
+                    sync_state = json.load(f)
+            except Exception as e:
+                print(f"Error loading sync state: {e}")
+
+        with self.lock:
+            self.tasks = tasks
+            self.by_id = {t["id"]: t for t in tasks}
+            self.tombstones = sync_state.get("tombstones", {})
+            self.tombstone_horizon = sync_state.get("tombstone_horizon", 0)
+            # Versions keep counting across restarts so clients' `since` stays valid
+            self.version = max(
+                [self.version, sync_state.get("version", 0), self.tombstone_horizon]
+                + [t.get("version", 0) for t in tasks]
+                + [t["version"] for t in self.tombstones.values()]
+            )
+            self.change_log.clear()
+            for index in self.indexes.values():
+                index.rebuild(tasks)
+            self.tag_index.rebuild(tasks)
+            self.ngram_index = None
+            self.view.rebuild(tasks)
+            self.tree.rebuild(tasks)
+            self.deps.rebuild(tasks)
+            self.focus.rebuild(tasks)
+            self.rollups.load(tasks)
+        return tasks
+
+    def save(self):
+        """Write the list out; returns False if that failed (the error is printed).
+
+        `lock` is held only while a snapshot is taken; the JSON is written
+        from the snapshot after releasing it, so a big list doesn't stall
+        the Tk thread for the length of the dump. `save_lock` keeps two
+        saves from writing the same files at once.
+        """
+        with self.save_lock:
+            with self.lock:
+                self._prune_tombstones()
+                tasks = self.view.publish(self.by_id, self.version)
+                sync_state = {
+                    "version": self.version,
+                    "tombstones": dict(self.tombstones),
+                    "tombstone_horizon": self.tombstone_horizon
+                }
+                dirty, self.dirty_shards = self.dirty_shards, set()
+                self.rollups.save()
+            try:
+                if self.shard_count:
+                    self._save_shards(tasks, dirty)
+                else:
+                    with open(self.data_file, "w", encoding="utf-8") as f:
+                        json.dump(list(tasks), f, indent=2, ensure_ascii=False)
+                with open(self.sync_file, "w", encoding="utf-8") as f:
+                    json.dump(sync_state, f)
+            except Exception as e:
+                print(f"Error saving tasks: {e}")
+                with self.lock:
+                    self.dirty_shards |= dirty
+                return False
+            return True
+
+    def shard_path(self, shard):
+        return os.path.join(self.shard_dir, f"shard-{shard:03d}.json")
+
+    def shard_of(self, task_id):
+        # crc32 rather than hash(): str hashes change between runs
+        return zlib.crc32(task_id.encode("utf-8")) % self.shard_count
+
+    def _load_shards(self):
+        """Parse all shards (in parallel when there is enough to parse) and merge them"""
+        with open(self.manifest_file, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.shard_count = manifest["shards"]
+        paths = [self.shard_path(shard) for shard in range(self.shard_count)]
+        paths = [p for p in paths if os.path.exists(p)]
+        size = sum(os.path.getsize(p) for p in paths)
+        workers = min(len(paths), os.cpu_count() or 1)
+        if workers > 1 and size >= SHARD_PARALLEL_MIN_BYTES:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(read_shard, paths))
+        else:
+            parts = [read_shard(p) for p in paths]
+
+        by_id = {t["id"]: t for part in parts for t in part}
+        tasks = [by_id.pop(task_id) for task_id in manifest["order"] if task_id in by_id]
+        # Tasks missing from the order (e.g. a hand-edited shard) go at the end
+        tasks.extend(by_id.values())
+        self.saved_order = manifest["order"]
+        self.dirty_shards = set()
+        return tasks
+
+    def _save_shards(self, snapshot, dirty):
+        """Rewrite only the `dirty` shards, and the manifest if the order changed"""
+        os.makedirs(self.shard_dir, exist_ok=True)
+        if dirty:
+            groups = {shard: [] for shard in dirty}
+            for task in snapshot:
+                group = groups.get(self.shard_of(task["id"]))
+                if group is not None:
+                    group.append(task)
+            for shard, tasks in groups.items():
+                write_json_atomic(self.shard_path(shard), tasks)
+        order = [t["id"] for t in snapshot]
+        if order != self.saved_order:
+            write_json_atomic(self.manifest_file, {"shards": self.shard_count, "order": order})
+            self.saved_order = order
+
+    def reshard(self, count):
+        """Switch storage to `count` shards (0 for a single file) and save.
+
+        Returns False, leaving the old files in place, if the new ones
+        couldn't be written.
+        """
+        with self.save_lock, self.lock:
+            old_count = self.shard_count
+            self.shard_count = count
+            self.dirty_shards = set(range(count))
+            self.saved_order = None
+            if not self.save():
+                self.shard_count = old_count
+                self.dirty_shards = set(range(old_count))
+                self.saved_order = None
+                return False
+            if count and os.path.exists(self.data_file):
+                os.replace(self.data_file, self.data_file + ".bak")
+            for shard in range(count, old_count):
+                if os.path.exists(self.shard_path(shard)):
+                    os.remove(self.shard_path(shard))
+            if not count and os.path.exists(self.manifest_file):
+                os.remove(self.manifest_file)
+                try:
+                    os.rmdir(self.shard_dir)
+                except OSError:
+                    pass  # something else lives there too; leave it
+            return True
+
+    def _prune_tombstones(self):
+        cutoff = now_ms() - TOMBSTONE_TTL_DAYS * 86400000
+        expired = [i for i, t in self.tombstones.items() if t["clock"][0] < cutoff]
+        for task_id in expired:
+            self.tombstone_horizon = max(self.tombstone_horizon, self.tombstones.pop(task_id)["version"])
+
+    def _touch(self, task_id, reindex=True):
+        self.version += 1
+        self.change_log.append((self.version, task_id))
+        if self.shard_count:
+            self.dirty_shards.add(self.shard_of(task_id))
+        task = self.by_id.get(task_id)
+        if task is not None:
+            task["version"] = self.version
+            self.view.touch(task_id)
+            self.tag_index.update(task)
+            self.focus.update(task)
+            if self.ngram_index is not None:
+                self.ngram_index.update(task)
+        else:
+            self.tag_index.discard(task_id)
+            self.focus.discard(task_id)
+            if self.ngram_index is not None:
+                self.ngram_index.discard(task_id)
+        if reindex:
+            for index in self.indexes.values():
+                if task is None:
+                    index.discard(task_id)
+                else:
+                    index.update(task)
+
+    def _stamp(self, task, fields, clock=None):
+        clock = clock or [now_ms(), self.replica]
+        task_clock = task.setdefault("clock", {})
+        for field in fields:
+            if field in SYNC_FIELDS:
+                task_clock[field] = clock
+
+    def _bury(self, task_id, clock=None):
+        self.tombstones[task_id] = {"clock": clock or [now_ms(), self.replica], "version": self.version}
+
+    def get(self, task_id):
+        return self.by_id.get(task_id)
+
+    def add(self, task, index=0, counted=False):
+        """Insert a task at `index`.
+
+        `counted` says its history is already in the rollups, as for a
+        task coming back from the archive (see remove_where's bury=False).
+        """
+        with self.lock:
+            # Re-adding a deleted task (undo) brings it back for sync peers
+            # too; its history was never taken out of the rollups
+            buried = self.tombstones.pop(task["id"], None) is not None
+            if not (buried or counted):
+                self.rollups.count(task, 1)
+            self._stamp(task, SYNC_FIELDS)
+            self.tasks.insert(index, task)
+            self.view.insert(index, task)
+            self.tree.add(task)
+            self.by_id[task["id"]] = task
+            self._touch(task["id"])
+            self.deps.add(task)
+        return task
+
+    def extend(self, tasks):
+        with self.lock:
+            for task in tasks:
+                self._stamp(task, SYNC_FIELDS)
+                self.rollups.count(task, 1)
+                self.tasks.append(task)
+                self.tree.add(task)
+                self.by_id[task["id"]] = task
+                self._touch(task["id"], reindex=False)
+                self.deps.add(task)
+            self.view.extend(tasks)
+            for index in self.indexes.values():
+                index.add_many(tasks)
+
+    def snapshot(self):
+        """A TaskSnapshot of the list as of now, for readers off the Tk thread"""
+        with self.lock:
+            return self.view.publish(self.by_id, self.version)
+
+    def most_urgent(self, k, accept=None, candidates=None):
+        """The `k` most urgent open tasks that pass `accept`, most urgent first"""
+        with self.lock:
+            return self.focus.top(k, self.by_id, accept, candidates=candidates)
+
+    def iter_sorted(self, mode="manual"):
+        """Tasks in the given sort mode, read straight off its index"""
+        if mode not in self.indexes:
+            return iter(self.tasks)
+        reverse = SORT_MODES[mode][2]
+        return (self.by_id[task_id] for task_id in self.indexes[mode].ids(reverse))
+
+    def fuzzy_search(self, query, matches=None, limit=FUZZY_RESULTS):
+        """Tasks ranked by fuzzy relevance to `query`, best first.
+
+        The trigram index narrows the list to FUZZY_CANDIDATES by overlap;
+        only those get the (slower) edit-distance scoring. `matches` can
+        narrow further, e.g. to the open filter tab.
+        """
+        query_words = query.lower().split()
+        if not query_words:
+            return []
+        with self.lock:
+            if self.ngram_index is None:
+                self.ngram_index = NgramIndex(self.tasks)
+            scored = []
+            for task_id in self.ngram_index.candidates(query, FUZZY_CANDIDATES):
+                task = self.by_id[task_id]
+                if matches is not None and not matches(task):
+                    continue
+                score = fuzzy_score(query_words, task["text"])
+                if score >= FUZZY_MIN_SCORE:
+                    # Ties go to the shorter, more focused text
+                    scored.append((score, -len(task["text"]), task_id))
+            best = heapq.nlargest(limit, scored)
+            return [self.by_id[task_id] for _, _, task_id in best]
+
+    def in_order(self, tasks, mode="manual"):
+        """Sort a handful of tasks the way iter_sorted(mode) would list them"""
+        if mode not in self.indexes:
+            # Manual order has no index: one pass over the list with a set test
+            wanted = {t["id"] for t in tasks}
+            return [t for t in self.tasks if t["id"] in wanted]
+        _, key_func, reverse = SORT_MODES[mode]
+        return sorted(tasks, key=lambda t: (key_func(t), t["id"]), reverse=reverse)
+
+    def update(self, task_id, **fields):
+        """Set fields on a task, keeping completed_at in step with completed.
+
+        Raises ValueError if a new `parent` or `blocked_by` link is missing
+        or would make a cycle.
+        """
+        with self.lock:
+            task = self.by_id.get(task_id)
+            if task is None:
+                return None
+            if "parent" in fields and fields["parent"] != task.get("parent"):
+                self.tree.check_link(task_id, fields["parent"])
+            if "blocked_by" in fields:
+                old = set(task.get("blocked_by") or ())
+                self.deps.check_links(task_id, [b for b in fields["blocked_by"] if b not in old])
+            if (
+                "completed" in fields and "completed_at" not in fields
+                and fields["completed"] != task["completed"]
+            ):
+                fields["completed_at"] = datetime.now().isoformat() if fields["completed"] else None
+            self.rollups.count(task, -1)
+            self.tree.remove(task_id)
+            self.deps.remove(task_id)
+            task.update(fields)
+            self.tree.add(task)
+            self.deps.add(task)
+            self.rollups.count(task, 1)
+            self._stamp(task, fields)
+            self._touch(task_id)
+            return task
+
+    def toggle(self, task_id):
+        with self.lock:
+            task = self.by_id.get(task_id)
+            if task is None:
+                return None
+            return self.update(task_id, completed=not task["completed"])
+
+    def roll_recurrence(self, task_id):
+        """Hand the repeat rule of a just-completed task to its next occurrence.
+
+        The finished occurrence keeps its history but loses the rule; the new
+        task takes its place in the list. Returns the new task, or None if the
+        task isn't a completed recurring one.
+        """
+        with self.lock:
+            task = self.by_id.get(task_id)
+            if task is None or not task["completed"] or not task.get("recurrence"):
+                return None
+            due = normalize_due_date(task.get("due_date"))
+            due = datetime.strptime(due, "%Y-%m-%d").date() if due else None
+            occurrence = new_task(
+                task["text"], task.get("priority", "NONE"),
+                next_occurrence(task["recurrence"], due).strftime("%Y-%m-%d"),
+                list(task.get("tags") or ()), task.get("parent"),
+                recurrence=task["recurrence"], blocked_by=list(task.get("blocked_by") or ())
+            )
+            index = next(i for i, t in enumerate(self.tasks) if t is task)
+            self.update(task_id, recurrence=None)
+            return self.add(occurrence, index)
+
+    def remove(self, task_id):
+        return self.pop(task_id)[0]
+
+    def pop(self, task_id):
+        """Remove a task and return (task, index it was at), or (None, None)"""
+        with self.lock:
+            task = self.by_id.pop(task_id, None)
+            if task is None:
+                return None, None
+            index = next(i for i, t in enumerate(self.tasks) if t is task)
+            del self.tasks[index]
+            self.view.remove(task_id)
+            self.tree.remove(task_id)
+            self.deps.remove(task_id)
+            self._touch(task_id)
+            self._bury(task_id)
+            return task, index
+
+    def restore(self, tasks):
+        """Replace the whole list (e.g. from a backup) as ordinary deletes and adds"""
+        with self.lock:
+            # The restored tasks bring their own history back into the rollups
+            for task in self.tasks:
+                self.rollups.count(task, -1)
+            self.remove_where(lambda t: True)
+            for task in tasks:
+                self.tombstones.pop(task["id"], None)
+            self.extend(tasks)
+
+    def remove_where(self, predicate, bury=True):
+        """Remove every task matching `predicate`.
+
+        With bury=False no tombstones are left, so sync peers aren't told to
+        delete them (archived tasks still exist, just not in this file).
+        """
+        with self.lock:
+            removed = [t for t in self.tasks if predicate(t)]
+            if removed:
+                self.tasks[:] = [t for t in self.tasks if not predicate(t)]
+                if len(removed) > SNAPSHOT_CHUNK:
+                    self.view.rebuild(self.tasks)
+                for task in removed:
+                    del self.by_id[task["id"]]
+                    self.view.remove(task["id"])
+                    self.tree.remove(task["id"])
+                    self.deps.remove(task["id"])
+                    self._touch(task["id"])
+                    if bury:
+                        self._bury(task["id"])
+            return removed
+
+    def changes_since(self, since):
+        """Ids of tasks added, edited or removed after version `since`.
+
+        Answered from the change log when it reaches back far enough, else
+        from the per-task versions. Returns None when even that can't be
+        trusted (tombstones pruned) and the caller needs a full listing.
+        """
+        with self.lock:
+            if since <= 0 or since < self.tombstone_horizon:
+                return None
+            if since >= self.version:
+                return []
+            if self.change_log and self.change_log[0][0] <= since + 1:
+                changed = {}
+                for version, task_id in reversed(self.change_log):
+                    if version <= since:
+                        break
+                    changed.setdefault(task_id, version)
+                return list(changed)
+            changed = [t["id"] for t in self.tasks if t.get("version", 0) > since]
+            changed += [i for i, t in self.tombstones.items() if t["version"] > since]
+            return changed
+
+    def export_op(self, task_id):
+        """Sync op describing the current state of a task, or its deletion"""
+        with self.lock:
+            task = self.by_id.get(task_id)
+            if task is not None:
+                return {
+                    "id": task_id,
+                    "fields": {f: task.get(f) for f in SYNC_FIELDS},
+                    "clock": task.get("clock", {})
+                }
+            if task_id in self.tombstones:
+                return {"id": task_id, "deleted": self.tombstones[task_id]["clock"]}
+            return None
+
+    def apply_op(self, op):
+        """Merge a sync op from another replica with last-writer-wins per field.
+
+        Deletes always win over edits. Returns False if any part of the op
+        lost to newer local state, so the sender needs our version back.
+        """
+        with self.lock:
+            task_id = op["id"]
+            if task_id in self.tombstones:
+                return "deleted" in op
+
+            if "deleted" in op:
+                if task_id in self.by_id:
+                    self.remove(task_id)
+                else:
+                    self._touch(task_id)
+                self._bury(task_id, op["deleted"])
+                return True
+
+            task = self.by_id.get(task_id)
+            fields = op["fields"]
+            clocks = op.get("clock", {})
+            if task is None:
+                if not fields.get("text"):
+                    return False
+                # Defaults for every field; the op's own fields land below
+                task = new_task("")
+                task["id"] = task_id
+                self.tasks.insert(0, task)
+                self.view.insert(0, task)
+                self.by_id[task_id] = task
+            else:
+                self.rollups.count(task, -1)
+                self.tree.remove(task_id)
+                self.deps.remove(task_id)
+
+            task_clock = task.setdefault("clock", {})
+            won_all = True
+            changed = False
+            for field, value in fields.items():
+                if field not in SYNC_FIELDS:
+                    continue
+                remote = clocks.get(field) or [0, ""]
+                local = task_clock.get(field)
+                if local is not None and tuple(remote) <= tuple(local):
+                    won_all = False
+                    continue
+                task[field] = value
+                task_clock[field] = remote
+                changed = True
+            self.tree.add(task)
+            self.rollups.count(task, 1)
+            if changed:
+                self._touch(task_id)
+            # After _touch, so a new task already has its TagIndex slot
+            self.deps.add(task)
+            if changed:
+                self.roll_recurrence(task_id)
+            return won_all
+
+
+class TaskArchive:
+    """Cold storage for completed tasks that are no longer worth keeping hot.
+
+    Tasks go into one segment per month of completion, stored as gzip
+    compressed JSON Lines (e.g. tasks_archive/2026-01.jsonl.gz). Segments are
+    only opened when a page of archived tasks is actually asked for, newest
+    month first; a small manifest keeps per-segment counts for the UI.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_file = os.path.join(directory, "manifest.json")
+        self.counts = {}
+        if os.path.exists(self.manifest_file):
+            try:
+                with open(self.manifest_file, "r", encoding="utf-8") as f:
+                    self.counts = json.load(f)
+            except Exception as e:
+                print(f"Error loading archive manifest: {e}")
+
+    def _save_manifest(self):
+        try:
+            with open(self.manifest_file, "w", encoding="utf-8") as f:
+                json.dump(self.counts, f, indent=2, sort_keys=True)
+        except Exception as e:
+            print(f"Error saving archive manifest: {e}")
+
+    def segment_path(self, month):
+        return os.path.join(self.directory, f"{month}{ARCHIVE_SEGMENT_EXT}")
+
+    @staticmethod
+    def month_of(task):
+        return (task.get("completed_at") or task.get("created_at") or "")[:7] or "undated"
+
+    def count(self):
+        return sum(self.counts.values())
+
+    def segments(self):
+        """Month keys of the segments on disk, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        months = [
+            name[:-len(ARCHIVE_SEGMENT_EXT)]
+            for name in os.listdir(self.directory)
+            if name.endswith(ARCHIVE_SEGMENT_EXT)
+        ]
+        return sorted(months, reverse=True)
+
+    def archive_from(self, store, older_than_days=ARCHIVE_AFTER_DAYS):
+        """Move tasks completed more than `older_than_days` ago out of the store.
+
+        Returns how many were archived; the caller saves the store.
+        """
+        cutoff = (datetime.now() - timedelta(days=older_than_days)).isoformat()
+        with store.lock:
+            old = [
+                t for t in store.tasks
+                if t["completed"] and (t.get("completed_at") or t.get("created_at") or "") < cutoff
+            ]
+            if not old:
+                return 0
+
+            by_month = {}
+            for task in old:
+                by_month.setdefault(self.month_of(task), []).append(task)
+
+            # Write the segments before dropping anything from the hot file
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                for month, tasks in by_month.items():
+                    with gzip.open(self.segment_path(month), "at", encoding="utf-8") as f:
+                        for task in tasks:
+                            f.write(json.dumps(task, ensure_ascii=False) + "\n")
+                    self.counts[month] = self.counts.get(month, 0) + len(tasks)
+            except OSError as e:
+                print(f"Error archiving tasks: {e}")
+                return 0
+            self._save_manifest()
+
+            ids = {t["id"] for t in old}
+            store.remove_where(lambda t: t["id"] in ids, bury=False)
+        return len(old)
+
+    def read_segment(self, month):
+        """All tasks of one segment, most recently completed first"""
+        tasks = []
+        try:
+            with gzip.open(self.segment_path(month), "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        tasks.append(json.loads(line))
+        except (OSError, EOFError, ValueError) as e:
+            print(f"Error reading archive segment {month}: {e}")
+        tasks.sort(key=lambda t: t.get("completed_at") or "", reverse=True)
+        return tasks
+
+    def iter_tasks(self, matches=None):
+        """Archived tasks newest first, opening one segment at a time as needed"""
+        for month in self.segments():
+            for task in self.read_segment(month):
+                if matches is None or matches(task):
+                    yield task
+
+    def take(self, task):
+        """Remove a task from its segment, rewriting only that segment"""
+        month = self.month_of(task)
+        path = self.segment_path(month)
+        remaining = [t for t in self.read_segment(month) if t["id"] != task["id"]]
+        try:
+            if remaining:
+                tmp_path = path + ".tmp"
+                with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                    for t in reversed(remaining):
+                        f.write(json.dumps(t, ensure_ascii=False) + "\n")
+                os.replace(tmp_path, path)
+                self.counts[month] = len(remaining)
+            else:
+                os.remove(path)
+                self.counts.pop(month, None)
+        except OSError as e:
+            print(f"Error updating archive segment {month}: {e}")
+            return
+        self._save_manifest()
+
+
+class UndoHistory:
+    """Bounded undo/redo log of TaskStore changes.
+
+    Instead of snapshotting the task list, each entry is the short list of
+    primitive ops that reverses one user action:
+
+        ("insert", task, index)     put a removed task back where it was
+        ("remove", task_id)         take an added task out again
+        ("update", task_id, fields) restore previous field values
+
+    Replaying an entry yields the entry that reverses *it*, which goes on the
+    opposite stack, so undo and redo cost a few store calls each. Changes go
+    through the store as usual, so they are saved and synced like any other.
+    """
+    def __init__(self, store, limit=UNDO_LIMIT):
+        self.store = store
+        self.undo_stack = deque(maxlen=limit)
+        self.redo_stack = deque(maxlen=limit)
+
+    def record(self, entry):
+        """Remember the ops that undo an action the user just made"""
+        if entry:
+            self.undo_stack.append(entry)
+            self.redo_stack.clear()
+
+    def undo(self):
+        return self._replay(self.undo_stack, self.redo_stack)
+
+    def redo(self):
+        return self._replay(self.redo_stack, self.undo_stack)
+
+    def _replay(self, source, target):
+        if not source:
+            return False
+        entry = source.pop()
+        with self.store.lock:
+            inverse = [self._apply(op) for op in entry]
+        inverse.reverse()
+        # Ops whose task has since gone away (e.g. deleted over the API) drop out
+        target.append([op for op in inverse if op is not None])
+        return True
+
+    def _apply(self, op):
+        kind = op[0]
+        if kind == "insert":
+            _, task, index = op
+            if self.store.get(task["id"]) is not None:
+                return None
+            self.store.add(task, index)
+            return ("remove", task["id"])
+        if kind == "remove":
+            task, index = self.store.pop(op[1])
+            return None if task is None else ("insert", task, index)
+        if kind == "update":
+            _, task_id, fields = op
+            task = self.store.get(task_id)
+            if task is None:
+                return None
+            before = {f: task.get(f) for f in fields}
+            self.store.update(task_id, **fields)
+            return ("update", task_id, before)
+        raise ValueError(f"Unknown undo op: {kind}")
+
+
+class JobCancelled(Exception):
+    """Raised inside a job by CancelToken.check() once the job was cancelled"""
+    pass
+
+
+class CancelToken:
+    """Handed to every job; cancelling it also drops the job's result"""
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise JobCancelled()
+
+
+class JobRunner:
+    """A small thread pool for work that must not block the Tk thread.
+
+    Jobs are `fn(token, *args)` and run by priority (JOB_INTERACTIVE before
+    JOB_BACKGROUND, then in submission order). Workers never touch Tk:
+    results go onto a queue that a single `after` pump on the Tk thread
+    drains, calling on_done(result) / on_error(exc) there. A cancelled job
+    is skipped if it hasn't started, and its callbacks never run.
+    """
+    def __init__(self, root, workers=JOB_WORKERS):
+        self.root = root
+        self.jobs = queue.PriorityQueue()
+        self.results = queue.SimpleQueue()
+        self.seq = count()
+        self.interval = JOB_PUMP_MS
+        self.latency = {}  # priority -> recent queue waits in ms
+        self.workers = [
+            threading.Thread(target=self._work, name=f"task-job-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+        self.pump_job = self.root.after(self.interval, self._pump)
+
+    def submit(self, fn, *args, priority=JOB_BACKGROUND, on_done=None, on_error=None, token=None):
+        """Queue `fn(token, *args)`; returns the token that cancels it"""
+        token = token or CancelToken()
+        self.latency.setdefault(priority, deque(maxlen=JOB_LATENCY_SAMPLES))
+        self.jobs.put((priority, next(self.seq), time.perf_counter(), (fn, args, token, on_done, on_error)))
+        return token
+
+    def post(self, callback, *args):
+        """Call `callback(*args)` on the Tk thread at the next pump (safe from any thread)"""
+        self.results.put((None, callback, args))
+
+    def _work(self):
+        while True:
+            priority, _, queued_at, job = self.jobs.get()
+            if job is None:
+                return
+            fn, args, token, on_done, on_error = job
+            waited = (time.perf_counter() - queued_at) * 1000
+            self.latency[priority].append(waited)
+            if priority <= JOB_INTERACTIVE and waited > JOB_SLOW_MS:
+                print(f"Job {getattr(fn, '__name__', fn)} waited {waited:.0f} ms to start")
+            if token.cancelled:
+                continue
+            try:
+                result = fn(token, *args)
+            except JobCancelled:
+                continue
+            except Exception as e:
+                if on_error is None:
+                    print(f"Error in background job {getattr(fn, '__name__', fn)}: {e}")
+                else:
+                    self.results.put((token, on_error, (e,)))
+                continue
+            if on_done is not None:
+                self.results.put((token, on_done, (result,)))
+
+    def _pump(self):
+        """Run the callbacks of finished jobs; this is the only place they run"""
+        while True:
+            try:
+                token, callback, args = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if token is not None and token.cancelled:
+                continue
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Error handling job result: {e}")
+        self.pump_job = self.root.after(self.interval, self._pump)
+
+    def latency_stats(self):
+        """{priority: (jobs sampled, median wait ms, worst wait ms)}"""
+        stats = {}
+        for priority, waits in list(self.latency.items()):
+            waits = sorted(waits)
+            if waits:
+                stats[priority] = (len(waits), waits[len(waits) // 2], waits[-1])
+        return stats
+
+    def shutdown(self):
+        """Stop the pump and let the workers exit once the queue is empty"""
+        if self.pump_job is not None:
+            self.root.after_cancel(self.pump_job)
+            self.pump_job = None
+        for _ in self.workers:
+            self.jobs.put((float("inf"), next(self.seq), 0, None))
+
+
+class BackupStore:
+    """Rolling, deduplicated snapshots of a task list.
+
+    The task list is cut into chunks at content-defined boundaries (after
+    any task whose id hashes to 0 mod BACKUP_CHUNK_TASKS), so inserting or
+    editing a task only changes the chunk around it. Chunks are stored
+    gzipped under their sha256 and shared by every snapshot that contains
+    them; a snapshot is just the list of its chunk hashes.
+
+        <list>_backups/chunks/ab/ab12....jsonl.gz
+        <list>_backups/snapshots/20261019-143000-123456.json
+
+    Old snapshots are thinned out to BACKUP_RETENTION (newest per hour, day
+    and week) beyond the BACKUP_KEEP_RECENT newest, and chunks no snapshot
+    refers to are deleted. Snapshot files are never overwritten.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.chunk_dir = os.path.join(directory, "chunks")
+        self.snapshot_dir = os.path.join(directory, "snapshots")
+        self.backed_up_version = None
+        self._running = threading.Lock()
+
+    def chunk_path(self, digest):
+        return os.path.join(self.chunk_dir, digest[:2], digest + ".jsonl.gz")
+
+    def snapshots(self):
+        """Snapshot ids, newest first"""
+        if not os.path.isdir(self.snapshot_dir):
+            return []
+        return sorted(
+            (os.path.splitext(name)[0] for name in os.listdir(self.snapshot_dir) if name.endswith(".json")),
+            reverse=True
+        )
+
+    def read_snapshot(self, snapshot_id):
+        with open(os.path.join(self.snapshot_dir, snapshot_id + ".json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def schedule(self, store, jobs):
+        """Back up `store` as a background job if it changed since the last backup.
+
+        Returns at once; does nothing while a backup is already queued or running.
+        """
+        if store.version == self.backed_up_version or not self._running.acquire(blocking=False):
+            return False
+        snapshot = store.snapshot()
+        jobs.submit(self._run, snapshot, snapshot.version, priority=JOB_BACKGROUND)
+        return True
+
+    def _run(self, token, tasks, version):
+        try:
+            self.snapshot(tasks, version)
+            self.backed_up_version = version
+        except Exception as e:
+            print(f"Error backing up tasks: {e}")
+        finally:
+            self._running.release()
+
+    def snapshot(self, tasks, version=0, now=None):
+        """Write a snapshot of `tasks`, storing only chunks not seen before.
+
+        Returns the snapshot id, or None if nothing changed since the last one.
+        """
+        digests = []
+        chunk = []
+        for task in tasks:
+            chunk.append(json.dumps(task, ensure_ascii=False, sort_keys=True))
+            if zlib.crc32(task["id"].encode("utf-8")) % BACKUP_CHUNK_TASKS == 0:
+                digests.append(self._put_chunk(chunk))
+                chunk = []
+        if chunk:
+            digests.append(self._put_chunk(chunk))
+
+        latest = self.snapshots()
+        if latest and self.read_snapshot(latest[0])["chunks"] == digests:
+            return None
+        now = now or datetime.now()
+        snapshot_id = base_id = now.strftime("%Y%m%d-%H%M%S-%f")
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        suffix = count(1)
+        while os.path.exists(os.path.join(self.snapshot_dir, snapshot_id + ".json")):
+            snapshot_id = f"{base_id}-{next(suffix)}"
+        write_json_atomic(os.path.join(self.snapshot_dir, snapshot_id + ".json"), {
+            "created_at": now.isoformat(),
+            "version": version,
+            "count": len(tasks),
+            "chunks": digests
+        })
+        self.prune()
+        return snapshot_id
+
+    def _put_chunk(self, lines):
+        data = "\n".join(lines).encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.chunk_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(gzip.compress(data, compresslevel=6))
+            os.replace(tmp, path)
+        return digest
+
+    def prune(self):
+        """Apply the retention policy, then drop chunks no snapshot uses"""
+        snapshot_ids = self.snapshots()
+        keep = set(snapshot_ids[:BACKUP_KEEP_RECENT])
+        for period, limit in BACKUP_RETENTION:
+            seen = set()
+            for snapshot_id in snapshot_ids:
+                # Older ids have no microseconds; the first 15 characters always parse
+                taken = datetime.strptime(snapshot_id[:15], "%Y%m%d-%H%M%S")
+                bucket = taken.strftime(period)
+                if bucket not in seen and len(seen) < limit:
+                    seen.add(bucket)
+                    keep.add(snapshot_id)
+        for snapshot_id in snapshot_ids:
+            if snapshot_id not in keep:
+                os.remove(os.path.join(self.snapshot_dir, snapshot_id + ".json"))
+
+        used = set()
+        for snapshot_id in keep:
+            used.update(self.read_snapshot(snapshot_id)["chunks"])
+        for root, _, files in os.walk(self.chunk_dir):
+            for name in files:
+                if name.split(".")[0] not in used:
+                    os.remove(os.path.join(root, name))
+
+    def restore(self, snapshot_id):
+        """The task list as it was in a snapshot"""
+        tasks = []
+        for digest in self.read_snapshot(snapshot_id)["chunks"]:
+            with open(self.chunk_path(digest), "rb") as f:
+                data = gzip.decompress(f.read()).decode("utf-8")
+            tasks.extend(json.loads(line) for line in data.split("\n"))
+        return tasks
+
+
+class Workspace:
+    """One named task list: its store, cold archive and undo history"""
+    def __init__(self, name, data_file):
+        self.name = name
+        self.store = TaskStore(data_file)
+        self.store.load()
+        self.archive = TaskArchive(os.path.splitext(data_file)[0] + "_archive")
+        if self.archive.archive_from(self.store):
+            self.store.save()
+        self.history = UndoHistory(self.store)
+        self.backups = BackupStore(os.path.splitext(data_file)[0] + "_backups")
+
+
+class WorkspaceCache:
+    """Named task lists on disk, with only the recently used ones in memory.
+
+    The default list keeps living in tasks.json; the others are
+    `lists/<name>.json` next to it. Lists are loaded on first use and kept
+    in an LRU of `capacity` entries; the least recently used one is saved
+    and dropped when another list needs its place. With a JobRunner, that
+    save (and a backup) runs as a background job. Lists in `pinned` are
+    never dropped.
+    """
+    def __init__(self, directory, capacity=WORKSPACE_CACHE_SIZE, jobs=None):
+        self.default_file = os.path.join(directory, "tasks.json")
+        self.directory = os.path.join(directory, "lists")
+        self.capacity = capacity
+        self.jobs = jobs
+        self.pinned = set()
+        self.loaded = OrderedDict()  # name -> Workspace, least recently used first
+
+    def path(self, name):
+        if name == DEFAULT_WORKSPACE:
+            return self.default_file
+        return os.path.join(self.directory, name + ".json")
+
+    def names(self):
+        names = []
+        if os.path.isdir(self.directory):
+            for filename in os.listdir(self.directory):
+                name, ext = os.path.splitext(filename)
+                if ext == ".json" and WORKSPACE_NAME.fullmatch(name):
+                    names.append(name)
+        return [DEFAULT_WORKSPACE] + sorted(set(names) - {DEFAULT_WORKSPACE})
+
+    def open(self, name):
+        return self.get(name) or self.put(self.load(name))
+
+    def get(self, name):
+        """The list if it is loaded (marking it recently used), else None"""
+        workspace = self.loaded.get(name)
+        if workspace is not None:
+            self.loaded.move_to_end(name)
+        return workspace
+
+    def load(self, name):
+        """Read a list from disk without caching it; safe on a worker thread"""
+        return Workspace(name, self.path(name))
+
+    def put(self, workspace):
+        """Cache a loaded list, evicting the least recently used ones"""
+        self.loaded[workspace.name] = workspace
+        while len(self.loaded) > self.capacity:
+            name = next((n for n in self.loaded if n not in self.pinned and n != workspace.name), None)
+            if name is None:
+                break
+            cold = self.loaded.pop(name)
+            if self.jobs is None:
+                cold.store.save()
+                continue
+            self.jobs.submit(lambda token, store: store.save(), cold.store, priority=JOB_INTERACTIVE)
+            cold.backups.schedule(cold.store, self.jobs)
+        return workspace
+
+    def create(self, name):
+        """Start a new empty list. Raises ValueError for a bad or taken name."""
+        name = name.strip().lower()
+        if not WORKSPACE_NAME.fullmatch(name):
+            raise ValueError("list names are 1-32 letters, digits, - or _")
+        if name in self.names():
+            raise ValueError(f"list '{name}' already exists")
+        os.makedirs(self.directory, exist_ok=True)
+        workspace = self.open(name)
+        workspace.store.save()
+        return workspace
+
+    def flush(self):
+        for workspace in self.loaded.values():
+            workspace.store.save()
+
+
+class SyncEngine:
+    """Delta sync between the task store and another replica (the web front-end).
+
+    A client sends the ops it made since its last sync along with the store
+    version it last saw, and gets back ops for every task changed since that
+    version, plus our state of any task where its own op lost. Conflicts
+    resolve per field: the newer [ms, replica] clock wins, the replica id
+    breaks ties, and deletes beat edits.
+
+        request:  {"replica": "web-1a2b", "since": 42, "ops": [op, ...]}
+        response: {"version": 57, "full": false, "ops": [op, ...]}
+        op:       {"id", "fields": {name: value}, "clock": {name: [ms, replica]}}
+                  or {"id", "deleted": [ms, replica]}
+
+    With "full": true (first sync, or the client is too far behind) the ops
+    cover every task and the client drops anything not in them. A client's
+    `since` only means something for one store, so an engine stays bound to
+    its store for good (TaskApiServer syncs the default list).
+    """
+    def __init__(self, store):
+        self.store = store
+
+    def sync(self, request):
+        replica = request.get("replica")
+        if not isinstance(replica, str) or not replica or replica == self.store.replica:
+            raise ValueError("replica must be the id of the remote side")
+        since = request.get("since") or 0
+        if not isinstance(since, int):
+            raise ValueError("since must be an integer version")
+        ops = request.get("ops") or []
+        if not isinstance(ops, list):
+            raise ValueError("ops must be a list")
+        ops = [self.clean_op(op) for op in ops]
+
+        with self.store.lock:
+            lost = [op["id"] for op in ops if not self.store.apply_op(op)]
+            # Taken after the ops so their side effects (a recurring task's
+            # next occurrence) go back too; the client's own edits echo
+            # harmlessly since their clocks don't win twice
+            changed = self.store.changes_since(since)
+            if changed is None:
+                out_ids = [t["id"] for t in self.store.tasks]
+            else:
+                out_ids = list(dict.fromkeys(changed + lost))
+            return {
+                "version": self.store.version,
+                "full": changed is None,
+                "ops": [op for op in map(self.store.export_op, out_ids) if op is not None]
+            }
+
+    def clean_op(self, op):
+        """Validate an incoming op and normalize its field values"""
+        if not isinstance(op, dict) or not isinstance(op.get("id"), str) or not op["id"]:
+            raise ValueError("op needs a string id")
+        if "deleted" in op:
+            return {"id": op["id"], "deleted": self._clean_clock(op["deleted"])}
+
+        fields = op.get("fields")
+        clocks = op.get("clock") or {}
+        if not isinstance(fields, dict) or not isinstance(clocks, dict):
+            raise ValueError("op fields and clock must be objects")
+        clean = {"id": op["id"], "fields": {}, "clock": {}}
+        for name, value in fields.items():
+            if name not in SYNC_FIELDS:
+                continue
+            clean["fields"][name] = self._clean_value(name, value)
+            if name in clocks:
+                clean["clock"][name] = self._clean_clock(clocks[name])
+        return clean
+
+    def _clean_value(self, name, value):
+        """Raises ValueError for a value we can't store, so the whole op is refused"""
+        if name == "text":
+            value = value.strip() if isinstance(value, str) else ""
+            if not value:
+                raise ValueError("text must not be empty")
+            return value
+        if name == "completed":
+            return bool(value)
+        if name == "priority":
+            return normalize_priority(value)
+        # Null clears a due date or completed_at; anything else must parse
+        if value is None and name != "created_at":
+            return None
+        clean = normalize_due_date(value) if name == "due_date" else normalize_timestamp(value)
+        if clean is None:
+            raise ValueError(f"{name} is not a valid date: {value!r}")
+        return clean
+
+    def _clean_clock(self, clock):
+        if (
+            not isinstance(clock, list) or len(clock) != 2
+            or not isinstance(clock[0], int) or isinstance(clock[0], bool)
+            or not isinstance(clock[1], str)
+        ):
+            raise ValueError("clock must be [ms, replica]")
+        return clock
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class TaskApiServer:
+    """Local HTTP/JSON API over a TaskStore.
+
+    Runs an asyncio server on a background thread. Requests are handled on
+    that thread against the store (which is lock protected); the Tk side only
+    notices changes by polling `store.version`, so Tk is never touched here.
+
+    Routes:
+        GET    /tasks?filter=<tab>&q=<text>&list=<name>&since=<version>
+        POST   /tasks                  {"text", "priority", "due_date", "parent", "blocked_by"}
+        GET    /tasks/<id>
+        PATCH  /tasks/<id>             {"text", "priority", "due_date", "completed", "parent", "blocked_by"}
+        POST   /tasks/<id>/toggle
+        DELETE /tasks/<id>
+        POST   /sync                   see SyncEngine
+
+    The /tasks routes follow the list shown in the window (switch_store);
+    /sync always works on `sync_store`, so the web front-end keeps
+    mirroring one list whatever the window shows. Versions only mean
+    something within one list, so listings name their list and a `since`
+    is only honoured along with the matching `list`.
+    """
+    def __init__(self, store, host=API_HOST, port=API_PORT, sync_store=None, list_name=DEFAULT_WORKSPACE):
+        self.store = store
+        self.list_name = list_name
+        self.sync_store = sync_store if sync_store is not None else store
+        self.sync_engine = SyncEngine(self.sync_store)
+        self._unsaved = set()   # stores written since the last save
+        self.host = host
+        self.port = port
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self._ready = threading.Event()
+        self._save_handle = None
+
+    def start(self):
+        """Start serving on a daemon thread. Returns False if the port couldn't be bound."""
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name="task-api", daemon=True)
+        self.thread.start()
+        self._ready.wait(timeout=5)
+        return self.server is not None
+
+    def stop(self):
+        if self.loop is None or not self.thread.is_alive():
+            return
+        self.loop.call_soon_threadsafe(self._shutdown)
+        self.thread.join(timeout=5)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(
+                asyncio.start_server(self._handle_client, self.host, self.port)
+            )
+        except OSError as e:
+            print(f"Error starting API server: {e}")
+            self._ready.set()
+            self.loop.close()
+            return
+
+        self._ready.set()
+        self.loop.run_forever()
+
+        # Drop idle keep-alive connections and let in-flight saves finish
+        pending = asyncio.all_tasks(self.loop)
+        for task in pending:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        self.loop.run_until_complete(self.loop.shutdown_default_executor())
+        self.loop.close()
+
+    def switch_store(self, store, list_name):
+        """Serve another store from now on (the UI switched lists)"""
+        if self.loop is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self._switch_store, store, list_name)
+
+    def _switch_store(self, store, list_name):
+        # Runs on the loop thread, between requests
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+            for unsaved in self._unsaved:
+                unsaved.save()
+            self._unsaved.clear()
+        self.store = store
+        self.list_name = list_name
+
+    def _shutdown(self):
+        self.server.close()
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+        # Every list written to since the last flush, the /sync list included
+        stores, self._unsaved = self._unsaved, set()
+        for store in stores:
+            store.save()
+        self.loop.stop()
+
+    def _schedule_save(self, store=None):
+        # Coalesce bursts of writes into a single save off the event loop
+        self._unsaved.add(store if store is not None else self.store)
+        if self._save_handle is None:
+            self._save_handle = self.loop.call_later(API_SAVE_DELAY, self._flush)
+
+    def _flush(self):
+        self._save_handle = None
+        stores, self._unsaved = self._unsaved, set()
+        for store in stores:
+            self.loop.run_in_executor(None, store.save)
+
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                headers = {}
+                try:
+                    # readline raises ValueError on a line longer than the stream limit
+                    request_line = await reader.readline()
+                    if not request_line:
+                        break
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        name, _, value = line.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+
+                    method, target, http_version = request_line.decode("latin-1").split()
+                    length = int(headers.get("content-length") or 0)
+                    if length > API_MAX_BODY:
+                        raise ApiError(413, "request body too large")
+                    body = await reader.readexactly(length) if length else b""
+                    status, body, extra = self._dispatch(method, target, headers, body)
+                except ApiError as e:
+                    status, body, extra = e.status, self._encode({"error": str(e)}), {}
+                    http_version, headers["connection"] = "HTTP/1.1", "close"
+                except ValueError:
+                    status, body, extra = 400, self._encode({"error": "malformed request"}), {}
+                    http_version, headers["connection"] = "HTTP/1.1", "close"
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception as e:
+                    # A bug in a handler must still answer, not drop the connection
+                    print(f"Error handling API request: {e!r}")
+                    status, body, extra = 500, self._encode({"error": "internal error"}), {}
+                    http_version, headers["connection"] = "HTTP/1.1", "close"
+
+                keep_alive = (
+                    http_version == "HTTP/1.1"
+                    and headers.get("connection", "").lower() != "close"
+                )
+                writer.write(self._render_response(status, body, extra, headers, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Cancelled means we're shutting down; end the connection quietly
+            pass
+        finally:
+            writer.close()
+
+    def _encode(self, payload):
+        if payload is None:
+            return b""
+        return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+    def _render_response(self, status, body, extra, request_headers, keep_alive):
+        lines = [
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+            f"Content-Length: {len(body)}",
+            "Connection: " + ("keep-alive" if keep_alive else "close"),
+        ]
+        if body:
+            lines.append("Content-Type: application/json; charset=utf-8")
+
+        # Allow the local web front-end (file:// or localhost) to call us
+        origin = request_headers.get("origin", "")
+        if origin == "null" or origin.startswith(("http://localhost", "http://127.0.0.1")):
+            lines.append(f"Access-Control-Allow-Origin: {origin}")
+            lines.append("Access-Control-Allow-Methods: GET, POST, PATCH, DELETE, OPTIONS")
+            lines.append("Access-Control-Allow-Headers: Content-Type, If-None-Match")
+            lines.append("Access-Control-Expose-Headers: ETag")
+
+        for name, value in extra.items():
+            lines.append(f"{name}: {value}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+    def _dispatch(self, method, target, headers, body):
+        """Route a request and return (status, encoded body, extra headers)"""
+        # Hold the store lock until the payload is serialized, so the Tk
+        # thread can't mutate a task halfway through the dump
+        with self.store.lock:
+            status, payload, extra = self._route(method, target, headers, body)
+            return status, self._encode(payload), extra
+
+    def _route(self, method, target, headers, body):
+        url = urlsplit(target)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        parts = [unquote(p) for p in url.path.split("/") if p]
+
+        if method == "OPTIONS":
+            return 204, None, {}
+        if parts == ["sync"]:
+            if method != "POST":
+                raise ApiError(405, "method not allowed")
+            return self._sync(self._parse_body(body))
+        if not parts or parts[0] != "tasks" or len(parts) > 3:
+            raise ApiError(404, "not found")
+
+        if len(parts) == 1:
+            if method == "GET":
+                return self._list_tasks(query, headers)
+            if method == "POST":
+                return self._create_task(self._parse_body(body))
+            raise ApiError(405, "method not allowed")
+
+        task_id = parts[1]
+        if len(parts) == 3:
+            if parts[2] != "toggle" or method != "POST":
+                raise ApiError(404, "not found")
+            task = self.store.toggle(task_id)
+            self.store.roll_recurrence(task_id)
+        elif method == "GET":
+            task = self.store.get(task_id)
+        elif method == "PATCH":
+            try:
+                task = self.store.update(task_id, **self._parse_fields(self._parse_body(body)))
+            except ValueError as e:
+                raise ApiError(400, str(e))
+            self.store.roll_recurrence(task_id)
+        elif method == "DELETE":
+            task = self.store.remove(task_id)
+        else:
+            raise ApiError(405, "method not allowed")
+
+        if task is None:
+            raise ApiError(404, "no such task")
+        if method != "GET":
+            self._schedule_save()
+        return 200, task, {}
+
+    def _list_tasks(self, query, headers):
+        status_filter = query.get("filter", "all")
+        if status_filter not in FILTERS:
+            raise ApiError(400, f"unknown filter: {status_filter}")
+        sort_mode = query.get("sort", "manual")
+        if sort_mode not in SORT_MODES:
+            raise ApiError(400, f"unknown sort: {sort_mode}")
+        today = date.today()
+        search = f'{FILTER_QUERIES[status_filter]} {query.get("q", "")}'.strip()
+        try:
+            plan = compile_query(search, today)
+        except ValueError as e:
+            raise ApiError(400, str(e))
+
+        # The overdue tab changes at midnight without any mutation, and
+        # another list's version numbers mean nothing for this one
+        etag = f'"{self.list_name}-{self.store.version}-{today.toordinal()}"'
+        if headers.get("if-none-match") == etag:
+            return 304, None, {"ETag": etag}
+
+        changed = None
+        # Whether a task is in the top K can't be told from that task alone,
+        # so FOCUS is always sent in full. A `since` from another list (or
+        # one that doesn't say) gets a full listing of this one instead.
+        if "since" in query and status_filter != "focus" and query.get("list") == self.list_name:
+            try:
+                changed = self.store.changes_since(int(query["since"]))
+            except ValueError:
+                raise ApiError(400, "since must be an integer version")
+
+        if changed is None and status_filter == "focus":
+            index = self.store.tag_index
+            payload = {
+                "list": self.list_name,
+                "version": self.store.version,
+                "full": True,
+                "tasks": self.store.most_urgent(
+                    FOCUS_SIZE, lambda t: plan.matches(t, index), lambda: plan.run(self.store)
+                )
+            }
+        elif changed is None:
+            payload = {
+                "list": self.list_name,
+                "version": self.store.version,
+                "full": True,
+                "tasks": plan.run(self.store, sort_mode)
+            }
+        else:
+            tasks, removed = [], []
+            for task_id in changed:
+                task = self.store.get(task_id)
+                if task is not None and plan.matches(task, self.store.tag_index):
+                    tasks.append(task)
+                else:
+                    removed.append(task_id)
+            payload = {
+                "list": self.list_name,
+                "version": self.store.version,
+                "full": False,
+                "tasks": tasks,
+                "removed": removed
+            }
+        return 200, payload, {"ETag": etag}
+
+    def _sync(self, data):
+        try:
+            result = self.sync_engine.sync(data)
+        except ValueError as e:
+            raise ApiError(400, str(e))
+        if data.get("ops"):
+            self._schedule_save(self.sync_store)
+        return 200, result, {}
+
+    def _create_task(self, data):
+        fields = self._parse_fields(data)
+        if "text" not in fields:
+            raise ApiError(400, "text is required")
+        task = new_task(
+            fields["text"], fields.get("priority", "NONE"), fields.get("due_date"),
+            fields.get("tags"), fields.get("parent"),
+            recurrence=fields.get("recurrence"), blocked_by=fields.get("blocked_by")
+        )
+        with self.store.lock:
+            try:
+                self.store.tree.check_link(task["id"], task["parent"])
+                self.store.deps.check_links(task["id"], task["blocked_by"])
+            except ValueError as e:
+                raise ApiError(400, str(e))
+            self.store.add(task)
+        self._schedule_save()
+        return 201, task, {}
+
+    def _parse_body(self, body):
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise ApiError(400, "body is not valid JSON")
+        if not isinstance(data, dict):
+            raise ApiError(400, "body must be a JSON object")
+        return data
+
+    def _parse_fields(self, data):
+        """Validate the editable fields of a request body"""
+        fields = {}
+        if "text" in data:
+            text = str(data["text"] or "").strip()
+            if not text:
+                raise ApiError(400, "text must not be empty")
+            fields["text"] = text
+        if "priority" in data:
+            if not isinstance(data["priority"], str) or data["priority"] not in PRIORITIES:
+                raise ApiError(400, f"priority must be one of {', '.join(PRIORITIES)}")
+            fields["priority"] = data["priority"]
+        if "due_date" in data:
+            if data["due_date"] is not None and not isinstance(data["due_date"], str):
+                raise ApiError(400, "due_date must be YYYY-MM-DD")
+            due = normalize_due_date(data["due_date"])
+            if data["due_date"] and due is None:
+                raise ApiError(400, "due_date must be YYYY-MM-DD")
+            fields["due_date"] = due
+        if "completed" in data:
+            if not isinstance(data["completed"], bool):
+                raise ApiError(400, "completed must be true or false")
+            fields["completed"] = data["completed"]
+        if "tags" in data:
+            tags = data["tags"]
+            if not (isinstance(tags, str) or isinstance(tags, list) and all(isinstance(t, str) for t in tags)):
+                raise ApiError(400, "tags must be a list of strings or a string")
+            fields["tags"] = normalize_tags(data["tags"])
+        if "recurrence" in data:
+            if data["recurrence"] is not None and not isinstance(data["recurrence"], str):
+                raise ApiError(400, "recurrence must be a string or null")
+            try:
+                fields["recurrence"] = parse_recurrence(data["recurrence"])
+            except ValueError as e:
+                raise ApiError(400, str(e))
+        if "parent" in data:
+            if data["parent"] is not None and not isinstance(data["parent"], str):
+                raise ApiError(400, "parent must be a task id or null")
+            fields["parent"] = data["parent"] or None
+        if "blocked_by" in data:
+            blocked_by = data["blocked_by"] or []
+            if not isinstance(blocked_by, list) or not all(isinstance(b, str) for b in blocked_by):
+                raise ApiError(400, "blocked_by must be a list of task ids")
+            fields["blocked_by"] = normalize_ids(blocked_by)
+        return fields
+
+
+def instance_socket_path(directory):
+    """Where the instance using the task files in `directory` listens.
+
+    The socket sits in a per-user directory (see check_private_dir), so
+    nobody else can connect to it or plant one in its place.
+    """
+    uid = getattr(os, "getuid", lambda: "")()
+    digest = hashlib.sha1(f"{uid}:{os.path.abspath(directory)}".encode()).hexdigest()[:12]
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(base, f"todo_app-{uid}", f"{digest}.sock")
+
+
+def check_private_dir(path, create=False):
+    """Raise OSError unless `path` is a real directory that only we own and can enter"""
+    if create:
+        try:
+            os.mkdir(path, 0o700)
+        except FileExistsError:
+            pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{path} is not a private directory")
+
+
+def send_instance_command(path, command, timeout=INSTANCE_TIMEOUT):
+    """Hand `command` to the running instance and return its reply.
+
+    Returns None if no instance is listening on `path`.
+    """
+    try:
+        check_private_dir(os.path.dirname(path))
+    except OSError:
+        # Missing, or not ours: either way there is no instance to talk to
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        try:
+            sock.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            return None
+        sock.sendall(json.dumps(command).encode() + b"\n")
+        line = sock.makefile("rb").readline(INSTANCE_MAX_MESSAGE)
+        return json.loads(line) if line else {"ok": False, "error": "no answer from the running instance"}
+    except (OSError, ValueError) as e:
+        return {"ok": False, "error": f"running instance did not answer: {e}"}
+    finally:
+        sock.close()
+
+
+class InstanceServer:
+    """Makes this process the one instance working on a set of task files.
+
+    `claim()` binds the socket before anything is loaded, so a launch that
+    loses the race finds it at once. Each connection carries one JSON
+    command and gets one JSON line back:
+
+        {"cmd": "ping"}
+        {"cmd": "show", "list": <name or null>}
+        {"cmd": "add", "text", "priority", "due_date", "list": <name or null>}
+
+    Commands are checked on the server thread (`list_names` gives the lists
+    that exist) and then handed to `on_command` on the Tk thread through
+    JobRunner.post.
+    """
+    def __init__(self, path, list_names=None):
+        self.path = path
+        self.list_names = list_names
+        self.sock = None
+        self.jobs = None
+        self.on_command = None
+        self.thread = None
+
+    def claim(self):
+        """Listen on the socket. Returns False if another instance answers there."""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            check_private_dir(os.path.dirname(self.path), create=True)
+            try:
+                sock.bind(self.path)
+            except OSError:
+                if send_instance_command(self.path, {"cmd": "ping"}) is not None:
+                    sock.close()
+                    return False
+                # Left behind by an instance that crashed: nobody listens, take it over
+                os.unlink(self.path)
+                sock.bind(self.path)
+            # Launches that connect before start() wait in the backlog
+            sock.listen(8)
+        except OSError as e:
+            print(f"Single-instance socket unavailable: {e}")
+            sock.close()
+            return True
+        self.sock = sock
+        return True
+
+    def start(self, jobs, on_command):
+        if self.sock is None:
+            return
+        self.jobs = jobs
+        self.on_command = on_command
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.sock is None:
+            return
+        self.sock.close()
+        self.sock = None
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def _serve(self):
+        sock = self.sock
+        while True:
+            try:
+                conn, _ = sock.accept()
+            except OSError:
+                return  # closed by stop()
+            with conn:
+                conn.settimeout(INSTANCE_TIMEOUT)
+                try:
+                    command = self._clean(json.loads(conn.makefile("rb").readline(INSTANCE_MAX_MESSAGE)))
+                    if command["cmd"] != "ping":
+                        self.jobs.post(self.on_command, command)
+                    reply = {"ok": True}
+                except (OSError, ValueError) as e:
+                    reply = {"ok": False, "error": str(e)}
+                except Exception as e:
+                    # Never let one bad command end the accept loop
+                    print(f"Error handling instance command: {e!r}")
+                    reply = {"ok": False, "error": "internal error"}
+                try:
+                    conn.sendall(json.dumps(reply).encode() + b"\n")
+                except OSError:
+                    pass
+
+    def _clean(self, command):
+        if not isinstance(command, dict):
+            raise ValueError("command must be an object")
+        kind = command.get("cmd")
+        if not isinstance(kind, str):
+            raise ValueError("cmd must be a string")
+        if kind == "ping":
+            return {"cmd": "ping"}
+        name = command.get("list")
+        if name is not None:
+            if not (isinstance(name, str) and WORKSPACE_NAME.fullmatch(name)):
+                raise ValueError(f"bad list name: {name}")
+            if self.list_names is not None and name not in self.list_names():
+                raise ValueError(f"no list named '{name}'")
+        if kind == "show":
+            return {"cmd": "show", "list": name}
+        if kind == "add":
+            text = command.get("text")
+            if not isinstance(text, str) or not split_tags(text.strip())[0]:
+                raise ValueError("text is required")
+            priority = command.get("priority", "NONE")
+            if not isinstance(priority, str) or priority not in PRIORITIES:
+                raise ValueError(f"unknown priority: {priority}")
+            due_date = command.get("due_date")
+            if due_date is not None and not (isinstance(due_date, str) and normalize_due_date(due_date)):
+                raise ValueError(f"not a date: {due_date}")
+            return {
+                "cmd": "add", "text": text, "priority": priority,
+                "due_date": normalize_due_date(due_date), "list": name
+            }
+        raise ValueError(f"unknown command: {kind}")
+
+
+class ToDoApp(ctk.CTk):
+    def __init__(self, api_port=None, workspace=DEFAULT_WORKSPACE, rows="widgets", instance=None):
+        super().__init__()
+        
+        self.title("ZERETSU_TASKS_SYS_V2")
+        self.geometry("580x820")
+        self.minsize(500, 650)
+        self.configure(fg_color=COLOR_BG)
+        
+        # Data
+        self.jobs = JobRunner(self)
+        self.pending_saves = set()   # stores with a save job queued
+        self.workspace_load = None   # token of the list being loaded, if any
+        self.workspaces = WorkspaceCache(os.path.dirname(os.path.abspath(__file__)), jobs=self.jobs)
+        if workspace not in self.workspaces.names():
+            print(f"No list named '{workspace}', opening '{DEFAULT_WORKSPACE}'")
+            workspace = DEFAULT_WORKSPACE
+        self.workspace = self.workspaces.open(workspace)
+        self.current_filter = "all"
+        self.sort_mode = "manual"
+        self.tag_filter = {}     # tag -> "include" or "exclude"
+        self.tag_match_any = False
+        self.tag_chip_key = None
+        self.search_query = ""
+        self.fuzzy_search = False
+        self.sound_enabled = True
+        self.row_class = ROW_RENDERERS[rows]
+        self.collapsed = set()   # ids of tasks whose subtasks are folded away
+        self.row_depths = {}     # id -> indent for subtasks nested under a listed parent
+        self.rows = {}          # task_id -> TaskItem currently in the list
+        self.row_order = []     # ids of the rows on screen, top to bottom
+        self.selected = set()
+        self.select_anchor = None
+        self.archive_view = None     # (filter, query) the archive section was built for
+        self.archive_cursor = None   # lazy iterator over matching archived tasks
+        self.archive_rows = {}       # task_id -> TaskItem for archived tasks shown
+        self.notice_job = None
+        self.rendered_version = None
+        self.api_server = None
+        self.mini_frame = None       # set while in mini mode (no list widgets)
+        self.reminder_state = None   # (date, list, version) of the last overdue check
+        self.notified_overdue = frozenset()
+        
+        self.create_ui()
+        self.render_tasks()
+        self.setup_keybindings()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self._backup_tick()
+        
+        if api_port:
+            self.start_api_server(api_port)
+        
+        # Commands from later launches (see InstanceServer)
+        self.instance = instance
+        if instance is not None:
+            instance.start(self.jobs, self.handle_command)
+    
+    @property
+    def store(self):
+        return self.workspace.store
+    
+    @property
+    def archive(self):
+        return self.workspace.archive
+    
+    @property
+    def history(self):
+        return self.workspace.history
+    
+    @property
+    def tasks(self):
+        return self.store.tasks
+    
+    def start_api_server(self, port=API_PORT):
+        # The web front-end syncs with the default list, which stays loaded for it
+        self.workspaces.pinned.add(DEFAULT_WORKSPACE)
+        sync_store = self.workspaces.open(DEFAULT_WORKSPACE).store
+        self.workspaces.get(self.workspace.name)   # keep the shown list most recent
+        self.api_server = TaskApiServer(
+            self.store, port=port, sync_store=sync_store, list_name=self.workspace.name
+        )
+        if not self.api_server.start():
+            self.api_server = None
+            return
+        print(f"API listening on http://{API_HOST}:{port}/tasks")
+        self._poll_api_changes()
+    
+    def _poll_api_changes(self):
+        """Re-render when the API server has changed the store behind our back"""
+        if self.api_server is None:
+            return
+        if self.store.version != self.rendered_version:
+            self.render_tasks()
+        self.after(API_POLL_MS, self._poll_api_changes)
+    
+    def check_reminders(self):
+        """Toast tasks that turned overdue since the last check, every minute.
+
+        Tasks only turn overdue when the date or the list changes, so most
+        ticks stop at the state check; the scan itself runs as a job.
+        """
+        state = (date.today(), self.workspace.name, self.store.version)
+        if self.reminder_state is not None and state[0] != self.reminder_state[0]:
+            # New day: the OVERDUE and FOCUS tabs move without any edit
+            self.render_tasks()
+        if state != self.reminder_state:
+            self.reminder_state = state
+            check_overdue_notifications(
+                self.store.snapshot(), self.jobs, self.notified_overdue, self._on_overdue_checked
+            )
+        self.after(REMINDER_INTERVAL_MS, self.check_reminders)
+    
+    def _on_overdue_checked(self, overdue_ids):
+        # Tasks that stop being overdue (done, rescheduled) get announced again next time
+        self.notified_overdue = frozenset(overdue_ids)
+    
+    def _backup_tick(self):
+        """Snapshot every loaded list that changed; the work runs as a background job"""
+        for workspace in self.workspaces.loaded.values():
+            workspace.backups.schedule(workspace.store, self.jobs)
+        self.after(BACKUP_INTERVAL_MS, self._backup_tick)
+    
+    def on_close(self):
+        if self.api_server is not None:
+            self.api_server.stop()
+            self.api_server = None
+        if self.instance is not None:
+            self.instance.stop()
+            self.instance = None
+        if self.workspace_load is not None:
+            self.workspace_load.cancel()
+        self.jobs.shutdown()
+        # Saves still queued would be lost with the daemon workers; write them now
+        self.workspaces.flush()
+        self.destroy()
+    
+    def setup_keybindings(self):
+        """Setup keyboard shortcuts"""
+        self.bind("<Control-n>", lambda e: self.task_entry.focus())
+        self.bind("<Control-f>", lambda e: self.search_entry.focus())
+        self.bind("<Control-1>", lambda e: self.set_filter("all"))
+        self.bind("<Control-2>", lambda e: self.set_filter("pending"))
+        self.bind("<Control-3>", lambda e: self.set_filter("completed"))
+        self.bind("<Control-m>", lambda e: self.toggle_sound())
+        self.bind("<Control-z>", lambda e: self.undo())
+        self.bind("<Control-y>", lambda e: self.redo())
+        self.bind("<Control-Z>", lambda e: self.redo())  # Ctrl+Shift+Z
+        self.bind("<Control-a>", self.select_all)
+        self.bind("<Escape>", self.clear_selection)
+        self.bind("<Control-period>", lambda e: self.enter_mini_mode())
+    
+    def clear_keybindings(self):
+        """Drop the shortcuts whose targets only exist in the full window"""
+        for sequence in (
+            "<Control-n>", "<Control-f>", "<Control-1>", "<Control-2>", "<Control-3>", "<Control-m>",
+            "<Control-z>", "<Control-y>", "<Control-Z>", "<Control-a>", "<Escape>", "<Control-period>"
+        ):
+            self.unbind(sequence)
+    
+    # --- Mini mode ---
+    
+    def enter_mini_mode(self):
+        """Swap the full window for a one-line quick-add bar.
+
+        The whole widget tree is destroyed, which also ends the row pulse
+        animations. The store, jobs, API, backups and overdue reminders keep
+        running, and the job pump slows down.
+        """
+        if self.mini_frame is not None:
+            return
+        if self.workspace_load is not None:
+            self.workspace_load.cancel()
+            self.workspace_load = None
+        if self.notice_job is not None:
+            self.after_cancel(self.notice_job)
+            self.notice_job = None
+        self.clear_keybindings()
+        self.main_frame.destroy()
+        self.rows = {}
+        self.row_order = []
+        self.archive_rows = {}
+        self.archive_cursor = None
+        self.archive_view = None
+        self.selected = set()
+        self.select_anchor = None
+        self.tag_chip_key = None
+        self.rendered_version = None
+        self.jobs.interval = JOB_PUMP_IDLE_MS
+        
+        self.minsize(300, 70)
+        self.geometry(MINI_GEOMETRY)
+        self.mini_frame = ctk.CTkFrame(
+            self,
+            fg_color=COLOR_BG,
+            corner_radius=0,
+            border_width=1,
+            border_color=COLOR_DIM
+        )
+        self.mini_frame.pack(fill="both", expand=True, padx=6, pady=6)
+        
+        input_row = ctk.CTkFrame(self.mini_frame, fg_color="transparent")
+        input_row.pack(fill="x", padx=8, pady=(8, 2))
+        ctk.CTkLabel(
+            input_row,
+            text="> ",
+            font=ctk.CTkFont(family=FONT_MONO, size=14),
+            text_color=COLOR_ACCENT
+        ).pack(side="left")
+        # add_task reads this entry, so quick-add works exactly like the full one
+        self.task_entry = ctk.CTkEntry(
+            input_row,
+            placeholder_text="QUICK_ADD... #tag",
+            font=ctk.CTkFont(family=FONT_MONO, size=12),
+            height=30,
+            corner_radius=0,
+            border_width=1,
+            fg_color=COLOR_BG,
+            border_color=COLOR_DIM,
+            text_color=COLOR_ACCENT,
+            placeholder_text_color=COLOR_DIM
+        )
+        self.task_entry.pack(side="left", fill="x", expand=True, padx=(5, 8))
+        self.task_entry.bind("<Return>", lambda e: self.add_task())
+        MatrixButton(
+            input_row,
+            text="EXPAND",
+            width=64,
+            height=30,
+            command=self.exit_mini_mode
+        ).pack(side="right")
+        
+        self.mini_label = ctk.CTkLabel(
+            self.mini_frame,
+            text="",
+            height=16,
+            font=ctk.CTkFont(family=FONT_MONO, size=10),
+            text_color=COLOR_DIM,
+            anchor="w"
+        )
+        self.mini_label.pack(fill="x", padx=12, pady=(0, 6))
+        self.render_tasks()
+    
+    def exit_mini_mode(self):
+        """Bring the full window back; only the rows the current view shows are built"""
+        if self.mini_frame is None:
+            return
+        self.mini_frame.destroy()
+        self.mini_frame = None
+        self.jobs.interval = JOB_PUMP_MS
+        self.minsize(500, 650)
+        self.geometry("580x820")
+        
+        self.create_ui()
+        # Put the view state back on the new controls
+        if self.search_query:
+            self.search_entry.insert(0, self.search_query)
+        if not self.sound_enabled:
+            self.sound_btn.configure(text="SND:OFF")
+        if self.fuzzy_search:
+            self.fuzzy_btn.configure(text="FUZZY:ON", text_color=COLOR_ACCENT)
+        if self.current_filter != "all":
+            self.filter_btns[self.current_filter].configure(
+                border_color=COLOR_ACCENT, text_color=COLOR_ACCENT, fg_color="#002200"
+            )
+        self.setup_keybindings()
+        self.render_tasks()
+    
+    def _render_mini(self):
+        self.rendered_version = self.store.version
+        with self.store.lock:
+            open_count = self.store.tag_index.bitmap("status", "open").bit_count()
+        overdue = len(compile_query("is:overdue", date.today()).run(self.store))
+        self.mini_label.configure(
+            text=f"LIST: {self.workspace.name.upper()} | OPEN: {open_count:03d} | OVERDUE: {overdue:03d}",
+            text_color=COLOR_HIGH if overdue else COLOR_DIM
+        )
+    
+    def toggle_sound(self):
+        self.sound_enabled = not self.sound_enabled
         status = "ON" if self.sound_enabled else "OFF"
         self.sound_btn.configure(text=f"SND:{status}")
     
@@ -799,15 +4755,68 @@ class ToDoApp(ctk.CTk):
         )
         self.sound_btn.pack(side="right")
         
+        # Bulk import/export, and the switch to mini mode
+        for text, command in (
+            ("MINI", self.enter_mini_mode),
+            ("EXPORT", self.export_tasks_dialog),
+            ("IMPORT", self.import_tasks_dialog)
+        ):
+            ctk.CTkButton(
+                header_row,
+                text=text,
+                width=60,
+                height=24,
+                corner_radius=0,
+                fg_color="transparent",
+                text_color=COLOR_DIM,
+                border_width=1,
+                border_color=COLOR_BORDER,
+                font=ctk.CTkFont(family=FONT_MONO, size=10),
+                command=command
+            ).pack(side="right", padx=(0, 5))
+        
+        # List switcher
+        list_row = ctk.CTkFrame(self.main_frame, fg_color="transparent")
+        list_row.pack(fill="x", pady=(0, 5))
+        
+        ctk.CTkLabel(
+            list_row,
+            text="> LIST:",
+            font=ctk.CTkFont(family=FONT_MONO, size=11),
+            text_color=COLOR_DIM
+        ).pack(side="left", padx=(0, 8))
+        
+        self.workspace_var = ctk.StringVar(value=self.workspace.name)
+        self.workspace_menu = ctk.CTkOptionMenu(
+            list_row,
+            variable=self.workspace_var,
+            values=self.workspaces.names() + [NEW_WORKSPACE_LABEL],
+            command=self._on_workspace_menu,
+            font=ctk.CTkFont(family=FONT_MONO, size=11),
+            width=160,
+            height=24,
+            corner_radius=0,
+            fg_color=COLOR_CARD,
+            button_color=COLOR_DIM,
+            button_hover_color=COLOR_ACCENT,
+            dropdown_fg_color=COLOR_BG,
+            dropdown_text_color=COLOR_ACCENT,
+            dropdown_hover_color=COLOR_DIM,
+            text_color=COLOR_ACCENT
+        )
+        self.workspace_menu.pack(side="left")
+        
         # Separator
         ctk.CTkFrame(self.main_frame, height=2, fg_color=COLOR_DIM).pack(fill="x", pady=(0, 15))
         
         # Keyboard shortcuts hint
         ctk.CTkLabel(
             self.main_frame,
-            text="HOTKEYS: Ctrl+N=New | Ctrl+F=Search | Ctrl+1/2/3=Filter | Ctrl+M=Sound",
+            text="HOTKEYS: Ctrl+N=New | Ctrl+F=Search | Ctrl+1/2/3=Filter | Ctrl+M=Sound | Ctrl+Z/Y=Undo/Redo | Shift+Enter=Subtask | Ctrl+.=Mini",
             font=ctk.CTkFont(family=FONT_MONO, size=9),
-            text_color="#003300"
+            text_color="#003300",
+            wraplength=520,
+            justify="left"
         ).pack(anchor="w", pady=(0, 10))
         
         # Stats Console
@@ -846,7 +4855,7 @@ class ToDoApp(ctk.CTk):
         
         self.search_entry = ctk.CTkEntry(
             search_frame,
-            placeholder_text="FILTER_BY_KEYWORD...",
+            placeholder_text="SEARCH... priority:HIGH due<2026-11-01 is:open #tag",
             font=ctk.CTkFont(family=FONT_MONO, size=12),
             height=32,
             corner_radius=0,
@@ -866,6 +4875,21 @@ class ToDoApp(ctk.CTk):
             height=32,
             command=self._clear_search
         ).pack(side="right")
+        
+        self.fuzzy_btn = ctk.CTkButton(
+            search_frame,
+            text="FUZZY:OFF",
+            width=80,
+            height=32,
+            corner_radius=0,
+            fg_color="transparent",
+            text_color=COLOR_DIM,
+            border_width=1,
+            border_color=COLOR_BORDER,
+            font=ctk.CTkFont(family=FONT_MONO, size=10),
+            command=self.toggle_fuzzy
+        )
+        self.fuzzy_btn.pack(side="right", padx=(0, 5))
 
         # Input Prompt with priority
         input_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
@@ -892,6 +4916,7 @@ class ToDoApp(ctk.CTk):
         )
         self.task_entry.pack(side="left", fill="x", expand=True, padx=(5, 10))
         self.task_entry.bind("<Return>", lambda e: self.add_task())
+        self.task_entry.bind("<Shift-Return>", lambda e: self.add_task(as_subtask=True))
         self.task_entry.bind("<FocusIn>", lambda e: self.task_entry.configure(border_color=COLOR_ACCENT))
         self.task_entry.bind("<FocusOut>", lambda e: self.task_entry.configure(border_color=COLOR_DIM))
         
@@ -934,7 +4959,9 @@ class ToDoApp(ctk.CTk):
             ("pending", "ACTIVE"),
             ("completed", "DONE"),
             ("high", "!HIGH"),
-            ("overdue", "OVERDUE")
+            ("overdue", "OVERDUE"),
+            ("next", "NEXT"),
+            ("focus", "FOCUS")
         ]
         
         for fid, text in filters:
@@ -943,28 +4970,156 @@ class ToDoApp(ctk.CTk):
                 text=text,
                 font=ctk.CTkFont(family=FONT_MONO, size=10, weight="bold"),
                 height=28,
-                width=70,
+                width=56,
+                corner_radius=0,
+                fg_color=COLOR_BG,
+                text_color=COLOR_DIM,
+                border_width=1,
+                border_color=COLOR_BORDER,
+                command=lambda f=fid: self.set_filter(f)
+            )
+            btn.pack(side="left", padx=(0, 4))
+            self.filter_btns[fid] = btn
+        
+        # Sort selector
+        self.sort_labels = {label: mode for mode, (label, _, _) in SORT_MODES.items()}
+        self.sort_var = ctk.StringVar(value=SORT_MODES[self.sort_mode][0])
+        ctk.CTkOptionMenu(
+            filter_frame,
+            variable=self.sort_var,
+            values=list(self.sort_labels),
+            command=lambda label: self.set_sort(self.sort_labels[label]),
+            font=ctk.CTkFont(family=FONT_MONO, size=10),
+            width=100,
+            height=28,
+            corner_radius=0,
+            fg_color=COLOR_CARD,
+            button_color=COLOR_DIM,
+            button_hover_color=COLOR_ACCENT,
+            dropdown_fg_color=COLOR_BG,
+            dropdown_text_color=COLOR_ACCENT,
+            dropdown_hover_color=COLOR_DIM,
+            text_color=COLOR_ACCENT
+        ).pack(side="right")
+        
+        # Tag chips: click cycles include -> exclude -> off
+        self.tag_bar = ctk.CTkFrame(self.main_frame, fg_color="transparent")
+
+        # Transient notices (undo hints)
+        self.notice_label = ctk.CTkLabel(
+            self.main_frame,
+            text="",
+            height=16,
+            font=ctk.CTkFont(family=FONT_MONO, size=10),
+            text_color=COLOR_MED,
+            anchor="w"
+        )
+        self.notice_label.pack(fill="x", pady=(0, 4))
+
+        # Task List
+        self.list_frame = ctk.CTkScrollableFrame(
+            self.main_frame,
+            fg_color="transparent",
+            corner_radius=0,
+            scrollbar_button_color=COLOR_DIM,
+            scrollbar_button_hover_color=COLOR_ACCENT,
+            border_width=1,
+            border_color=COLOR_BORDER
+        )
+        self.list_frame.pack(fill="both", expand=True)
+        
+        self.empty_label = ctk.CTkLabel(
+            self.list_frame,
+            text="",
+            font=ctk.CTkFont(family=FONT_MONO, size=14),
+            text_color=COLOR_DIM
+        )
+        
+        # Archived tasks, loaded a page at a time under the live rows
+        self.archive_frame = ctk.CTkFrame(self.list_frame, fg_color="transparent")
+        self.archive_more_btn = MatrixButton(
+            self.archive_frame,
+            text="LOAD FROM COLD STORAGE",
+            height=30,
+            command=self.load_archive_page
+        )
+        
+        # Batch actions for the selected rows (shown while something is selected)
+        self.batch_bar = ctk.CTkFrame(
+            self.main_frame,
+            fg_color=COLOR_SELECTED,
+            corner_radius=0,
+            border_width=1,
+            border_color=COLOR_DIM
+        )
+        self.selection_label = ctk.CTkLabel(
+            self.batch_bar,
+            text="",
+            font=ctk.CTkFont(family=FONT_MONO, size=10, weight="bold"),
+            text_color=COLOR_ACCENT
+        )
+        self.selection_label.pack(side="left", padx=(8, 6), pady=4)
+        
+        batch_actions = [
+            ("DONE", lambda: self.batch_update(completed=True)),
+            ("REOPEN", lambda: self.batch_update(completed=False)),
+            ("WAIT", self.link_selected),
+            ("FREE", lambda: self.batch_update(blocked_by=[])),
+            ("DEL", self.batch_delete)
+        ]
+        for text, command in batch_actions:
+            ctk.CTkButton(
+                self.batch_bar,
+                text=text,
+                width=46,
+                height=24,
+                corner_radius=0,
+                fg_color="transparent",
+                text_color=COLOR_ACCENT,
+                border_width=1,
+                border_color=COLOR_DIM,
+                hover_color=COLOR_DIM,
+                font=ctk.CTkFont(family=FONT_MONO, size=10),
+                command=command
+            ).pack(side="left", padx=(0, 4), pady=4)
+        
+        self.batch_priority = ctk.StringVar(value="PRIORITY")
+        self.batch_due = ctk.StringVar(value="DUE")
+        for variable, values, command in (
+            (self.batch_priority, ["NONE", "LOW", "MED", "HIGH"], self._batch_priority),
+            (self.batch_due, [label for label, _ in BATCH_DUE_OPTIONS], self._batch_due)
+        ):
+            ctk.CTkOptionMenu(
+                self.batch_bar,
+                variable=variable,
+                values=values,
+                command=command,
+                font=ctk.CTkFont(family=FONT_MONO, size=10),
+                width=76,
+                height=24,
                 corner_radius=0,
-                fg_color=COLOR_BG,
-                text_color=COLOR_DIM,
-                border_width=1,
-                border_color=COLOR_BORDER,
-                command=lambda f=fid: self.set_filter(f)
-            )
-            btn.pack(side="left", padx=(0, 4))
-            self.filter_btns[fid] = btn
-
-        # Task List
-        self.list_frame = ctk.CTkScrollableFrame(
-            self.main_frame,
-            fg_color="transparent",
+                fg_color=COLOR_CARD,
+                button_color=COLOR_DIM,
+                button_hover_color=COLOR_ACCENT,
+                dropdown_fg_color=COLOR_BG,
+                dropdown_text_color=COLOR_ACCENT,
+                dropdown_hover_color=COLOR_DIM,
+                text_color=COLOR_ACCENT
+            ).pack(side="left", padx=(0, 4), pady=4)
+        
+        ctk.CTkButton(
+            self.batch_bar,
+            text="X",
+            width=24,
+            height=24,
             corner_radius=0,
-            scrollbar_button_color=COLOR_DIM,
-            scrollbar_button_hover_color=COLOR_ACCENT,
+            fg_color="transparent",
+            text_color=COLOR_DIM,
             border_width=1,
-            border_color=COLOR_BORDER
-        )
-        self.list_frame.pack(fill="both", expand=True)
+            border_color=COLOR_BORDER,
+            font=ctk.CTkFont(family=FONT_MONO, size=10),
+            command=self.clear_selection
+        ).pack(side="right", padx=(0, 6), pady=4)
 
         # Footer
         self.clear_btn = MatrixButton(
@@ -978,118 +5133,370 @@ class ToDoApp(ctk.CTk):
         self.search_query = self.search_entry.get().strip().lower()
         self.render_tasks()
     
+    def toggle_fuzzy(self):
+        self.fuzzy_search = not self.fuzzy_search
+        self.fuzzy_btn.configure(
+            text="FUZZY:ON" if self.fuzzy_search else "FUZZY:OFF",
+            text_color=COLOR_ACCENT if self.fuzzy_search else COLOR_DIM
+        )
+        self.render_tasks()
+    
     def _clear_search(self):
         self.search_entry.delete(0, "end")
         self.search_query = ""
         self.render_tasks()
 
+    def _on_workspace_menu(self, choice):
+        if choice != NEW_WORKSPACE_LABEL:
+            self.switch_workspace(choice)
+            return
+        self.workspace_var.set(self.workspace.name)
+        dialog = ctk.CTkInputDialog(title="NEW_LIST", text="NAME FOR THE NEW LIST:")
+        name = dialog.get_input()
+        if not name:
+            return
+        try:
+            workspace = self.workspaces.create(name)
+        except ValueError as e:
+            self.show_notice(str(e).upper())
+            return
+        self.switch_workspace(workspace.name)
+    
+    def switch_workspace(self, name):
+        """Show another list; one that isn't cached is loaded by a job first"""
+        if self.workspace_load is not None:
+            # Only the last list picked gets shown
+            self.workspace_load.cancel()
+            self.workspace_load = None
+        if name == self.workspace.name:
+            self.workspace_var.set(name)
+            return
+        workspace = self.workspaces.get(name)
+        if workspace is not None:
+            self._show_workspace(workspace)
+            return
+        self.show_notice(f"LOADING LIST '{name.upper()}'...")
+        self.workspace_load = self.jobs.submit(
+            lambda token: self.workspaces.load(name),
+            priority=JOB_INTERACTIVE,
+            on_done=self._on_workspace_loaded,
+            on_error=lambda e: self.show_notice(f"CANNOT LOAD '{name.upper()}': {e}")
+        )
+    
+    def _on_workspace_loaded(self, workspace):
+        self.workspace_load = None
+        self._show_workspace(self.workspaces.get(workspace.name) or self.workspaces.put(workspace))
+    
+    def _show_workspace(self, workspace):
+        name = workspace.name
+        self.workspace = workspace
+        if self.api_server is not None:
+            self.api_server.switch_store(self.store, name)
+        
+        # Rows, selection and archive paging all belong to the old list
+        for row in list(self.rows.values()) + list(self.archive_rows.values()):
+            row.destroy()
+        self.rows = {}
+        self.row_order = []
+        self.archive_rows = {}
+        self.archive_cursor = None
+        self.archive_view = None
+        self.selected = set()
+        self.select_anchor = None
+        self.tag_filter = {}
+        
+        self.workspace_var.set(name)
+        if self.mini_frame is None:
+            self.workspace_menu.configure(values=self.workspaces.names() + [NEW_WORKSPACE_LABEL])
+        if self.sound_enabled:
+            play_sound("click")
+        self.render_tasks()
+    
     def load_tasks(self):
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    # Migrate old tasks to new format
-                    for task in data:
-                        if "priority" not in task:
-                            task["priority"] = "NONE"
-                        if "due_date" not in task:
-                            task["due_date"] = None
-                    return data
-            except Exception as e:
-                print(f"Error loading tasks: {e}")
-                return []
-        return []
+        return self.store.load()
     
-    def save_tasks(self):
-        try:
-            with open(self.data_file, "w", encoding="utf-8") as f:
-                json.dump(self.tasks, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Error saving tasks: {e}")
+    def save_tasks(self, store=None):
+        """Save a list (the open one by default) in a job; saves requested before it starts share it"""
+        store = store if store is not None else self.store
+        if store in self.pending_saves:
+            return
+        self.pending_saves.add(store)
+        self.jobs.submit(self._save_job, store, priority=JOB_INTERACTIVE)
+    
+    def _save_job(self, token, store):
+        # Dropped before saving, so a change made during the save queues another
+        self.pending_saves.discard(store)
+        store.save()
+    
+    def import_tasks(self, token, store, path, batch_size=IMPORT_BATCH_SIZE, on_progress=None):
+        """Stream tasks in from a CSV/JSONL file, persisting once per batch.
+
+        Runs as a job: it stops between batches once `token` is cancelled,
+        and `on_progress` is called from the worker thread. Records whose id
+        already exists are skipped, so re-importing the same file is
+        harmless. Records imported with a value dropped (e.g. a due date
+        that isn't a date) are counted as warned, and the first
+        IMPORT_WARN_LIMIT of them are printed. Returns (imported, skipped, warned).
+        """
+        known_ids = {t["id"] for t in store.snapshot()}
+        imported = skipped = warned = 0
+        record_no = 0
+        
+        for raw_batch in iter_batches(iter_import_records(path), batch_size):
+            token.check()
+            batch = []
+            for record in raw_batch:
+                record_no += 1
+                warnings = []
+                try:
+                    task = normalize_task(record, warnings)
+                except ValueError:
+                    skipped += 1
+                    continue
+                if task["id"] in known_ids:
+                    skipped += 1
+                    continue
+                known_ids.add(task["id"])
+                batch.append(task)
+                if warnings:
+                    warned += 1
+                    if warned <= IMPORT_WARN_LIMIT:
+                        print(f"Record {record_no} of {path}: {'; '.join(warnings)}")
+            
+            if batch:
+                store.extend(batch)
+                store.save()
+                imported += len(batch)
+            if on_progress:
+                on_progress(imported, skipped, warned)
+        
+        return imported, skipped, warned
+    
+    def import_tasks_dialog(self):
+        path = filedialog.askopenfilename(
+            parent=self,
+            title="IMPORT_PROTOCOL",
+            filetypes=[("Task files", "*.csv *.jsonl *.ndjson"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        self.jobs.submit(
+            self.import_tasks, self.store, path, IMPORT_BATCH_SIZE,
+            lambda *counts: self.jobs.post(self._show_import_progress, *counts),
+            priority=JOB_INTERACTIVE,
+            on_done=lambda result: self._on_import_done(path, *result),
+            on_error=self._on_import_error
+        )
+    
+    def _on_import_done(self, path, imported, skipped, warned):
+        if self.sound_enabled:
+            play_sound("add")
+        self.render_tasks()
+        print(f"Imported {imported} tasks ({skipped} skipped, {warned} with values dropped) from {path}")
+    
+    def _on_import_error(self, error):
+        print(f"Error importing tasks: {error}")
+        # Batches before the error were kept
+        self.render_tasks()
+    
+    def _show_import_progress(self, imported, skipped, warned):
+        if self.mini_frame is not None:
+            return
+        self.stats_label.configure(
+            text=f"IMPORTING... {imported:06d} RECORDS LOADED | {skipped:06d} SKIPPED | {warned:06d} WARNED"
+        )
+    
+    def export_tasks_dialog(self):
+        path = filedialog.asksaveasfilename(
+            parent=self,
+            title="EXPORT_PROTOCOL",
+            defaultextension=".jsonl",
+            filetypes=[("JSON Lines", "*.jsonl"), ("CSV", "*.csv")]
+        )
+        if not path:
+            return
+        tasks = self.store.snapshot()
+        self.jobs.submit(
+            lambda token: export_tasks(tasks, path),
+            priority=JOB_INTERACTIVE,
+            on_done=lambda count: print(f"Exported {count} tasks to {path}"),
+            on_error=lambda e: print(f"Error exporting tasks: {e}")
+        )
     
-    def add_task(self):
-        text = self.task_entry.get().strip()
+    def add_task(self, as_subtask=False):
+        # "#tag" words in the input become tags
+        text, tags = split_tags(self.task_entry.get().strip())
         if not text:
             return
+        # Shift+Enter nests the new task under the one selected task
+        parent = None
+        if as_subtask:
+            parent = next(iter(self.selected)) if len(self.selected) == 1 else None
+            if parent is None or self.store.get(parent) is None:
+                self.show_notice("SELECT ONE TASK, THEN SHIFT+ENTER TO ADD A SUBTASK")
+                return
         
-        task = {
-            "id": str(datetime.now().timestamp()),
-            "text": text,
-            "completed": False,
-            "priority": self.new_priority.get(),
-            "due_date": None,
-            "created_at": datetime.now().isoformat(),
-            "completed_at": None
-        }
-        
-        self.tasks.insert(0, task)
+        task = new_task(text, self.new_priority.get(), tags=tags, parent=parent)
+        self.store.add(task)
+        self.history.record([("remove", task["id"])])
         self.save_tasks()
         self.task_entry.delete(0, "end")
         self.new_priority.set("NONE")
+        if parent is not None:
+            self.collapsed.discard(parent)
+            self.show_notice(f"SUBTASK ADDED UNDER '{self.store.get(parent)['text'][:30].upper()}'")
         
         if self.sound_enabled:
             play_sound("add")
         
         self.render_tasks()
     
+    def handle_command(self, command):
+        """Apply a command another launch handed over (already checked by InstanceServer)"""
+        if self.state() == "iconic":
+            self.deiconify()
+        self.lift()
+        if command["cmd"] == "show":
+            if command["list"] is not None:
+                # The list widgets are gone in mini mode
+                self.exit_mini_mode()
+                self.switch_workspace(command["list"])
+        elif command["cmd"] == "add":
+            # Into the named list (loaded if need be) or the one on screen
+            workspace = self.workspace
+            if command["list"] not in (None, workspace.name):
+                self.workspaces.get(workspace.name)   # most recent, so loading can't evict it
+                workspace = self.workspaces.open(command["list"])
+            text, tags = split_tags(command["text"].strip())
+            task = new_task(text, command["priority"], command["due_date"], tags)
+            workspace.store.add(task)
+            workspace.history.record([("remove", task["id"])])
+            self.save_tasks(workspace.store)
+            if self.sound_enabled:
+                play_sound("add")
+            self.show_notice(f"ADDED TO '{workspace.name.upper()}': '{task['text'][:30].upper()}'")
+            self.render_tasks()
+    
     def toggle_task(self, task_id):
-        for task in self.tasks:
-            if task["id"] == task_id:
-                task["completed"] = not task["completed"]
-                if task["completed"]:
-                    task["completed_at"] = datetime.now().isoformat()
-                    if self.sound_enabled:
-                        play_sound("complete")
-                else:
-                    task["completed_at"] = None
-                break
+        task = self.store.get(task_id)
+        if task is None:
+            return
+        entry = [("update", task_id, {
+            "completed": task["completed"],
+            "completed_at": task.get("completed_at"),
+            "recurrence": task.get("recurrence")
+        })]
+        self.store.toggle(task_id)
+        occurrence = self.store.roll_recurrence(task_id)
+        if occurrence is not None:
+            entry.insert(0, ("remove", occurrence["id"]))
+        self.history.record(entry)
+        if task["completed"] and self.sound_enabled:
+            play_sound("complete")
         self.save_tasks()
         self.render_tasks()
     
     def delete_task(self, task_id):
-        # Find the task to get its name for the dialog
-        task_text = "this task"
-        for t in self.tasks:
-            if t["id"] == task_id:
-                task_text = t["text"][:35] + "..." if len(t["text"]) > 35 else t["text"]
-                break
-        
-        def do_delete():
-            self.tasks = [t for t in self.tasks if t["id"] != task_id]
-            self.save_tasks()
-            if self.sound_enabled:
-                play_sound("delete")
-            self.render_tasks()
-        
-        ConfirmDialog(
-            self,
-            "DELETE_PROTOCOL",
-            f"Permanently delete task:\n'{task_text}'?",
-            do_delete
-        )
+        # No confirmation: deletes are undoable. Subtasks go with their parent.
+        task = self.store.get(task_id)
+        if task is None:
+            return
+        removed = self._remove_subtrees([task_id])
+        self.history.record(removed)
+        self.save_tasks()
+        if self.sound_enabled:
+            play_sound("delete")
+        task_text = task["text"][:35] + "..." if len(task["text"]) > 35 else task["text"]
+        extra = f" +{len(removed) - 1} SUBTASKS" if len(removed) > 1 else ""
+        self.show_notice(f"DELETED '{task_text}'{extra} :: CTRL+Z TO UNDO")
+        self.render_tasks()
+    
+    def _remove_subtrees(self, task_ids):
+        """Delete tasks with all their subtasks; returns the undo ops"""
+        with self.store.lock:
+            ids = set()
+            for task_id in task_ids:
+                ids.update(self.store.tree.subtree(task_id))
+            if len(ids) == 1:
+                task, index = self.store.pop(next(iter(ids)))
+                return [("insert", task, index)] if task is not None else []
+            # Ascending positions, so undo re-inserts each task where it was
+            removed = [("insert", t, i) for i, t in enumerate(self.tasks) if t["id"] in ids]
+            self.store.remove_where(lambda t: t["id"] in ids)
+        return removed
     
     def edit_task(self, task_data):
-        EditDialog(self, task_data, self._save_edit)
-    
-    def _save_edit(self, task_id, new_text, new_priority, new_due):
-        for task in self.tasks:
-            if task["id"] == task_id:
-                task["text"] = new_text
-                task["priority"] = new_priority
-                task["due_date"] = new_due
-                break
+        parent = self.store.get(task_data.get("parent")) if task_data.get("parent") else None
+        EditDialog(self, task_data, self._save_edit, parent_text=parent["text"] if parent else None)
+    
+    def _save_edit(self, task_id, new_text, new_priority, new_due, new_recurrence=None, new_tags=None,
+                   new_parent=None):
+        task = self.store.get(task_id)
+        if task is None:
+            return
+        if new_recurrence and not new_due:
+            # A series always has its current occurrence on the calendar
+            new_due = next(iter_occurrences(new_recurrence, date.today())).strftime("%Y-%m-%d")
+        self.history.record([("update", task_id, {
+            "text": task["text"],
+            "priority": task.get("priority", "NONE"),
+            "due_date": task.get("due_date"),
+            "recurrence": task.get("recurrence"),
+            "tags": task.get("tags") or [],
+            "parent": task.get("parent")
+        })])
+        # The dialog can only keep the parent or drop it, so this never makes a cycle
+        self.store.update(
+            task_id, text=new_text, priority=new_priority, due_date=new_due,
+            recurrence=new_recurrence, tags=new_tags or [], parent=new_parent
+        )
         self.save_tasks()
         if self.sound_enabled:
             play_sound("add")
         self.render_tasks()
     
     def clear_completed(self):
-        self.tasks = [t for t in self.tasks if not t["completed"]]
+        # A done parent stays while any of its subtasks is still open
+        progress = self.store.tree.progress
+        def purgeable(t):
+            done, total = progress[t["id"]]
+            return t["completed"] and done == total
+        with self.store.lock:
+            # Ascending positions, so undo re-inserts each task where it was
+            removed = [("insert", t, i) for i, t in enumerate(self.tasks) if purgeable(t)]
+            self.store.remove_where(purgeable)
+        self.history.record(removed)
         self.save_tasks()
         if self.sound_enabled:
             play_sound("delete")
+        self.show_notice(f"PURGED {len(removed)} PROTOCOLS :: CTRL+Z TO UNDO")
         self.render_tasks()
     
+    def undo(self):
+        if self.history.undo():
+            self.save_tasks()
+            self.show_notice("UNDO :: CTRL+Y TO REDO")
+            self.render_tasks()
+    
+    def redo(self):
+        if self.history.redo():
+            self.save_tasks()
+            self.show_notice("REDO :: CTRL+Z TO UNDO")
+            self.render_tasks()
+    
+    def show_notice(self, text):
+        """Flash a one-line message under the filter tabs"""
+        if self.mini_frame is not None:
+            return
+        if self.notice_job is not None:
+            self.after_cancel(self.notice_job)
+        self.notice_label.configure(text=text)
+        self.notice_job = self.after(NOTICE_MS, self._clear_notice)
+    
+    def _clear_notice(self):
+        self.notice_job = None
+        self.notice_label.configure(text="")
+    
     def set_filter(self, fid):
         self.current_filter = fid
         for key, btn in self.filter_btns.items():
@@ -1103,58 +5510,192 @@ class ToDoApp(ctk.CTk):
             play_sound("click")
         self.render_tasks()
     
+    def set_sort(self, mode):
+        self.sort_mode = mode
+        if self.sound_enabled:
+            play_sound("click")
+        self.render_tasks()
+    
     def get_filtered_tasks(self):
-        filtered = self.tasks
-        
-        # Apply status filter
-        if self.current_filter == "pending":
-            filtered = [t for t in filtered if not t["completed"]]
-        elif self.current_filter == "completed":
-            filtered = [t for t in filtered if t["completed"]]
-        elif self.current_filter == "high":
-            filtered = [t for t in filtered if t.get("priority") == "HIGH" and not t["completed"]]
-        elif self.current_filter == "overdue":
-            today = date.today()
-            result = []
-            for t in filtered:
-                if t["completed"]:
-                    continue
-                due = t.get("due_date")
-                if due:
-                    try:
-                        due_date = datetime.strptime(due, "%Y-%m-%d").date()
-                        if due_date < today:
-                            result.append(t)
-                    except:
-                        pass
-            filtered = result
-        
-        # Apply search filter
-        if self.search_query:
-            filtered = [t for t in filtered if self.search_query in t["text"].lower()]
+        # Collapsed subtrees are skipped before any filter looks at them
+        self.row_depths = {}
+        hidden = self.collapsed_ids()
+        visible = (lambda t: t["id"] not in hidden) if hidden else None
+        if self.fuzzy_search and self.search_query:
+            # Ranked by relevance; tab and tag chips still apply
+            plan = self.current_plan(with_search=False)
+            index = self.store.tag_index
+            if visible is None:
+                matches = lambda t: plan.matches(t, index)
+            else:
+                matches = lambda t: visible(t) and plan.matches(t, index)
+            return self.store.fuzzy_search(self.search_query, matches)
+        if self.current_filter == "focus":
+            # Ranked off the store's urgency heap; tag chips and search still apply
+            plan = self.current_plan()
+            index = self.store.tag_index
+            return self.store.most_urgent(
+                FOCUS_SIZE,
+                lambda t: (visible is None or visible(t)) and plan.matches(t, index),
+                lambda: plan.run(self.store, "manual", visible)
+            )
+        # Tab, tag chips and search text run as one cached query plan
+        return self.nest_subtasks(self.current_plan().run(self.store, self.sort_mode, visible))
+    
+    def collapsed_ids(self):
+        """Ids folded away under a collapsed task, walking each subtree once from its root"""
+        tree = self.store.tree
+        hidden = set()
+        for task_id in self.collapsed:
+            if task_id in tree.completed and task_id not in hidden:
+                hidden.update(tree.subtree(task_id)[1:])
+        return hidden
+    
+    def nest_subtasks(self, tasks):
+        """Move listed subtasks right under their listed parent, keeping the sort within each level.
+
+        Row depths count listed ancestors only, so a subtask whose parent
+        was filtered out starts a new top-level row instead of hanging
+        indented under whatever row happens to be above it.
+        """
+        tree = self.store.tree
+        listed = {t["id"] for t in tasks}
+        roots = []
+        children = {}
+        for task in tasks:
+            parent = tree.parent_of.get(task["id"])
+            if parent in listed:
+                children.setdefault(parent, []).append(task)
+            else:
+                roots.append(task)
+        if not children:
+            return tasks
+        ordered = []
+        depths = self.row_depths
+        stack = [(task, 0) for task in reversed(roots)]
+        while stack:
+            task, depth = stack.pop()
+            ordered.append(task)
+            if depth:
+                depths[task["id"]] = depth
+            stack.extend((child, depth + 1) for child in reversed(children.get(task["id"], ())))
+        return ordered
+    
+    def row_context(self, task):
+        """(depth, (done, total) or None, expanded or None, waiting) for a task's row"""
+        tree = self.store.tree
+        waiting = self.store.deps.open_blockers.get(task["id"], 0)
+        done, total = tree.progress.get(task["id"], (0, 0))
+        depth = self.row_depths.get(task["id"], 0)
+        if not total:
+            return (depth, None, None, waiting)
+        return (depth, (done, total), task["id"] not in self.collapsed, waiting)
+    
+    def toggle_expand(self, task_id):
+        self.collapsed ^= {task_id}
+        if self.sound_enabled:
+            play_sound("click")
+        self.render_tasks()
+    
+    def current_plan(self, with_search=True):
+        parts = [FILTER_QUERIES[self.current_filter]]
+        include = [t for t, state in self.tag_filter.items() if state == "include"]
+        if include and self.tag_match_any:
+            parts.append("tag:" + ",".join(include))
+        else:
+            parts += [f"tag:{t}" for t in include]
+        parts += [f"-tag:{t}" for t, state in self.tag_filter.items() if state == "exclude"]
+        filters = " ".join(p for p in parts if p)
+        if not with_search:
+            return compile_query(filters, date.today())
+        try:
+            plan = compile_query(f"{filters} {self.search_query}".strip(), date.today())
+            query_ok = True
+        except ValueError:
+            # Half-typed clauses (e.g. "due<2026-1") search as plain text
+            plan = compile_query(f"{filters} {literal_query_text(self.search_query)}".strip(), date.today())
+            query_ok = False
+        self.search_entry.configure(border_color=COLOR_BORDER if query_ok else COLOR_MED)
+        return plan
+    
+    def cycle_tag(self, tag):
+        state = self.tag_filter.get(tag)
+        if state is None:
+            self.tag_filter[tag] = "include"
+        elif state == "include":
+            self.tag_filter[tag] = "exclude"
+        else:
+            del self.tag_filter[tag]
+        if self.sound_enabled:
+            play_sound("click")
+        self.render_tasks()
+    
+    def toggle_tag_match(self):
+        self.tag_match_any = not self.tag_match_any
+        self.render_tasks()
+    
+    def _render_tag_bar(self):
+        """Rebuild the tag chips when the tag set or the chip states change"""
+        with self.store.lock:
+            counts = self.store.tag_index.counts()
+        # Active chips stay visible even if they drop out of the top tags
+        shown = list(counts)[:TAG_CHIP_LIMIT]
+        shown += [t for t in self.tag_filter if t not in shown]
+        key = (tuple(shown), tuple(self.tag_filter.items()), self.tag_match_any)
+        if key == self.tag_chip_key:
+            return
+        self.tag_chip_key = key
+        
+        for widget in self.tag_bar.winfo_children():
+            widget.destroy()
+        if not shown:
+            self.tag_bar.pack_forget()
+            return
+        self.tag_bar.pack(fill="x", pady=(0, 8), before=self.notice_label)
+        
+        ctk.CTkButton(
+            self.tag_bar,
+            text="ANY" if self.tag_match_any else "ALL",
+            font=ctk.CTkFont(family=FONT_MONO, size=10, weight="bold"),
+            height=24,
+            width=40,
+            corner_radius=0,
+            fg_color=COLOR_BG,
+            text_color=COLOR_MED,
+            border_width=1,
+            border_color=COLOR_BORDER,
+            command=self.toggle_tag_match
+        ).pack(side="left", padx=(0, 4))
         
-        return filtered
+        for tag in shown:
+            state = self.tag_filter.get(tag)
+            color = {"include": COLOR_ACCENT, "exclude": COLOR_HIGH}.get(state, COLOR_DIM)
+            ctk.CTkButton(
+                self.tag_bar,
+                text=f"{'-' if state == 'exclude' else '#'}{tag} {counts.get(tag, 0)}",
+                font=ctk.CTkFont(family=FONT_MONO, size=10),
+                height=24,
+                width=40,
+                corner_radius=0,
+                fg_color=COLOR_SELECTED if state else COLOR_BG,
+                text_color=color,
+                border_width=1,
+                border_color=color if state else COLOR_BORDER,
+                command=lambda t=tag: self.cycle_tag(t)
+            ).pack(side="left", padx=(0, 4))
     
     def update_stats(self):
-        total = len(self.tasks)
-        done = len([t for t in self.tasks if t["completed"]])
-        pending = total - done
-        high_priority = len([t for t in self.tasks if t.get("priority") == "HIGH" and not t["completed"]])
-        
-        # Count overdue
+        # Counts come off the bitmaps and the due index, not a walk over every task
         today = date.today()
-        overdue = 0
-        for t in self.tasks:
-            if t["completed"]:
-                continue
-            due = t.get("due_date")
-            if due:
-                try:
-                    due_date = datetime.strptime(due, "%Y-%m-%d").date()
-                    if due_date < today:
-                        overdue += 1
-                except:
-                    pass
+        with self.store.lock:
+            index = self.store.tag_index
+            total = len(self.tasks)
+            done = index.completed.bit_count()
+            pending = total - done
+            high_priority = (index.bitmap("priority", "HIGH") & index.bitmap("status", "open")).bit_count()
+            overdue = len(compile_query("is:overdue", today).run(self.store))
+        
+            trend = self.store.rollups.summary(today=today)
         
         percentage = int((done / total) * 100) if total > 0 else 0
         bar = ('=' * int(percentage/10)).ljust(10)
@@ -1164,6 +5705,12 @@ class ToDoApp(ctk.CTk):
             f"  TOTAL PROTOCOLS  : {total:03d}    |    HIGH PRIORITY : {high_priority:03d}\n"
             f"  ACTIVE THREADS   : {pending:03d}    |    OVERDUE       : {overdue:03d}\n"
             f"  COMPLETED        : {done:03d}    |    COMPLETION    : [{bar}] {percentage}%\n"
+            f"  DONE / {STATS_DAYS} DAYS   : [{sparkline(trend['completed'])}] "
+            f"{sum(trend['completed']) / STATS_DAYS:.1f}/DAY\n"
+            f"  NEW  / {STATS_DAYS} DAYS   : [{sparkline(trend['created'])}] "
+            f"{sum(trend['created']) / STATS_DAYS:.1f}/DAY\n"
+            f"  MEDIAN TO DONE   : {trend['median_ttc'] or '---':<4}   |    LATE RATE     : "
+            f"{int(trend['late_rate'] * 100):02d}%\n"
             f"{'='*50}"
         )
         self.stats_label.configure(text=stats_text)
@@ -1174,10 +5721,25 @@ class ToDoApp(ctk.CTk):
             self.clear_btn.pack_forget()
 
     def render_tasks(self):
-        for widget in self.list_frame.winfo_children():
-            widget.destroy()
-        
+        """Bring the list in line with the store, touching only rows that changed.
+
+        Rows are cached by task id and rebuilt only when their render key
+        (the task's store version) changes; rows that keep their relative
+        order stay packed where they are. In mini mode only the counts line
+        is updated.
+        """
+        if self.mini_frame is not None:
+            self._render_mini()
+            return
+        self.rendered_version = self.store.version
         filtered = self.get_filtered_tasks()
+        visible_ids = [t["id"] for t in filtered]
+        visible = set(visible_ids)
+        self.selected &= visible
+        
+        for task_id in [i for i in self.rows if i not in visible]:
+            self.rows.pop(task_id).destroy()
+        survivors_before = [i for i in self.row_order if i in visible]
         
         if not filtered:
             msg = "NO MATCHING RECORDS"
@@ -1185,39 +5747,385 @@ class ToDoApp(ctk.CTk):
                 msg = "SYSTEM IDLE. AWAITING INPUT."
             elif self.search_query:
                 msg = f"NO RESULTS FOR: '{self.search_query.upper()}'"
-            
-            ctk.CTkLabel(
-                self.list_frame,
-                text=msg,
-                font=ctk.CTkFont(family=FONT_MONO, size=14),
-                text_color=COLOR_DIM
-            ).pack(pady=40)
+            self.empty_label.configure(text=msg)
+            self._pack_row(self.empty_label, pady=40)
         else:
-            for task in filtered:
-                TaskItem(
-                    self.list_frame,
-                    task,
-                    self.toggle_task,
-                    self.delete_task,
-                    self.edit_task
-                ).pack(fill="x", pady=(0, 2))
+            self.empty_label.pack_forget()
         
+        created = set()
+        for task in filtered:
+            row = self.rows.get(task["id"])
+            context = self.row_context(task)
+            if row is not None and row.render_key == (row_render_key(task), context):
+                continue
+            new_row = self._create_row(task, context)
+            if row is not None:
+                new_row.pack(fill="x", pady=(0, 2), before=row)
+                row.destroy()
+            else:
+                created.add(task["id"])
+            self.rows[task["id"]] = new_row
+        
+        survivors_now = [i for i in visible_ids if i not in created]
+        if survivors_now == survivors_before:
+            # Relative order intact: slot new rows in next to their neighbours
+            prev = None
+            for task_id in visible_ids:
+                row = self.rows[task_id]
+                if task_id in created:
+                    if prev is not None:
+                        row.pack(fill="x", pady=(0, 2), after=prev)
+                    elif survivors_now:
+                        row.pack(fill="x", pady=(0, 2), before=self.rows[survivors_now[0]])
+                    else:
+                        self._pack_row(row)
+                prev = row
+        else:
+            for task_id in visible_ids:
+                self.rows[task_id].pack_forget()
+            for task_id in visible_ids:
+                self._pack_row(self.rows[task_id])
+        self.row_order = visible_ids
+        
+        self._render_tag_bar()
+        self._render_archive_section()
+        self._refresh_selection()
         self.update_stats()
-
+    
+    def _pack_row(self, widget, **pack_args):
+        # Live rows always stay above the archive section
+        pack_args = pack_args or {"fill": "x", "pady": (0, 2)}
+        if self.archive_frame.winfo_manager():
+            pack_args["before"] = self.archive_frame
+        widget.pack(**pack_args)
+    
+    # --- Archive ---
+    
+    def _render_archive_section(self):
+        """Offer archived tasks below the list on the DONE tab and when searching"""
+        show = self.current_filter == "completed" or (
+            self.search_query and self.current_filter == "all"
+        )
+        view = (self.current_filter, self.search_query) if show else None
+        if view != self.archive_view:
+            for row in self.archive_rows.values():
+                row.destroy()
+            self.archive_rows = {}
+            self.archive_cursor = None
+            self.archive_view = view
+        
+        if not show or not self.archive.count():
+            self.archive_frame.pack_forget()
+            return
+        
+        self.archive_frame.pack(fill="x", pady=(6, 0))
+        if self.archive_cursor is None or self.archive_more_btn.winfo_manager():
+            self.archive_more_btn.configure(
+                text=f"LOAD FROM COLD STORAGE ({self.archive.count()} ARCHIVED)"
+            )
+            self.archive_more_btn.pack(fill="x", side="bottom", pady=(4, 0))
+    
+    def load_archive_page(self):
+        """Show the next page of archived tasks, reading segments only as needed"""
+        if self.archive_cursor is None:
+            try:
+                plan = compile_query(self.search_query, date.today())
+            except ValueError:
+                plan = compile_query(literal_query_text(self.search_query), date.today())
+            self.archive_cursor = self.archive.iter_tasks(plan.matches)
+        page = list(islice(self.archive_cursor, ARCHIVE_PAGE_SIZE))
+        for task in page:
+            row = self.row_class(
+                self.archive_frame,
+                task,
+                self.restore_archived,
+                self.delete_archived,
+                None
+            )
+            row.pack(fill="x", pady=(0, 2), before=self.archive_more_btn)
+            self.archive_rows[task["id"]] = row
+        if len(page) < ARCHIVE_PAGE_SIZE:
+            self.archive_more_btn.pack_forget()
+    
+    def restore_archived(self, task_id):
+        """Unchecking an archived task moves it back into the live list, reopened"""
+        row = self.archive_rows.pop(task_id, None)
+        if row is None:
+            return
+        task = row.task_data
+        row.destroy()
+        self.archive.take(task)
+        # Archiving left the task's history in the rollups
+        self.store.add(task, counted=True)
+        self.history.record([("update", task_id, {
+            "completed": True,
+            "completed_at": task.get("completed_at")
+        })])
+        self.store.update(task_id, completed=False)
+        self.save_tasks()
+        self.render_tasks()
+    
+    def delete_archived(self, task_id):
+        row = self.archive_rows.get(task_id)
+        if row is None:
+            return
+        
+        def do_delete():
+            self.archive_rows.pop(task_id, None)
+            self.archive.take(row.task_data)
+            row.destroy()
+            if self.sound_enabled:
+                play_sound("delete")
+            self.render_tasks()
+        
+        # Archived tasks are outside the undo history, so ask first
+        ConfirmDialog(
+            self,
+            "DELETE_PROTOCOL",
+            f"Permanently delete archived task:\n'{row.task_data['text'][:35]}'?",
+            do_delete
+        )
+    
+    def _create_row(self, task, context=None):
+        return self.row_class(
+            self.list_frame,
+            task,
+            self.toggle_task,
+            self.delete_task,
+            self.edit_task,
+            on_select=self.select_task,
+            context=context,
+            on_expand=self.toggle_expand
+        )
+    
+    # --- Multi-selection ---
+    
+    def select_task(self, task_id, shift=False, ctrl=False):
+        """Click selects one row, Ctrl+click toggles, Shift+click extends a range"""
+        if shift and self.select_anchor in self.row_order:
+            a = self.row_order.index(self.select_anchor)
+            b = self.row_order.index(task_id)
+            self.selected.update(self.row_order[min(a, b):max(a, b) + 1])
+        elif ctrl:
+            self.selected ^= {task_id}
+            self.select_anchor = task_id
+        else:
+            self.selected = set() if self.selected == {task_id} else {task_id}
+            self.select_anchor = task_id
+        self._refresh_selection()
+    
+    def select_all(self, e=None):
+        # Leave Ctrl+A alone while typing
+        if isinstance(self.focus_get(), tkinter.Entry):
+            return
+        self.selected = set(self.row_order)
+        self._refresh_selection()
+        return "break"
+    
+    def clear_selection(self, e=None):
+        self.selected = set()
+        self._refresh_selection()
+    
+    def _refresh_selection(self):
+        for task_id, row in self.rows.items():
+            row.set_selected(task_id in self.selected)
+        
+        if self.selected:
+            self.selection_label.configure(text=f"{len(self.selected):03d} SELECTED")
+            if not self.batch_bar.winfo_ismapped():
+                self.batch_bar.pack(fill="x", pady=(0, 6), before=self.list_frame)
+        else:
+            self.batch_bar.pack_forget()
+    
+    def _selected_in_order(self):
+        return [i for i in self.row_order if i in self.selected]
+    
+    def batch_update(self, **fields):
+        """Apply the same field changes to every selected task as one undoable step"""
+        entry = []
+        with self.store.lock:
+            for task_id in self._selected_in_order():
+                task = self.store.get(task_id)
+                if task is None or all(task.get(f) == v for f, v in fields.items()):
+                    continue
+                before = {f: task.get(f) for f in fields}
+                if "completed" in fields:
+                    before["completed_at"] = task.get("completed_at")
+                    before["recurrence"] = task.get("recurrence")
+                entry.append(("update", task_id, before))
+                self.store.update(task_id, **fields)
+                occurrence = self.store.roll_recurrence(task_id)
+                if occurrence is not None:
+                    entry.append(("remove", occurrence["id"]))
+        if not entry:
+            return
+        self.history.record(entry)
+        self.save_tasks()
+        if self.sound_enabled:
+            play_sound("complete" if fields.get("completed") else "click")
+        self.render_tasks()
+    
+    def link_selected(self):
+        """The last clicked selected task waits on the rest of the selection"""
+        target = self.select_anchor
+        blockers = [i for i in self._selected_in_order() if i != target]
+        task = self.store.get(target) if target in self.selected else None
+        if task is None or not blockers:
+            self.show_notice("SELECT THE BLOCKERS, THEN CTRL+CLICK THE TASK THAT WAITS")
+            return
+        old = list(task.get("blocked_by") or ())
+        try:
+            self.store.update(target, blocked_by=old + [b for b in blockers if b not in old])
+        except ValueError as e:
+            self.show_notice(f"CANNOT LINK: {str(e).upper()}")
+            return
+        self.history.record([("update", target, {"blocked_by": old})])
+        self.save_tasks()
+        if self.sound_enabled:
+            play_sound("click")
+        self.show_notice(f"'{task['text'][:24].upper()}' NOW WAITS ON {len(task['blocked_by'])}")
+        self.render_tasks()
+    
+    def batch_delete(self):
+        removed = self._remove_subtrees(self.selected)
+        if not removed:
+            return
+        self.history.record(removed)
+        self.selected = set()
+        self.save_tasks()
+        if self.sound_enabled:
+            play_sound("delete")
+        self.show_notice(f"DELETED {len(removed)} PROTOCOLS :: CTRL+Z TO UNDO")
+        self.render_tasks()
+    
+    def _batch_priority(self, value):
+        self.batch_priority.set("PRIORITY")
+        self.batch_update(priority=value)
+    
+    def _batch_due(self, value):
+        self.batch_due.set("DUE")
+        days = dict(BATCH_DUE_OPTIONS)[value]
+        due = None if days < 0 else (date.today() + timedelta(days=days)).strftime("%Y-%m-%d")
+        self.batch_update(due_date=due)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Matrix-style task manager")
+    parser.add_argument("--api", action="store_true", help="serve the local JSON API")
+    parser.add_argument("--api-port", type=int, default=API_PORT, help=f"API port (default {API_PORT})")
+    parser.add_argument("--list", help=f"task list to open (default {DEFAULT_WORKSPACE})")
+    parser.add_argument("--add", metavar="TEXT", help="add a task (to the running window if there is one) and exit")
+    parser.add_argument("--priority", type=str.upper, choices=list(PRIORITIES), default="NONE", help="priority for --add")
+    parser.add_argument("--due", help="due date for --add")
+    parser.add_argument("--shards", type=int, help="split the list's storage into N shard files (0 merges them back)")
+    parser.add_argument(
+        "--rows", choices=sorted(ROW_RENDERERS), default="widgets",
+        help="row renderer: CTk widgets, or one canvas per row (lighter for big lists)"
+    )
+    parser.add_argument("--backups", action="store_true", help="list the list's backup snapshots and exit")
+    parser.add_argument("--restore", metavar="SNAPSHOT", help="restore the list from a backup snapshot")
+    parser.add_argument("--debug-jobs", action="store_true", help="print background job queue waits on exit")
+    args = parser.parse_args()
+    due_date = normalize_due_date(args.due)
+    if args.due and due_date is None:
+        parser.error(f"not a date: {args.due}")
+    if args.list is not None and not WORKSPACE_NAME.fullmatch(args.list):
+        parser.error(f"bad list name: {args.list} (1-32 letters, digits, - or _)")
+    directory = os.path.dirname(os.path.abspath(__file__))
+    
+    if args.backups:
+        # Read-only, so it doesn't matter whether a window is open
+        data_file = WorkspaceCache(directory).path(args.list or DEFAULT_WORKSPACE)
+        backups = BackupStore(os.path.splitext(data_file)[0] + "_backups")
+        for snapshot_id in backups.snapshots():
+            info = backups.read_snapshot(snapshot_id)
+            print(f"{snapshot_id}  {info['count']:6d} tasks  {len(info['chunks']):4d} chunks")
+        raise SystemExit(0)
+    
+    # Single instance: hand the command to the running window, if any, and exit
+    instance = None
+    if hasattr(socket, "AF_UNIX"):
+        instance = InstanceServer(instance_socket_path(directory), WorkspaceCache(directory).names)
+        if args.restore:
+            # A running window would write its own copy over the restored file
+            if not instance.claim():
+                raise SystemExit("Close the running window before restoring a backup")
+        else:
+            if args.add is not None:
+                command = {
+                    "cmd": "add", "text": args.add, "priority": args.priority,
+                    "due_date": due_date, "list": args.list
+                }
+            else:
+                command = {"cmd": "show", "list": args.list}
+            reply = None if instance.claim() else send_instance_command(instance.path, command)
+            if reply is not None:
+                if not reply.get("ok"):
+                    raise SystemExit(f"Running instance refused the command: {reply.get('error')}")
+                raise SystemExit(0)
+    args.list = args.list or DEFAULT_WORKSPACE
+    
+    if args.add is not None or args.restore:
+        # No window open: work on the list's file directly and exit. The
+        # instance socket stays claimed until then, so a window started
+        # meanwhile gives up instead of loading the file halfway through.
+        try:
+            if args.list not in WorkspaceCache(directory).names():
+                parser.error(f"no list named '{args.list}'")
+            data_file = WorkspaceCache(directory).path(args.list)
+            store = TaskStore(data_file)
+            if args.add is not None:
+                text, tags = split_tags(args.add.strip())
+                task = new_task(text, args.priority, due_date, tags)
+                if not task["text"]:
+                    parser.error("--add needs some text")
+                store.load()
+                store.add(task)
+                if not store.save():
+                    raise SystemExit(f"Could not save {args.list}")
+                print(f"Added '{task['text']}' to {args.list}")
+            else:
+                backups = BackupStore(os.path.splitext(data_file)[0] + "_backups")
+                store.load()
+                # Keep the current state too, in case the restore was a mistake
+                backups.snapshot(store.tasks, store.version)
+                try:
+                    restored = backups.restore(args.restore)
+                except OSError as e:
+                    raise SystemExit(f"Cannot restore {args.restore}: {e}")
+                store.restore(restored)
+                if not store.save():
+                    raise SystemExit(f"Restored {args.restore} but could not save {args.list}")
+                print(f"Restored {len(restored)} tasks from {args.restore}")
+        finally:
+            if instance is not None:
+                instance.stop()
+        raise SystemExit(0)
+    
     # Create app but hide it initially
-    app = ToDoApp()
+    app = ToDoApp(
+        api_port=args.api_port if args.api else None, workspace=args.list, rows=args.rows, instance=instance
+    )
+    if args.shards is not None and args.shards != app.store.shard_count:
+        if not app.store.reshard(max(args.shards, 0)):
+            print("Resharding failed; the list keeps its old layout")
     app.withdraw()  # Hide main window
     
     def on_boot_complete():
         app.deiconify()  # Show main window
         app.lift()
         app.focus_force()
-        # Check for overdue notifications
-        check_overdue_notifications(app.tasks)
+        # Start the overdue reminders (the first check covers everything overdue)
+        app.check_reminders()
     
     # Show boot screen
     boot = BootScreen(app, on_boot_complete)
     
     app.mainloop()
+    
+    if args.debug_jobs:
+        names = {JOB_INTERACTIVE: "interactive", JOB_BACKGROUND: "background"}
+        for priority, (jobs, median, worst) in sorted(app.jobs.latency_stats().items()):
+            print(
+                f"{names.get(priority, priority)} jobs: {jobs} sampled, "
+                f"queue wait median {median:.1f} ms, worst {worst:.1f} ms"
+            )